@@ -1,9 +1,14 @@
 import sys, curses
-from .flashcards import Deck, do_loop
+from .flashcards import Deck, do_loop, compile_deck, COMPILE_COMMAND, \
+                        JOURNAL_SUFFIX
 
 try:
-    with open(sys.argv[1]) as sourcefile:
-        cards = Deck(sourcefile.read())
+    if sys.argv[1] == COMPILE_COMMAND:
+        for filename in sys.argv[2:]:
+            print(f"Compiled {filename} to {compile_deck(filename)}")
+        quit()
+    cards = Deck.from_file(sys.argv[1])
+    cards.keep_reviews(sys.argv[1] + JOURNAL_SUFFIX)
 except(IndexError):
     print("ERROR: please specify a source file for the data")
     quit()
@@ -11,4 +16,7 @@ except(Exception) as cfg_ex:
     print(f"Error in source file: {str(cfg_ex)}")
     quit()
 
-curses.wrapper(do_loop, cards)
+try:
+    curses.wrapper(do_loop, cards)
+finally:
+    cards.close()
@@ -0,0 +1,397 @@
+"""
+Precompiled binary caches for flashcard decks
+
+A deck's JSON file has to be parsed and checked (for duplicate cards,
+reserved menu characters and bad template tokens) every time it's loaded.
+`write_cache()` saves a deck that has already passed those checks in a
+compact binary form, next to its JSON file; `read_cache()` reads it back
+with almost no parsing, as long as the JSON file hasn't changed since.
+
+The cache is a header followed by length-prefixed sections:
+
+    strings     every distinct string in the deck, in UTF-8, separated
+                by NUL characters (referred to everywhere else by number)
+    meta        the deck name, the numbered flag, the compiled display
+                template, the topics and the card schemas (with the
+                number of cards in each), as a flat array of integers
+    schemas     the schema number of each card
+    rows        the row of each card in its schema
+    titles      the string number of each card's title
+    tags        the type of each property value (see TAG_*)
+    values      each property value: a string number, an integer, or
+                the position of a float in the floats section
+    floats      the floating-point property values
+    bitmaps     one bitmap per topic, with a bit set for each member card
+
+A schema is the ordered list of property keys that a card has; cards with
+the same keys share one, so the keys aren't repeated for every card. The
+property values are stored by column: for each schema in turn, the values
+of its first key for all of its cards, then its second key, and so on.
+Most columns hold values of just one type, and are decoded in one go.
+"""
+import array, json, os, re, struct, sys
+
+CACHE_SUFFIX        = '.deck'
+# The magic number includes the version of the cache format (and of the
+# checks a deck passed when it was compiled). It changes whenever either
+# of them does, so that caches written by older versions are ignored.
+CACHE_MAGIC         = b'FCDECK03'
+CACHE_HEADER        = struct.Struct('<8sQqI')
+SECTION_HEADER      = struct.Struct('<Q')
+STRING_SEPARATOR    = '\0'
+
+TAG_NULL            = 0
+TAG_FALSE           = 1
+TAG_TRUE            = 2
+TAG_INT             = 3
+TAG_FLOAT           = 4
+TAG_STRING          = 5
+TAG_JSON            = 6
+
+INT64_MIN           = -(1 << 63)
+INT64_MAX           = (1 << 63) - 1
+NONZERO_BYTE_RE     = re.compile(b'[^\x00]')
+# The positions of the bits that are set in each possible byte
+BYTE_BITS           = [tuple(bit for bit in range(8) if byte & (1 << bit))
+                       for byte in range(256)]
+
+class CacheError(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+
+class CachedDeck:
+    """
+    The contents of a deck cache, ready to be turned into a `Deck`
+
+    Attributes
+    ----------
+    name : str
+        The name of the deck
+    numbered : bool
+        Whether the cards in the deck are accessible by number
+    template : tuple
+        The display template, as (lines, formats, front_formats) lists
+    titles : TitleTable
+        The title of each card
+    schemas : list
+        A (keys, columns) tuple for each schema, where `columns` holds the
+        values of each key (see flashcards.CardSchema)
+    card_schemas : array
+        The schema number of each card
+    rows : array
+        The row of each card in its schema
+    topics : list
+        A (name, character, prompt, detail, bitmap, others) tuple for each
+        topic, where `detail` is a template like `template`, `bitmap` has
+        a bit set for the position of each member card (see
+        bitmap_positions()), and `others` lists members that aren't cards
+        in this deck
+    """
+    def __init__(self):
+        self.name = None
+        self.numbered = False
+        self.template = None
+        self.titles = TitleTable([], array.array('I'))
+        self.schemas = []
+        self.card_schemas = array.array('I')
+        self.rows = array.array('I')
+        self.topics = []
+
+class TitleTable:
+    """
+    The title of each card, looked up in the string table when it's asked
+    for (instead of making a list of every title when the cache is read)
+
+    Parameters:
+        strings:        the cache's string table
+        numbers:        the string number of each card's title
+    """
+    def __init__(self, strings: list, numbers):
+        self.strings = strings
+        self.numbers = numbers
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def __getitem__(self, n: int) -> str:
+        return self.strings[self.numbers[n]]
+
+    def __iter__(self):
+        return map(self.strings.__getitem__, self.numbers)
+
+def bitmap_positions(bitmap):
+    """Generate the positions of the bits that are set in a bitmap"""
+    for match in NONZERO_BYTE_RE.finditer(bitmap):
+        first = match.start() * 8
+        for bit in BYTE_BITS[bitmap[match.start()]]:
+            yield first + bit
+
+def cache_filename(source_filename: str) -> str:
+    """The name of the cache for a deck's JSON file"""
+    return source_filename + CACHE_SUFFIX
+
+class StringTable:
+    """Number each distinct string, in the order they're first seen"""
+    def __init__(self):
+        self.numbers = {}
+        self.strings = []
+
+    def add(self, text: str) -> int:
+        try:
+            return self.numbers[text]
+        except(KeyError):
+            if STRING_SEPARATOR in text:
+                raise CacheError("Strings containing NUL can't be cached")
+            self.numbers[text] = len(self.strings)
+            self.strings.append(text)
+            return self.numbers[text]
+
+    def encode(self) -> bytes:
+        return STRING_SEPARATOR.join(self.strings).encode('utf-8')
+
+def add_template(meta, strings, template):
+    """Add a compiled template's lines and format strings to `meta`"""
+    meta.append(len(template.lines))
+    for line, format_string, front_format in zip(template.lines,
+                                                  template.formats,
+                                                  template.front_formats):
+        meta.extend([strings.add(line), strings.add(format_string),
+                     strings.add(front_format)])
+
+def read_template(meta, strings) -> tuple:
+    """Read back a template written by add_template()"""
+    lines, formats, front_formats = [], [], []
+    for i in range(next(meta)):
+        lines.append(strings[next(meta)])
+        formats.append(strings[next(meta)])
+        front_formats.append(strings[next(meta)])
+    return (lines, formats, front_formats)
+
+def write_cache(source_filename: str, deck) -> str:
+    """
+    Save a deck that was loaded from a JSON file
+
+    Parameters:
+        source_filename:    name of the deck's JSON file
+        deck:               the `Deck` loaded from that file
+
+    Returns:                the name of the cache file
+    """
+    strings = StringTable()
+    meta = array.array('q')
+    meta.append(strings.add(deck.deck_name))
+    meta.append(1 if deck.numbered == True else 0)
+    add_template(meta, strings, deck.display_template)
+    meta.append(len(deck.topics))
+    for name, table in deck.topics.items():
+        meta.extend([strings.add(name), strings.add(table['character']),
+                     strings.add(table['prompt'])])
+        add_template(meta, strings, table['detail'])
+        others = [title for title in table['members']
+                  if title not in deck.titles]
+        meta.append(len(others))
+        meta.extend(strings.add(title) for title in others)
+
+    # The deck's cards are rows in the schemas of its store, in the same
+    # order as in the deck, so the columns can be written as they are
+    schemas = list(deck.store.schemas.values())
+    schema_numbers = {id(schema): n for n, schema in enumerate(schemas)}
+    card_schemas = array.array('I', [schema_numbers[id(card.schema)]
+                                     for card in deck.data])
+    titles = array.array('I', [strings.add(card.title)
+                               for card in deck.data])
+    rows = array.array('I', [card.row for card in deck.data])
+    meta.append(len(schemas))
+    for schema in schemas:
+        meta.append(len(schema))
+        meta.append(len(schema.keys))
+        meta.extend(strings.add(key) for key in schema.keys)
+
+    tags = array.array('B')
+    values = array.array('q')
+    floats = array.array('d')
+    for schema in schemas:
+        for column in schema.columns:
+            for value in column:
+                if value is None:
+                    tags.append(TAG_NULL)
+                    values.append(0)
+                elif value is True or value is False:
+                    tags.append(TAG_TRUE if value else TAG_FALSE)
+                    values.append(0)
+                elif isinstance(value, int) and \
+                     INT64_MIN <= value <= INT64_MAX:
+                    tags.append(TAG_INT)
+                    values.append(value)
+                elif isinstance(value, float):
+                    tags.append(TAG_FLOAT)
+                    values.append(len(floats))
+                    floats.append(value)
+                elif isinstance(value, str):
+                    tags.append(TAG_STRING)
+                    values.append(strings.add(value))
+                else:
+                    tags.append(TAG_JSON)
+                    values.append(strings.add(json.dumps(value)))
+
+    total_cards = len(deck.data)
+    bitmaps = bytearray()
+    for table in deck.topics.values():
+        bitmap = bytearray((total_cards + 7) // 8)
+        for title in table['members']:
+            n = deck.titles.get(title)
+            if n is not None:
+                bitmap[n >> 3] |= 1 << (n & 7)
+        bitmaps += bitmap
+
+    stat = os.stat(source_filename)
+    sections = [strings.encode(), meta.tobytes(), card_schemas.tobytes(),
+                rows.tobytes(), titles.tobytes(), tags.tobytes(), values.tobytes(),
+                floats.tobytes(), bytes(bitmaps)]
+    filename = cache_filename(source_filename)
+    temporary = filename + '.tmp'
+    with open(temporary, 'wb') as ofile:
+        ofile.write(CACHE_HEADER.pack(CACHE_MAGIC, stat.st_size,
+                                      stat.st_mtime_ns, total_cards))
+        for section in sections:
+            ofile.write(SECTION_HEADER.pack(len(section)))
+            ofile.write(section)
+    os.replace(temporary, filename)
+    return filename
+
+def read_cache(source_filename: str):
+    """
+    Read the cache for a deck's JSON file
+
+    Parameters:
+        source_filename:    name of the deck's JSON file
+
+    Returns:                a CachedDeck, or None if there's no cache or the
+                            JSON file has changed since it was written
+    """
+    try:
+        stat = os.stat(source_filename)
+        with open(cache_filename(source_filename), 'rb') as ifile:
+            contents = ifile.read()
+    except(OSError):
+        return None
+    try:
+        magic, size, mtime_ns, total_cards = \
+            CACHE_HEADER.unpack_from(contents, 0)
+        if magic != CACHE_MAGIC or size != stat.st_size or \
+           mtime_ns != stat.st_mtime_ns:
+            return None
+        position = CACHE_HEADER.size
+        sections = []
+        for i in range(9):
+            (length,) = SECTION_HEADER.unpack_from(contents, position)
+            position += SECTION_HEADER.size
+            sections.append(contents[position:position + length])
+            position += length
+        return decode(sections, total_cards)
+    except(struct.error, ValueError, IndexError, StopIteration,
+           UnicodeDecodeError):
+        # A damaged cache is ignored, and the JSON file loaded instead
+        return None
+
+def decode_column(tags, values, strings, floats):
+    """
+    Decode the values of one property, for all the cards in a schema,
+    as a list or (for integers and floats) an array
+
+    Parameters:
+        tags:           the type of each value
+        values:         the encoded values
+        strings:        the string table
+        floats:         the floating-point values
+    """
+    if tags.count(TAG_STRING) == len(tags):
+        return list(map(strings.__getitem__, values))
+    if tags.count(TAG_INT) == len(tags):
+        return values
+    if tags.count(TAG_FLOAT) == len(tags):
+        return array.array('d', map(floats.__getitem__, values))
+    column = []
+    for tag, value in zip(tags, values):
+        if tag == TAG_STRING:
+            column.append(strings[value])
+        elif tag == TAG_INT:
+            column.append(value)
+        elif tag == TAG_FLOAT:
+            column.append(floats[value])
+        elif tag == TAG_NULL:
+            column.append(None)
+        elif tag == TAG_JSON:
+            column.append(json.loads(strings[value]))
+        else:
+            column.append(tag == TAG_TRUE)
+    return column
+
+def decode(sections, total_cards) -> CachedDeck:
+    """Unpack the sections of a cache file"""
+    strings = sections[0].decode('utf-8').split(STRING_SEPARATOR)
+    meta = array.array('q')
+    meta.frombytes(sections[1])
+    card_schemas = array.array('I')
+    card_schemas.frombytes(sections[2])
+    rows = array.array('I')
+    rows.frombytes(sections[3])
+    titles = array.array('I')
+    titles.frombytes(sections[4])
+    tags = sections[5]
+    values = array.array('q')
+    values.frombytes(sections[6])
+    floats = array.array('d')
+    floats.frombytes(sections[7])
+    bitmaps = sections[8]
+    if sys.byteorder != 'little':
+        for column in [meta, card_schemas, rows, titles, values, floats]:
+            column.byteswap()
+
+    result = CachedDeck()
+    meta = iter(meta)
+    result.name = strings[next(meta)]
+    result.numbered = next(meta) == 1
+    result.template = read_template(meta, strings)
+    topics = []
+    for i in range(next(meta)):
+        name, character, prompt = (strings[next(meta)] for j in range(3))
+        detail = read_template(meta, strings)
+        others = [strings[next(meta)] for j in range(next(meta))]
+        topics.append((name, character, prompt, detail, others))
+    schemas = []
+    counts = []
+    for i in range(next(meta)):
+        counts.append(next(meta))
+        schemas.append([strings[next(meta)] for j in range(next(meta))])
+
+    # Titles are looked up when they're used, so every reference has to be
+    # checked now, while a damaged cache can still be ignored
+    if len(titles) != total_cards or len(card_schemas) != total_cards or \
+       len(rows) != total_cards or sum(counts) != total_cards:
+        raise ValueError("The card sections don't match the header")
+    if total_cards > 0 and (max(titles) >= len(strings) or
+                            max(card_schemas) >= len(schemas) or
+                            max(rows) >= max(counts)):
+        raise ValueError("A card refers to a string or schema out of range")
+    result.titles = TitleTable(strings, titles)
+    result.card_schemas = card_schemas
+    result.rows = rows
+    field = 0
+    for keys, total in zip(schemas, counts):
+        columns = []
+        for key in keys:
+            columns.append(decode_column(tags[field:field + total],
+                                         values[field:field + total],
+                                         strings, floats))
+            field += total
+        result.schemas.append((tuple(keys), columns))
+
+    bitmap_size = (total_cards + 7) // 8
+    for n, (name, character, prompt, detail, others) in enumerate(topics):
+        bitmap = bitmaps[n * bitmap_size:(n + 1) * bitmap_size]
+        if len(bitmap) != bitmap_size:
+            raise ValueError("Topic bitmaps are incomplete")
+        result.topics.append((name, character, prompt, detail, bitmap,
+                              others))
+    return result
@@ -12,11 +12,27 @@ of the card, designed to spur your memory. Press the forward
 slash key (/) to flip the card over and see all the details
 about its subject.
 
+To study, choose the `*` option from the main menu. The cards come up
+one at a time, starting with the ones that are due for review. After
+flipping each card over, grade how well you remembered it, from `0`
+(not at all) to `5` (perfectly); cards you know well come up less and
+less often, and cards you forgot come up again the next day. Your
+grades are saved as you go, in a `.reviews` file next to the deck, so
+the next session carries on where this one stopped.
+
 All `flashcards` information is defined in a JSON-formatted text file,
 which must be specified on the command line:
 
    `$ python flashcards.py [source-file.json]`
 
+A large deck can be compiled ahead of time, so that it opens faster:
+
+   `$ python flashcards.py compile [source-file.json ...]`
+
+This checks the deck and saves it next to the JSON file, as a binary
+cache (with a `.deck` suffix) that's used from then on, until the JSON
+file is changed.
+
 CONFIGURATION
 -------------
 
@@ -48,7 +64,9 @@ array of strings...
 when your card is viewed. The strings can have replacement tokens, of
 the form `{card['property']}`. When the system calls the card's `display()`
 method, these tokens will be replaced with the properties you defined in the
-dictionary for the card.
+dictionary for the card. A token can also have a format spec, as in
+`{card['distance']:.1f}`; anything else inside the braces is an error.
+To show a literal brace, double it (`{{` or `}}`).
 
 There's also one optional entry you can make in your parent dictionary,
 which you can use to make the system automatically assign a number to
@@ -90,11 +108,20 @@ yet another dictionary, with four required entries:
 
 For an example of an advanced flashcards configuration file, see `colonies.json`.
 """
-import json, re, sys, random, curses
+import json, re, sys, random, curses, string, time, logging
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence, Set
 from screen_utils import *
+import deckcache
+from scheduler import Scheduler, LOWEST_GRADE, HIGHEST_GRADE
+from reviewlog import ReviewLog, JOURNAL_SUFFIX, COMPACT_RECORDS
 
 DEFAULT_RANDOM_MENU_CHAR    = 'r'
 DEFAULT_NUMBERED_MENU_CHAR  = 'n'
+DEFAULT_STUDY_MENU_CHAR     = '*'
+RENDER_CACHE_SIZE           = 256
+NO_CARDS_TO_STUDY           = "There are no cards to study in this deck"
 DEFAULT_MAIN_MENU_CHAR      = 'm'
 DEFAULT_TOGGLE_CHAR         = '/'
 MAIN_MENU_LEVEL             = 0
@@ -104,6 +131,16 @@ TOPIC_DISPLAY_LEVEL         = 3
 NUMBER_INPUT_LEVEL          = 4
 TOPIC_INPUT_LEVEL           = 5
 DEFAULT_PROMPT              = 'press the [ESC] key to quit'
+HIDDEN_TITLE                = '???'
+READ_CHUNK_SIZE             = 1 << 16
+COMPILE_COMMAND             = 'compile'
+
+COLUMN_TYPES = {'q': int, 'd': float}
+
+TOKEN_RE = re.compile(r"""\{card\[(['"])(.*?)\1\]""")
+FIELD_RE = re.compile(r"card\[[^\].]+\]")
+SPACE_RE = re.compile(r"\s*")
+JSON_DELIMITERS = ' \t\n\r,:]}'
 
 class ConfigurationError(Exception):
     def __init__(self, message):
@@ -113,14 +150,228 @@ class CardNotFoundError(Exception):
     def __init__(self, message):
         super().__init__(message)
 
+class Template:
+    """
+    Display text for a card, compiled once so that it can be rendered
+    for any number of cards
+
+    Each line of a template is text with replacement tokens of the form
+    ``{card['property']}``. The tokens are checked and turned into
+    ``str.format`` fields when the template is built, so rendering a card
+    is plain string formatting; nothing in the text is ever evaluated as
+    Python code.
+
+    Attributes
+    ----------
+    lines : list
+        The source text of each line
+    formats : list
+        A format string for each line, with ``card`` as its only argument
+    front_formats : list
+        Format strings for the front of a card, where the title is hidden
+
+    Methods
+    -------
+    render(card)
+        Get the lines of text for a card
+
+    render_front(card, line)
+        Get one line of text for the front of a card
+    """
+    def __init__(self, lines: list):
+        """
+        Parameters:
+            lines:      strings containing text with replacement tokens
+        """
+        self.lines = list(lines)
+        self.formats = [self.compile(line) for line in self.lines]
+        self.front_formats = [self.compile(line.replace("{card['title']}",
+                                                        HIDDEN_TITLE))
+                              for line in self.lines]
+
+    @classmethod
+    def precompiled(cls, lines: list, formats: list, front_formats: list):
+        """
+        Rebuild a template from the format strings of one that was
+        compiled before (see deckcache), without checking them again
+        """
+        template = cls.__new__(cls)
+        template.lines = lines
+        template.formats = formats
+        template.front_formats = front_formats
+        return template
+
+    @staticmethod
+    def compile(line: str) -> str:
+        """
+        Convert one line of template text into a format string
+
+        Parameters:
+            line:       text with replacement tokens
+        """
+        format_string = TOKEN_RE.sub(lambda m: "{card[" + m.group(2) + "]",
+                                     line)
+        try:
+            for text, field, spec, conversion in \
+                    string.Formatter().parse(format_string):
+                if field is None:
+                    continue
+                if FIELD_RE.fullmatch(field) is None or \
+                   (spec is not None and '{' in spec):
+                    raise ConfigurationError(
+                        f"Invalid replacement token in template: {line}")
+        except(ValueError) as format_ex:
+            raise ConfigurationError(
+                f"Template could not be parsed ({format_ex}): {line}")
+        return format_string
+
+    def __len__(self):
+        """The number of lines in this template"""
+        return len(self.lines)
+
+    def __iter__(self):
+        """The source text of each line"""
+        return iter(self.lines)
+
+    def render(self, card) -> list:
+        """
+        Get the lines of text for a card
+
+        Parameters:
+            card:       the ``Card`` whose properties fill in the tokens
+        """
+        return [f.format(card=card) for f in self.formats]
+
+    def render_front(self, card, line: int) -> str:
+        """
+        Get one line of text for the front of a card, with the title
+        hidden
+
+        Parameters:
+            card:       the ``Card`` whose properties fill in the tokens
+            line:       the 0-based index of the line to render
+        """
+        return self.front_formats[line].format(card=card)
+
+def compiled(template) -> Template:
+    """
+    Get a compiled template
+
+    Parameters:
+        template:   a ``Template``, or a list of lines to compile
+    """
+    if isinstance(template, Template):
+        return template
+    return Template(template)
+
+class CardSchema:
+    """
+    Shared storage for the properties of cards that have the same keys
+
+    Instead of a dictionary per card, a schema keeps one column per key,
+    and each card is a row number. Strings are interned, so a value that
+    many cards share is only stored once, and a column of integers or
+    floats is packed into an array by compact().
+
+    Attributes
+    ----------
+    keys : tuple
+        The property keys, in order
+    index : dict
+        The column number for each key
+    columns : list
+        The values of each property, one column per key
+    """
+    def __init__(self, keys: tuple):
+        """
+        Parameters:
+            keys:       the property keys of the cards in this schema
+        """
+        self.keys = keys
+        self.index = {key: n for n, key in enumerate(keys)}
+        self.columns = [[] for key in keys]
+
+    def __len__(self):
+        """The number of rows"""
+        return len(self.columns[0]) if len(self.columns) > 0 else 0
+
+    def append(self, values) -> int:
+        """
+        Add a row of property values, and return its number
+
+        Parameters:
+            values:     a value for each key, in order
+        """
+        row = len(self)
+        for n, value in enumerate(values):
+            if type(value) is str:
+                value = sys.intern(value)
+            column = self.columns[n]
+            if type(column) is array and \
+               type(value) is not COLUMN_TYPES[column.typecode]:
+                column = self.columns[n] = column.tolist()
+            column.append(value)
+        return row
+
+    def compact(self):
+        """Pack each column of integers or floats into an array"""
+        for n, column in enumerate(self.columns):
+            if type(column) is array or len(column) == 0:
+                continue
+            for typecode, value_type in COLUMN_TYPES.items():
+                if all(type(value) is value_type for value in column):
+                    try:
+                        self.columns[n] = array(typecode, column)
+                    except(OverflowError):
+                        pass
+                    break
+
+class CardStore:
+    """
+    The schemas for a collection of cards, which make new cards
+
+    Methods
+    -------
+    schema(keys: tuple)
+        Get the schema for a set of keys, creating it if necessary
+
+    card(title: str, details: dict)
+        Make a card, with its properties stored in the right schema
+
+    compact()
+        Pack the columns of every schema (see CardSchema.compact())
+    """
+    def __init__(self):
+        self.schemas = {}
+
+    def schema(self, keys: tuple) -> CardSchema:
+        try:
+            return self.schemas[keys]
+        except(KeyError):
+            self.schemas[keys] = CardSchema(keys)
+            return self.schemas[keys]
+
+    def card(self, title: str, details: dict):
+        schema = self.schema(tuple(details))
+        return Card.view(title, schema, schema.append(details.values()))
+
+    def compact(self):
+        for schema in self.schemas.values():
+            schema.compact()
+
 class Card:
     """
     A single flashcard
 
+    A card only holds its title and its place in a schema (see
+    CardSchema), where its properties are stored along with those of all
+    the other cards that have the same keys.
+
     Attributes
     ----------
     details : dict
-        The properties to be displayed on this flashcard. There is
+        The properties to be displayed on this flashcard (built when
+        asked for; use subscripts to get a single property). There is
         only one required key, `title`, which serves as the subject of
         the card.
     title : str
@@ -128,10 +379,11 @@ class Card:
 
     Methods
     -------
-    display(template: list, topics: dict={}, number: int=None,
+    display(template: Template, topics: dict={}, number: int=None,
             front: bool=False)
         Get an ordered list of strings, each one of which is a line
-        of text with details about the specific card. The `topics`
+        of text with details about the specific card. The `template`
+        can also be a plain list of lines. The `topics`
         dictionary contains information about various topics this
         card has in common with other cards in the deck. The `number` is
         a 1-indexed integer identifying this card's position in
@@ -143,6 +395,8 @@ class Card:
         parameter contains the 1-based index value of this card in
         a numbered list.
     """
+    __slots__ = ('title', 'schema', 'row')
+
     def __init__(self, title: str, **kwargs):
         """Initialize the Card object
 
@@ -150,10 +404,32 @@ class Card:
             title:          the name of the subject of this card
             kwargs:         dictionary containing details about the subject
         """
-        self.details = {}
         self.title = title
-        for k, v in kwargs.items():
-            self.details[k] = v
+        # A card made on its own has a schema to itself; the cards in a
+        # deck share the schemas in the deck's CardStore
+        self.schema = CardSchema(tuple(kwargs))
+        self.row = self.schema.append(kwargs.values())
+
+    @classmethod
+    def view(cls, title: str, schema: CardSchema, row: int):
+        """
+        Make a card for a row that's already in a schema
+
+        Parameters:
+            title:          the name of the subject of this card
+            schema:         the schema holding the card's properties
+            row:            the card's row in the schema
+        """
+        card = cls.__new__(cls)
+        card.title = title
+        card.schema = schema
+        card.row = row
+        return card
+
+    @property
+    def details(self) -> dict:
+        return {key: column[self.row] for key, column
+                in zip(self.schema.keys, self.schema.columns)}
 
     def __getitem__(self, key):
         """
@@ -163,7 +439,7 @@ class Card:
             key:        dictionary key for the given property
         """
         if key != 'title':
-            return self.details[key]
+            return self.schema.columns[self.schema.index[key]][self.row]
         else:
             return self.title
 
@@ -176,41 +452,32 @@ class Card:
 
         Parameters:
             template:   the boilerplate text with embedded symbols
-                        (must be contained in a list of at least one
-                        element)
+                        (a ``Template``, or a list of at least one
+                        line, which is compiled on every call)
             topics:     dictionary of related topics, which may or
                         may not contain the subject of the current card
+                        (their `detail` lines can also be compiled)
             number:     the ordinal position of this card in the deck
             front:      boolean value to indicate front or back of card
 
         Returns:        a list containing lines of text
         """
+        template = compiled(template)
         result = []
         if front == False:
-            if number != None:
-                result.append(f"{number}. " + self.title.upper())
-            else:
-                result.append(self.title.upper())
-            for line in template:
-                new_line = re.sub(r'\{card\[', '{self[', line)
-                if len(result) == 0 and number != None:
-                    new_line = f"{number}. " + new_line
-                result.append(eval('f"' + new_line + '"'))
+            result.append(self.title_bar(number))
+            result.extend(template.render(self))
             if len(topics) > 0:
                 for (topic, table) in topics.items():
                     members = table['members']
                     if self.title in members:
-                        topic_template = table['detail']
-                        for topic_line in topic_template:
-                            new_topic_line = re.sub(r'\{card\[', '{self[', topic_line)
-                            result.append(eval('f"' + new_topic_line + '"'))
+                        result.extend(compiled(table['detail']).render(self))
         else:
-            line = random.choice(template).replace(
-                           "{card['title']}", "???")
-            new_line = re.sub(r'\{card\[', '{self[', line)
-            if len(result) == 0 and number != None:
-                new_line = f"{number}. " + new_line
-            result.append(eval('f"' + new_line + '"'))
+            line = template.render_front(self,
+                                         random.randrange(len(template)))
+            if number != None:
+                line = f"{number}. " + line
+            result.append(line)
         return result
 
     def title_bar(self, ordinal: int=None) -> str:
@@ -221,10 +488,131 @@ class Card:
             ordinal:    the 1-based ordinal position of this card in a deck
         """
         if ordinal == None:
-            format_string = 'f"{self.title.upper()}"'
-        else:
-            format_string = 'f"{ordinal}. {self.title.upper()}"'
-        return eval(format_string)
+            return self.title.upper()
+        return f"{ordinal}. {self.title.upper()}"
+
+class CachedCards(Sequence):
+    """
+    The cards of a deck loaded from its compiled cache (see deckcache),
+    each one made the first time it's used
+
+    Parameters:
+        titles:         the title of each card
+        schemas:        the CardSchema for each schema number
+        card_schemas:   the schema number of each card
+        rows:           the row of each card in its schema
+    """
+    def __init__(self, titles, schemas: list, card_schemas, rows):
+        self.titles = titles
+        self.schemas = schemas
+        self.card_schemas = card_schemas
+        self.rows = rows
+        self.cards = [None] * len(titles)
+
+    def __len__(self):
+        return len(self.cards)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self[n] for n in range(*key.indices(len(self.cards)))]
+        card = self.cards[key]
+        if card is None:
+            n = key if key >= 0 else key + len(self.cards)
+            card = self.cards[n] = Card.view(
+                self.titles[n], self.schemas[self.card_schemas[n]],
+                self.rows[n])
+        return card
+
+class TitleIndex(Mapping):
+    """
+    The 0-based position of each card, keyed by title, for a deck loaded
+    from its compiled cache (built the first time a title is looked up)
+
+    Parameters:
+        titles:         the title of each card, in deck order
+    """
+    def __init__(self, titles):
+        self.titles = titles
+        self.index = None
+
+    def positions(self) -> dict:
+        if self.index is None:
+            self.index = dict(zip(self.titles, range(len(self.titles))))
+        return self.index
+
+    def __getitem__(self, title):
+        return self.positions()[title]
+
+    def __contains__(self, title):
+        return title in self.positions()
+
+    def __iter__(self):
+        return iter(self.titles)
+
+    def __len__(self):
+        return len(self.titles)
+
+class TopicMembers(Set):
+    """
+    The titles of the members of a topic, for a deck loaded from its
+    compiled cache: a bitmap with a bit set for the position of each member
+    card (see deckcache), and any members that aren't cards in the deck
+
+    Parameters:
+        bitmap:         the topic's bitmap
+        titles:         the title of each card in the deck
+        index:          the position of each card in the deck, by title
+        others:         members that aren't cards in the deck
+    """
+    def __init__(self, bitmap: bytes, titles, index, others: list):
+        self.bitmap = bitmap
+        self.titles = titles
+        self.index = index
+        self.others = frozenset(others)
+        self.size = None
+
+    def __contains__(self, title):
+        n = self.index.get(title)
+        if n is None:
+            return title in self.others
+        return self.bitmap[n >> 3] & (1 << (n & 7)) != 0
+
+    def __iter__(self):
+        for n in deckcache.bitmap_positions(self.bitmap):
+            yield self.titles[n]
+        yield from self.others
+
+    def __len__(self):
+        if self.size is None:
+            self.size = int.from_bytes(self.bitmap, 'little').bit_count() \
+                        + len(self.others)
+        return self.size
+
+class TopicIndex(Mapping):
+    """
+    The names of the topics each card belongs to, keyed by title, for a
+    deck loaded from its compiled cache; a card's topics are looked up in
+    the topics' bitmaps (see TopicMembers) when they're asked for
+
+    Parameters:
+        topics:         the deck's topics
+    """
+    def __init__(self, topics: dict):
+        self.topics = topics
+
+    def __getitem__(self, title):
+        names = [name for name, table in self.topics.items()
+                 if title in table['members']]
+        if len(names) == 0:
+            raise KeyError(title)
+        return names
+
+    def __iter__(self):
+        return iter({title: None for table in self.topics.values()
+                     for title in table['members']})
+
+    def __len__(self):
+        return sum(1 for title in self)
 
 class CardEncoder(json.JSONEncoder):
     def default(self, obj):
@@ -234,6 +622,125 @@ class CardEncoder(json.JSONEncoder):
             return output
         return json.JSONEncoder.default(self, obj)
 
+class DeckReader:
+    """
+    Read a deck's JSON configuration a piece at a time
+
+    Iterating over a DeckReader yields the (key, value) pairs of the
+    top-level dictionary, in the order they appear in the file. Most values
+    are parsed whole, but the value for `data` is a generator that parses
+    one card dictionary at a time, so a deck never has to be held in memory
+    as both raw text and a parsed tree. That generator has to be used up
+    before the next pair is taken.
+
+    Parameters:
+        stream:         a text file (or anything with a read() method)
+        chunk_size:     number of characters to read at a time
+    """
+    def __init__(self, stream, chunk_size: int=READ_CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+        self.at_end = False
+
+    def fill(self, minimum: int=1) -> bool:
+        """
+        Read more of the stream, if there is any, dropping the part of the
+        buffer that has already been parsed
+
+        Parameters:
+            minimum:        read at least this many chunks
+
+        Returns:            False at the end of the stream
+        """
+        if self.at_end:
+            return False
+        chunk = self.stream.read(self.chunk_size * minimum)
+        if chunk == '':
+            self.at_end = True
+            return False
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def error(self, message: str):
+        excerpt = self.buffer[self.position:self.position + 40]
+        return ConfigurationError(
+            f"Configuration data could not be parsed: {message} at '{excerpt}'")
+
+    def peek(self) -> str:
+        """Skip whitespace, and return the next character ('' at the end)"""
+        while True:
+            self.position = SPACE_RE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.fill():
+                return ''
+
+    def expect(self, characters: str) -> str:
+        """
+        Consume the next character, which has to be one of `characters`
+        """
+        next_char = self.peek()
+        if next_char == '' or next_char not in characters:
+            raise self.error(f"expected one of {characters!r}")
+        self.position += 1
+        return next_char
+
+    def value(self):
+        """Parse the next complete JSON value"""
+        self.peek()
+        chunks = 1
+        while True:
+            try:
+                result, end = self.decoder.raw_decode(self.buffer,
+                                                      self.position)
+                # In valid JSON, every value is followed by a delimiter.
+                # Without one, the value (a number, say) might go on in
+                # the next chunk.
+                if self.at_end or (end < len(self.buffer) and
+                                   self.buffer[end] in JSON_DELIMITERS):
+                    self.position = end
+                    return result
+            except(json.decoder.JSONDecodeError) as json_ex:
+                if self.at_end:
+                    raise self.error(json_ex.msg)
+            # Read more, in bigger steps for bigger values
+            self.fill(chunks)
+            chunks *= 2
+
+    def items(self):
+        """Parse the card dictionaries in the `data` array"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.position += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(',]') == ']':
+                return
+
+    def __iter__(self):
+        self.expect('{')
+        if self.peek() == '}':
+            self.position += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise self.error("expected a key")
+            self.expect(':')
+            if key == 'data':
+                yield key, self.items()
+            else:
+                yield key, self.value()
+            if self.expect(',}') == '}':
+                break
+        if self.peek() != '':
+            raise self.error("extra data after the deck")
+
 class Deck:
     """
     A collection of flashcards
@@ -242,17 +749,28 @@ class Deck:
     ----------
     deck_name : str
         The name of this deck
-    display_template : list
-        A container of strings consisting of text with replacement tokens
+    display_template : Template
+        The compiled text with replacement tokens, shown for every card
     numbered : bool
         Indicates whether the cards in this deck are accessible by number
     data : list
-        An ordered container of Card objects
+        An ordered container of Card objects (a CachedCards, for a deck
+        loaded from its compiled cache)
+    store : CardStore
+        The schemas that hold the properties of this deck's cards
+    titles : dict
+        The 0-based position of each card in `data`, keyed by title (a
+        TitleIndex, for a deck loaded from its compiled cache)
     topics : dict
         An optional dictionary of topics that multiple cards have in common.
         The keys in this dictionary are the names of the topics. Each value
         is a child dictionary, which specifies the four standard properties of
-        the given topic: `character`, `prompt`, `detail`, and `members`.
+        the given topic: `character`, `prompt`, `detail` (compiled into a
+        ``Template``), and `members` (a frozenset of card titles, or a
+        TopicMembers for a deck loaded from its compiled cache).
+    card_topics : dict
+        The names of the topics each card belongs to, keyed by title (a
+        TopicIndex, for a deck loaded from its compiled cache)
     current_menu_level : int
         An integer specifying the level of the main control loop. Possible
         values include MAIN_MENU_LEVEL, CARD_DISPLAY_LEVEL, TOPIC_DISPLAY_LEVEL,
@@ -269,19 +787,44 @@ class Deck:
     list(for_topic: str=None)
         Get a list of all cards, or only those matching the specified topic
 
+    position(card: Card)
+        Get the 1-indexed position of a card
+
+    topics_for(card: Card)
+        Get the topics a card belongs to
+
     main_menu()
         Get an ordered container of menu options. Each menu option is
         a dictionary with two keys: ``character`` (for the character a user
         must enter) and ``prompt`` (for the label the user will see on
-        the menu). Every menu will have at least one option (``r``, to view
-        a random card). Other menu options will be added based upon the contents
-        of the ``self.topics`` dictionary.
+        the menu). Every menu will have at least two options (``r``, to view
+        a random card, and ``*``, to study). Other menu options will be added
+        based upon the contents of the ``self.topics`` dictionary.
 
     random_card()
         Pick a card at random.
 
+    study_card()
+        Pick the card that's due for review soonest
+
+    grade(card: Card, grade: int)
+        Record how well the user remembered a card
+
+    keep_reviews(filename: str)
+        Save reviews in a journal, and load the ones saved before
+
+    save_reviews()
+        Write any reviews that haven't been written yet
+
+    close()
+        Save any reviews that haven't been written yet
+
     prompt_text()
         Get context-sensitive wording for the prompt at the bottom of the screen
+
+    from_file(filename: str, use_cache: bool=True)
+        Load a deck from a JSON file, parsing one card at a time (or from
+        its compiled cache)
     """
     def __init__(self, data: str):
         """
@@ -292,31 +835,113 @@ class Deck:
             js_data = json.loads(data)
         except(json.decoder.JSONDecodeError) as json_ex:
             raise ConfigurationError(f"Configuration data could not be parsed: {data}")
+        self.build(js_data.items())
+
+    @classmethod
+    def from_file(cls, filename: str, use_cache: bool=True):
+        """
+        Load a deck from a JSON file, without reading the whole file into
+        memory first (see DeckReader). Every card is read, and the deck
+        checked, before it's returned; what the streaming saves is memory,
+        since the file's text and its parsed tree are never held whole.
+
+        If the deck has been compiled (see compile_deck()) since the file
+        was last changed, it's loaded from the compiled cache instead.
+
+        Parameters:
+            filename:       name of the JSON file
+            use_cache:      False to ignore any compiled cache
+        """
+        if use_cache == True:
+            cached = deckcache.read_cache(filename)
+            if cached is not None:
+                return cls.from_cache(cached)
+        deck = cls.__new__(cls)
+        with open(filename) as sourcefile:
+            deck.build(DeckReader(sourcefile))
+        return deck
+
+    @classmethod
+    def from_cache(cls, cached):
+        """
+        Set up a deck from a compiled cache, which was checked when it was
+        written. Nothing is done for each card until it's used: the cards,
+        the index of their titles and the topics' members are all made
+        from the cache as they're needed (see CachedCards, TitleIndex and
+        TopicMembers).
+
+        Parameters:
+            cached:         a deckcache.CachedDeck
+        """
+        deck = cls.__new__(cls)
+        deck.deck_name = cached.name
+        deck.numbered = cached.numbered
+        deck.display_template = Template.precompiled(*cached.template)
+        deck.store = CardStore()
+        schemas = []
+        for keys, columns in cached.schemas:
+            schema = deck.store.schema(keys)
+            schema.columns = columns
+            schemas.append(schema)
+        deck.data = CachedCards(cached.titles, schemas, cached.card_schemas,
+                                cached.rows)
+        deck.titles = TitleIndex(cached.titles)
+        deck.topics = {}
+        for name, character, prompt, detail, bitmap, others in cached.topics:
+            deck.topics[name] = {
+                'character' : character,
+                'prompt' : prompt,
+                'detail' : Template.precompiled(*detail),
+                'members' : TopicMembers(bitmap, cached.titles, deck.titles,
+                                         others)
+            }
+        deck.start(TopicIndex(deck.topics))
+        return deck
+
+    def build(self, entries):
+        """
+        Set up this deck from the entries in its configuration
+
+        Parameters:
+            entries:        (key, value) pairs from the top level of the
+                            configuration. The value for `data` can be any
+                            iterable of card dictionaries; it is read
+                            before the next entry is taken.
+        """
+        js_data = {}
+        self.data = []
+        self.store = CardStore()
+        self.titles = {}
+        self.topics = {}
         try:
+            for key, value in entries:
+                if key == 'data':
+                    for item in value:
+                        next_title = item['title']
+                        if next_title in self.titles:
+                            raise ConfigurationError(f"Duplicate card: {next_title}")
+                        self.titles[next_title] = len(self.data)
+                        self.data.append(self.store.card(item.pop('title'),
+                                                         item))
+                    self.store.compact()
+                js_data[key] = value
             self.deck_name = js_data['name']
-            self.display_template = js_data['display_template']
-            raw_data = js_data['data']
+            self.display_template = Template(js_data['display_template'])
+            if 'data' not in js_data:
+                raise KeyError('data')
             try:
                 self.numbered = js_data['numbered']
             except:
                 self.numbered = False
-            self.data = []
-            self.topics = {}
-            for item in raw_data:
-                next_title = item['title']
-                for existing_card in self.data:
-                    existing_title = existing_card['title']
-                    if existing_title == next_title:
-                        raise ConfigurationError(f"Duplicate card: {next_title}")
-                self.data.append(Card(item.pop('title'), **item))
             if 'topics' in js_data:
                 topic_list = js_data['topics']
                 for item in topic_list:
                     for table in item.values():
                         menu_char = table['character']
-                        if menu_char == DEFAULT_RANDOM_MENU_CHAR:
+                        if menu_char in [DEFAULT_RANDOM_MENU_CHAR,
+                                         DEFAULT_STUDY_MENU_CHAR]:
                             raise ConfigurationError(
-                                f"The character \'{DEFAULT_RANDOM_MENU_CHAR}\' " \
+                                f"The character \'{menu_char}\' " \
                                 "is reserved for the system menu."
                             )
                         if self.numbered is True and menu_char == DEFAULT_NUMBERED_MENU_CHAR:
@@ -324,10 +949,33 @@ class Deck:
                                 f"The character \'{DEFAULT_NUMBERED_MENU_CHAR}\' " \
                                 "is reserved for the system menu."
                             )
+                        table['detail'] = Template(table['detail'])
+                        table['members'] = frozenset(table['members'])
                     self.topics.update(item)
         except(KeyError) as key_ex:
             raise ConfigurationError(f"System misconfigured: {str(key_ex)}")
+        self.start()
+
+    def start(self, card_topics=None):
+        """
+        Finish setting up this deck, once its cards and topics are in place
+        (however they were loaded): index the topics of each card, and
+        start at the main menu, with nothing studied yet
+
+        Parameters:
+            card_topics:    the topics of each card, by title, if they're
+                            already indexed (see TopicIndex)
+        """
+        if card_topics is None:
+            card_topics = {}
+            for name, table in self.topics.items():
+                for title in table['members']:
+                    card_topics.setdefault(title, []).append(name)
+        self.card_topics = card_topics
         self.current_menu_level = MAIN_MENU_LEVEL
+        self.scheduler = None
+        self.studying = False
+        self.review_log = None
 
     def choose_card(self, number: int):
         """
@@ -337,6 +985,7 @@ class Deck:
             number:             the 1-indexed position of the card
         """
         self.current_menu_level = CARD_FRONT_DISPLAY_LEVEL
+        self.studying = False
         return self.data[number - 1]
 
     def __len__(self):
@@ -345,13 +994,22 @@ class Deck:
 
     def __getitem__(self, key):
         """Get a specific card"""
-        count = 0
-        for card in self.data:
-            if card['title'] == key:
-                return self.data[count]
-            else:
-                count += 1
-        raise CardNotFoundError(f"Card not found for key '{key}'")
+        try:
+            return self.data[self.titles[key]]
+        except(KeyError):
+            raise CardNotFoundError(f"Card not found for key '{key}'")
+
+    def position(self, card) -> int:
+        """
+        Get the 1-indexed position of a card in this deck
+
+        Parameters:
+            card:               a ``Card`` in this deck
+        """
+        try:
+            return self.titles[card.title] + 1
+        except(KeyError):
+            raise CardNotFoundError(f"Card not found for key '{card.title}'")
 
     def list(self, for_topic: str=None):
         """
@@ -360,18 +1018,29 @@ class Deck:
         Parameters:
             for_topic:      the topic all of these cards have in common
         """
-        result = []
-        for i in range(len(self.data)):
-            card = self.data[i]
-            if for_topic is None:
-                result.append(card)
-            elif for_topic in self.topics:
-                members = self.topics[for_topic]['members']
-                if card.title in members:
-                    result.append(card)
+        if for_topic is None:
+            result = list(self.data)
+        elif for_topic in self.topics:
+            members = self.topics[for_topic]['members']
+            positions = sorted(self.titles[title] for title in members
+                               if title in self.titles)
+            result = [self.data[n] for n in positions]
+        else:
+            result = []
         self.current_menu_level = TOPIC_DISPLAY_LEVEL
         return result
 
+    def topics_for(self, card) -> dict:
+        """
+        Get the topics a card belongs to, in the same form as
+        ``self.topics`` (for passing to ``Card.display()``)
+
+        Parameters:
+            card:               a ``Card`` in this deck
+        """
+        return {name: self.topics[name]
+                for name in self.card_topics.get(card.title, ())}
+
     def random_card(self):
         """
         Pick a card at random
@@ -379,12 +1048,84 @@ class Deck:
         n = random.randint(0, len(self.data)-1)
         return self.choose_card(n)
 
+    def study_card(self):
+        """
+        Pick the card that's due for review soonest (see scheduler), and
+        start or carry on a study session
+
+        Returns:            the card, or None if there are no cards to study
+        """
+        if self.scheduler is None:
+            self.scheduler = Scheduler(len(self.data))
+        if len(self.scheduler) == 0:
+            return None
+        card = self.choose_card(self.scheduler.next_due() + 1)
+        self.studying = True
+        return card
+
+    def grade(self, card, grade: int):
+        """
+        Record how well the user remembered a card, which decides when it
+        comes up for review again
+
+        Parameters:
+            card:               the ``Card`` that was studied
+            grade:              from 0 (forgotten) to 5 (perfect recall)
+        """
+        if self.scheduler is None:
+            self.scheduler = Scheduler(len(self.data))
+        when = time.time()
+        self.scheduler.review(self.position(card) - 1, grade, when)
+        if self.review_log is not None:
+            self.review_log.record(card.title, when, grade)
+
+    def keep_reviews(self, filename: str):
+        """
+        Keep a record of the user's reviews (see reviewlog), and pick up
+        where earlier study sessions left off. If the earlier reviews
+        can't be read, a warning is logged, and the deck is studied
+        without saving reviews.
+
+        Parameters:
+            filename:           name of the review journal
+        """
+        self.scheduler = Scheduler(len(self.data))
+        self.review_log = ReviewLog(filename)
+        try:
+            self.review_log.restore(self.scheduler, self.titles)
+        except(OSError, ValueError) as restore_ex:
+            logging.getLogger(__name__).warning(
+                f"Reviews will not be saved: {restore_ex}")
+            self.review_log = None
+            return
+        if self.review_log.records >= COMPACT_RECORDS:
+            self.review_log.compact(self.scheduler,
+                                    list(self.titles))
+
+    def save_reviews(self):
+        """
+        Write any reviews that haven't been written yet (but without
+        waiting for them to reach the disk); called before waiting for
+        the user, so that the program can stop at any time without losing
+        any reviews
+        """
+        if self.review_log is not None:
+            self.review_log.flush()
+
+    def close(self):
+        """Save any reviews that haven't been written yet"""
+        if self.review_log is not None:
+            if self.review_log.records >= COMPACT_RECORDS:
+                self.review_log.compact(self.scheduler,
+                                        list(self.titles))
+            self.review_log.close()
+
     def main_menu(self):
         """
         Build a menu for this deck
 
-        A menu should have at least one option: to view a random
-        card. Other menu options must be added based upon the contents
+        A menu should have at least two options: to view a random
+        card, and to study. Other menu options must be added based upon the contents
         of the ``self.topics`` dictionary.
 
         Returns:    an ordered container of dictionaries.
@@ -401,6 +1142,11 @@ class Deck:
             'prompt' : "To view a random card, press \'" +\
                        f"{DEFAULT_RANDOM_MENU_CHAR}\'"
         })
+        result.append({
+            'character' : DEFAULT_STUDY_MENU_CHAR,
+            'prompt' : "To study the cards that are due for review, " +\
+                       f"press \'{DEFAULT_STUDY_MENU_CHAR}\'"
+        })
         if len(self.topics) > 0:
             for name, hashtable in self.topics.items():
                 topic_prompt = f"To view a list of {hashtable['prompt']}, " +\
@@ -434,6 +1180,14 @@ class Deck:
                           '\'' + DEFAULT_TOGGLE_CHAR + \
                           '\': view back of card; ' + \
                           DEFAULT_PROMPT
+        elif (self.current_menu_level == CARD_BACK_DISPLAY_LEVEL) and \
+             self.studying == True:
+            return '\'' + DEFAULT_MAIN_MENU_CHAR + \
+                          '\': main menu;  ' + \
+                          f"'{LOWEST_GRADE}'-'{HIGHEST_GRADE}': " + \
+                          'grade your answer (' + \
+                          f"{HIGHEST_GRADE} = perfect); " + \
+                          DEFAULT_PROMPT
         elif (self.current_menu_level == CARD_BACK_DISPLAY_LEVEL):
             return '\'' + DEFAULT_MAIN_MENU_CHAR + \
                           '\': main menu;  ' + \
@@ -443,6 +1197,22 @@ class Deck:
         else:
             return DEFAULT_PROMPT
 
+def compile_deck(filename: str) -> str:
+    """
+    Check a deck's JSON file, and save it as a compiled cache that
+    Deck.from_file() will load instead, until the JSON file changes
+
+    Parameters:
+        filename:       name of the JSON file
+
+    Returns:            the name of the cache file
+    """
+    deck = Deck.from_file(filename, use_cache=False)
+    try:
+        return deckcache.write_cache(filename, deck)
+    except(deckcache.CacheError) as cache_ex:
+        raise ConfigurationError(f"Deck could not be compiled: {cache_ex}")
+
 def block_padding(text: list, x_width: int):
     """
     When several lines of text are displayed as a block, left-aligned,
@@ -453,9 +1223,153 @@ def block_padding(text: list, x_width: int):
                         displayed
         x_width:        total width of the display window
     """
-    text_only = [x for x in text if(type(x) == str)]
-    longest_line = sorted(text_only, key=lambda x: len(x), reverse=True)[0]
-    return (x_width // 2) - (len(longest_line) // 2)
+    return (x_width // 2) - (longest_width(text) // 2)
+
+class RenderCache:
+    """
+    The lines (and block padding) of the card and topic pages that have
+    been shown, so that showing them again doesn't render them again
+
+    Pages are kept for the current screen width; when the screen is
+    resized, they're all thrown away. Only the RENDER_CACHE_SIZE pages
+    used most recently are kept.
+
+    Attributes
+    ----------
+    deck : Deck
+        The deck whose pages are cached
+    width : int
+        The width of the screen the pages are laid out for
+    pages : OrderedDict
+        (lines, padding) for each page, least recently used first
+    hits : int
+        The number of times a page was found in the cache
+    misses : int
+        The number of times a page had to be rendered
+
+    Methods
+    -------
+    card(card: Card, front: bool)
+        Get the lines and padding of one side of a card
+
+    topic(name: str)
+        Get the lines and padding of a topic's page
+
+    new_front(card: Card)
+        Forget the front of a card, so it gets a new hint next time
+
+    resize(width: int)
+        Lay pages out for a new screen width
+    """
+    def __init__(self, deck, width: int):
+        """
+        Parameters:
+            deck:           ``Deck`` object containing the cards to be displayed
+            width:          the width of the screen
+        """
+        self.deck = deck
+        self.width = width
+        self.pages = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key):
+        """Get a cached page, or None"""
+        page = self.pages.get(key)
+        if page is not None:
+            self.pages.move_to_end(key)
+            self.hits += 1
+        return page
+
+    def store(self, key, lines: list) -> tuple:
+        """Cache a page that has just been rendered"""
+        self.misses += 1
+        page = (lines, block_padding(lines, self.width))
+        self.pages[key] = page
+        if len(self.pages) > RENDER_CACHE_SIZE:
+            self.pages.popitem(last=False)
+        return page
+
+    def card(self, card, front: bool=False) -> tuple:
+        """
+        Get one side of a card, as (lines, padding)
+
+        Parameters:
+            card:           the ``Card`` to show
+            front:          True for the front of the card, False for the back
+        """
+        number = self.deck.position(card) if self.deck.numbered else None
+        key = ('card', card.title, front, number, self.width)
+        page = self.lookup(key)
+        if page is None:
+            page = self.store(key, card.display(self.deck.display_template,
+                                                self.deck.topics_for(card),
+                                                number, front=front))
+        return page
+
+    def topic(self, name: str) -> tuple:
+        """
+        Get the page listing the cards in a topic, as (lines, padding)
+
+        Parameters:
+            name:           the name of the topic
+        """
+        key = ('topic', name, self.width)
+        page = self.lookup(key)
+        if page is None:
+            lines = []
+            chosen_cards = self.deck.list(for_topic=name)
+            for n, card in enumerate(chosen_cards):
+                lines.extend(card.display(self.deck.display_template,
+                                          self.deck.topics_for(card)))
+                if n < len(chosen_cards) - 1:
+                    lines.append(SeparatorMarker(color=MENU_STYLE,
+                                                 mode=curses.A_BOLD))
+            page = self.store(key, lines)
+        return page
+
+    def new_front(self, card):
+        """
+        Forget the front of a card, which shows a hint picked at random,
+        so that a different one can be picked the next time the card is
+        chosen
+
+        Parameters:
+            card:           the ``Card`` that has just been chosen
+        """
+        number = self.deck.position(card) if self.deck.numbered else None
+        self.pages.pop(('card', card.title, True, number, self.width), None)
+
+    def resize(self, width: int):
+        """
+        Lay pages out for a new screen width, throwing away the old ones
+
+        Parameters:
+            width:          the new width of the screen
+        """
+        if width != self.width:
+            self.width = width
+            self.pages.clear()
+
+def show_error(stdscr, message: str, screen_height: int, screen_width: int):
+    """
+    Show an error message in the middle of the screen, and wait for the
+    user to press a key
+
+    Parameters:
+        stdscr:         handle to curses viewport
+        message:        the text of the error
+        screen_height:  number of rows on the screen
+        screen_width:   number of columns on the screen
+    """
+    stdscr.clear()
+    stdscr.addstr(
+        (screen_height // 2),
+        (screen_width // 2) - (display_width(message) // 2),
+        message, curses.color_pair(MENU_STYLE))
+    show_text("Press any key to continue...",
+            (screen_height - 2), screen_width, stdscr)
+    stdscr.getch()
 
 def do_loop(stdscr, deck):
     """
@@ -474,8 +1388,15 @@ def do_loop(stdscr, deck):
     screen_height, screen_width = stdscr.getmaxyx()
     main_window = curses.newwin(screen_height - 2, screen_width - 1, 0, 0)
     prompt_bar = curses.newwin(1, screen_width - 1, screen_height - 2, 0)
+    pages = RenderCache(deck, screen_width)
     chosen_card = None
     while(True):
+        if stdscr.getmaxyx() != (screen_height, screen_width):
+            # The terminal was resized, so the pages have to be laid out again
+            screen_height, screen_width = stdscr.getmaxyx()
+            main_window = curses.newwin(screen_height - 2, screen_width - 1, 0, 0)
+            prompt_bar = curses.newwin(1, screen_width - 1, screen_height - 2, 0)
+            pages.resize(screen_width)
         stdscr.clear()
         main_window.clear()
         prompt_bar.clear()
@@ -496,50 +1417,27 @@ def do_loop(stdscr, deck):
                                 color=MENU_STYLE, mode=curses.A_BOLD)
         elif (deck.current_menu_level == CARD_FRONT_DISPLAY_LEVEL) or \
              (deck.current_menu_level == CARD_BACK_DISPLAY_LEVEL):
-            if deck.numbered:
-                num = deck.data.index(chosen_card) + 1
-            else:
-                num = None
-            if deck.current_menu_level == CARD_FRONT_DISPLAY_LEVEL:
-                card_contents = chosen_card.display(deck.display_template,
-                                                    deck.topics, num,
-                                                    front=True)
-            else:
-                card_contents = chosen_card.display(deck.display_template,
-                                                    deck.topics, num,
-                                                    front=False)
+            card_contents, padding = pages.card(chosen_card,
+                front=(deck.current_menu_level == CARD_FRONT_DISPLAY_LEVEL))
             y_index = (screen_height // 2) - (len(card_contents) // 2)
             for line in card_contents:
                 show_text( line, y_index, screen_width, main_window,
                                         alignment=LEFT_ALIGNED,
-                                        left_padding=block_padding(card_contents,
-                                            screen_width)
+                                        left_padding=padding
                                         )
                 y_index += 1
             show_text(deck.prompt_text(), 0, screen_width, prompt_bar,
                                 color=MENU_STYLE, mode=curses.A_BOLD)
         elif deck.current_menu_level == TOPIC_DISPLAY_LEVEL:
-            lines = []
             p = Paginator(  centered = False,
                             quit_prompt = f"{DEFAULT_MAIN_MENU_CHAR}: main menu",
                             quit_char = 'm', prompt_color=MENU_STYLE,
                             prompt_mode=curses.A_BOLD)
-            for card in chosen_cards:
-                for line in card.display(deck.display_template, deck.topics):
-                    lines.append(line)
-                    y_index += 1
-                if len(chosen_cards) > 1 and \
-                    chosen_cards.index(card) < (len(chosen_cards) - 1):
-                    lines.append(SeparatorMarker(color=MENU_STYLE,
-                                                 mode=curses.A_BOLD))
-                    y_index += 1
-            p.left_padding = block_padding(lines, screen_width)
-            try:
-                stdscr.refresh()
-                p.paginate(stdscr, lines)
-            except(PaginatorException):
-                deck.current_menu_level = MAIN_MENU_LEVEL
-                continue
+            lines, p.left_padding = pages.topic(chosen_topic)
+            stdscr.refresh()
+            p.paginate(stdscr, lines)
+            deck.current_menu_level = MAIN_MENU_LEVEL
+            continue
         elif deck.current_menu_level == NUMBER_INPUT_LEVEL:
             pass
         else:
@@ -548,12 +1446,13 @@ def do_loop(stdscr, deck):
             deck.current_menu_level = MAIN_MENU_LEVEL
         main_window.border()
         main_window.addstr(0,
-                          (screen_width // 2) - (len(deck.deck_name) // 2),
+                          (screen_width // 2) - (display_width(deck.deck_name) // 2),
                           deck.deck_name,
                           curses.A_BOLD)
         main_window.refresh()
         prompt_bar.refresh()
         # 2) GET INPUT
+        deck.save_reviews()
         if deck.current_menu_level == NUMBER_INPUT_LEVEL:
             number_prompt = "Enter the number: "
             stdscr.clear()
@@ -573,16 +1472,12 @@ def do_loop(stdscr, deck):
                 if (int(key) > deck.data.__len__()) or (int(key) < 1):
                     error_prompt = "You can only enter a number between 1 and " +\
                                    f"{deck.data.__len__()}"
-                    stdscr.addstr(
-                        (screen_height // 2),
-                        (screen_width // 2) - (len(error_prompt) // 2),
-                        error_prompt, curses.color_pair(MENU_STYLE))
-                    show_text("Press any key to continue...",
-                            (screen_height - 2), screen_width, stdscr)
-                    stdscr.getch()
+                    show_error(stdscr, error_prompt, screen_height,
+                               screen_width)
                     continue
                 else:
                     chosen_card = deck.choose_card(int(key))
+                    pages.new_front(chosen_card)
                     continue
             except(ValueError):
                 continue
@@ -594,6 +1489,15 @@ def do_loop(stdscr, deck):
         elif deck.current_menu_level == MAIN_MENU_LEVEL:
             if char1 == ord(DEFAULT_RANDOM_MENU_CHAR):
                 chosen_card = deck.random_card()
+                pages.new_front(chosen_card)
+                continue
+            elif char1 == ord(DEFAULT_STUDY_MENU_CHAR):
+                chosen_card = deck.study_card()
+                if chosen_card is None:
+                    show_error(stdscr, NO_CARDS_TO_STUDY, screen_height,
+                               screen_width)
+                else:
+                    pages.new_front(chosen_card)
                 continue
             elif char1 == ord(DEFAULT_NUMBERED_MENU_CHAR):
                 if deck.numbered:
@@ -604,7 +1508,6 @@ def do_loop(stdscr, deck):
                 chosen_topic = deck.find_topic(chr(char1))
                 if chosen_topic == None:
                     continue
-                chosen_cards = deck.list(for_topic=chosen_topic)
                 deck.current_menu_level = TOPIC_DISPLAY_LEVEL
         elif char1 == ord(DEFAULT_TOGGLE_CHAR):
             if deck.current_menu_level == CARD_FRONT_DISPLAY_LEVEL:
@@ -616,13 +1519,23 @@ def do_loop(stdscr, deck):
              (deck.current_menu_level == CARD_BACK_DISPLAY_LEVEL):
             if char1 == ord(DEFAULT_MAIN_MENU_CHAR):
                 deck.current_menu_level = MAIN_MENU_LEVEL
+            elif deck.studying and \
+                 deck.current_menu_level == CARD_BACK_DISPLAY_LEVEL and \
+                 ord(str(LOWEST_GRADE)) <= char1 <= ord(str(HIGHEST_GRADE)):
+                deck.grade(chosen_card, char1 - ord('0'))
+                chosen_card = deck.study_card()
+                pages.new_front(chosen_card)
         else:
             deck.current_menu_level = 99
 
 if __name__ == "__main__":
     try:
-        with open(sys.argv[1]) as sourcefile:
-            cards = Deck(sourcefile.read())
+        if sys.argv[1] == COMPILE_COMMAND:
+            for filename in sys.argv[2:]:
+                print(f"Compiled {filename} to {compile_deck(filename)}")
+            quit()
+        cards = Deck.from_file(sys.argv[1])
+        cards.keep_reviews(sys.argv[1] + JOURNAL_SUFFIX)
     except(IndexError):
         print("ERROR: please specify a source file for the data")
         quit()
@@ -630,4 +1543,7 @@ if __name__ == "__main__":
         print(f"Error in source file: {str(cfg_ex)}")
         quit()
 
-    curses.wrapper(do_loop, cards)
+    try:
+        curses.wrapper(do_loop, cards)
+    finally:
+        cards.close()
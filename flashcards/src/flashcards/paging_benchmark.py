@@ -0,0 +1,218 @@
+"""
+Benchmarks for the paging engine in screen_utils
+
+Every app that pages through text (flashcards, presidents.py and
+wpreader.py) uses the same engine, so a change measured here shows up in
+all of them. The benchmarks time the renderer-agnostic parts of the engine:
+building page tables, jumping between pages, laying out the rows of a page,
+and opening a memory-mapped document with and without its cached index.
+Drawing is measured on a VirtualScreen, which needs no terminal, and counts
+the bytes that each page turn would send to one; the same page turns are
+also sent by RepaintingPaginator, which blanks and repaints the whole
+terminal on every page turn (as the engine used to), for comparison.
+
+Usage:
+
+   `$ python paging_benchmark.py [total-lines]`
+"""
+import os, sys, random, tempfile, time
+import screen_utils
+from screen_utils import *
+from virtual_screen import VirtualScreen
+
+DEFAULT_TOTAL_LINES     = 200000
+PAGE_HEIGHT             = 40
+PAGE_WIDTH              = 100
+TOTAL_JUMPS             = 10000
+TOTAL_PAGE_TURNS        = 200
+
+class RepaintingPaginator(Paginator):
+    """
+    A Paginator that sends page turns the way the engine used to: the
+    screen is blanked and refreshed before each page is drawn, and the
+    prompt is redrawn with clear() on every keypress, which makes curses
+    repaint the whole terminal
+    """
+    def paginate(self, scr_obj, /, data, first_line=0):
+        self.scr_obj = scr_obj
+        super().paginate(scr_obj, data, first_line)
+
+    def window_renderer(self, *args):
+        show_page = super().window_renderer(*args)
+        def blank_and_show_page(page):
+            self.scr_obj.erase()
+            self.scr_obj.refresh()
+            show_page(page)
+        return blank_and_show_page
+
+    def show_prompt(self, prompt, menu_message):
+        self.shown_prompt = None
+        prompt.clear()
+        super().show_prompt(prompt, menu_message)
+
+def sample_lines(total_lines: int) -> list:
+    """
+    Generate a document of lines of varying length (some of them wider
+    than a page, so that wrapping matters)
+
+    Parameters:
+        total_lines:    number of lines to generate
+    """
+    return [f"{y:08} " + chr(ord('a') + y % 26) * ((y * 37) % (PAGE_WIDTH * 2))
+            + '\n' for y in range(total_lines)]
+
+def timed(function, repeat=3):
+    """
+    Run a function several times, and return the best time (in seconds)
+    along with the function's result
+
+    Parameters:
+        function:       the function to time (takes no arguments)
+        repeat:         number of times to run it
+    """
+    best, result = None, None
+    for i in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+def run(total_lines: int=DEFAULT_TOTAL_LINES) -> list:
+    """
+    Run all of the benchmarks
+
+    Parameters:
+        total_lines:    number of lines in the sample document
+
+    Returns:            a list of (description, seconds, count) tuples,
+                        where count is the number of operations timed
+    """
+    results = []
+    data = sample_lines(total_lines)
+    paginator = Paginator(windowed=True, wrap=True)
+
+    seconds, pager = timed(lambda: Pager(data, PAGE_HEIGHT))
+    results.append(("page table, one row per line", seconds, 1))
+    seconds, wrapped = timed(lambda: Pager(data, PAGE_HEIGHT,
+                                paginator.row_counts(data, PAGE_WIDTH)))
+    results.append(("page table, wrapped lines", seconds, 1))
+
+    pages = [random.randrange(len(wrapped)) for i in range(TOTAL_JUMPS)]
+    def jump():
+        for page in pages:
+            wrapped.go_to(page)
+            wrapped.page_lines()
+    seconds, ignored = timed(jump)
+    results.append(("jump to a random page", seconds, TOTAL_JUMPS))
+
+    def layout():
+        for page in pages[:1000]:
+            for line in wrapped.page_lines(page):
+                paginator.layout_rows(line, PAGE_WIDTH)
+    seconds, ignored = timed(layout)
+    results.append(("lay out the rows of a page", seconds, 1000))
+
+    for windowed in [False, True]:
+        seconds, ignored = timed(lambda: render(data, windowed))
+        renderer = "window" if windowed else "pad"
+        results.append((f"render a page turn, {renderer}", seconds,
+                        TOTAL_PAGE_TURNS))
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'benchmark.txt')
+        with open(filename, 'w') as f:
+            f.writelines(data)
+        def open_cold():
+            if os.path.exists(filename + INDEX_SUFFIX):
+                os.remove(filename + INDEX_SUFFIX)
+            MappedDocument(filename).close()
+        seconds, ignored = timed(open_cold)
+        results.append(("open mapped document, no index", seconds, 1))
+        def open_warm():
+            document = MappedDocument(filename)
+            document.close()
+        seconds, ignored = timed(open_warm)
+        results.append(("open mapped document, cached index", seconds, 1))
+        document = MappedDocument(filename)
+        mapped = Pager(document, PAGE_HEIGHT)
+        def fetch():
+            for page in pages:
+                mapped.page_lines(page % len(mapped))
+        seconds, ignored = timed(fetch)
+        results.append(("read a page from a mapped document", seconds,
+                        TOTAL_JUMPS))
+        del mapped
+        document.close()
+    return results
+
+def render(data, windowed, paginator_class=Paginator):
+    """
+    Page forward through a document on a VirtualScreen, and return the
+    screen (which has counted the bytes sent to it)
+
+    Parameters:
+        data:           lines of text to page through
+        windowed:       True to draw one page at a time, False to use a pad
+        paginator_class:    Paginator, or RepaintingPaginator
+    """
+    keys = DEFAULT_FWD_CHAR * TOTAL_PAGE_TURNS + DEFAULT_QUIT_CHAR
+    vscreen = VirtualScreen(PAGE_HEIGHT + 2 * VERTICAL_MARGIN,
+                            PAGE_WIDTH + HORIZONTAL_MARGIN, keys=keys)
+    # Only the pages that will be shown (the pad renderer draws them all)
+    data = data[:PAGE_HEIGHT * (TOTAL_PAGE_TURNS + 1)]
+    previous = screen_utils.use_screen(vscreen)
+    try:
+        paginator_class(windowed=windowed).paginate(vscreen.initscr(), data)
+    finally:
+        screen_utils.use_screen(previous)
+    return vscreen
+
+def page_turn_traffic(total_lines: int=DEFAULT_TOTAL_LINES) -> dict:
+    """
+    Measure how many bytes a page turn sends to the terminal
+
+    Parameters:
+        total_lines:    number of lines in the sample document
+
+    Returns:            average bytes per page turn, keyed by renderer
+                        ("pad", "window", and "full repaint" for a
+                        RepaintingPaginator in windowed mode)
+    """
+    data = sample_lines(total_lines)
+    traffic = {}
+    for windowed in [False, True]:
+        vscreen = render(data, windowed)
+        traffic["window" if windowed else "pad"] = (vscreen.bytes_sent
+                                                    / TOTAL_PAGE_TURNS)
+    vscreen = render(data, True, RepaintingPaginator)
+    traffic["full repaint"] = vscreen.bytes_sent / TOTAL_PAGE_TURNS
+    return traffic
+
+def report(results: list) -> str:
+    """
+    Format benchmark results as a table
+
+    Parameters:
+        results:        list returned by run()
+    """
+    lines = []
+    for description, seconds, count in results:
+        per_operation = seconds / count
+        lines.append(f"{description:<40} {per_operation * 1e6:>12.2f} us")
+    return '\n'.join(lines)
+
+if __name__ == "__main__":
+    try:
+        total_lines = int(sys.argv[1])
+    except(IndexError):
+        total_lines = DEFAULT_TOTAL_LINES
+    except(ValueError):
+        print("Please tell me how many lines the sample document should have")
+        quit()
+    print(f"Paging through {total_lines} lines, "
+          f"{PAGE_HEIGHT} rows by {PAGE_WIDTH} columns per page")
+    print(report(run(total_lines)))
+    for renderer, sent in page_turn_traffic(total_lines).items():
+        print(f"{'bytes sent per page turn, ' + renderer:<40} {sent:>12.0f} B")
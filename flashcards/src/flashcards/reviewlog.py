@@ -0,0 +1,353 @@
+"""
+A durable record of flashcard reviews
+
+Every grade the user gives a card while studying is appended to a journal:
+a binary file of length-prefixed records, each holding the card's title,
+the time of the review and the grade, followed by a CRC-32 of the record.
+Recording a review only adds it to a buffer; flush() writes the buffer
+out. If the program stops part of the way through a write, the incomplete
+record at the end of the journal fails its check, and is dropped the next
+time the journal is opened.
+
+Nothing is written until the first review is flushed, so a deck that's
+only browsed leaves no files behind. Callers should flush() whenever the
+program is about to wait for the user, so that a session that ends
+without close() (a crash, or a closed terminal) loses nothing that was
+graded before it ended; flashcards does so before every keypress, so each
+review is written on the keypress that graded it. If the journal can't be
+written (in a read-only directory, say), a warning is logged and reviews
+are no longer saved; studying carries on regardless.
+
+When the journal gets long, it's compacted: the state of every card (see
+scheduler.Scheduler) is saved in a snapshot, and the journal starts again
+from empty. Each snapshot and journal has a generation number; a journal
+older than the snapshot has already been compacted into it, which makes
+the switch from one to the other safe at any point. A journal that's
+newer than the snapshot (or has no snapshot at all) is replayed anyway,
+and kept, with a warning, rather than thrown away. A snapshot whose length
+doesn't add up raises ValueError, rather than restoring only part of
+what it held.
+
+Usage:
+
+    log = ReviewLog('deck.json.reviews')
+    log.restore(scheduler, titles)      # titles maps title -> position
+    ...
+    log.record(card.title, when, grade)
+    ...
+    log.close()
+"""
+import logging, os, struct, sys, zlib
+from array import array
+
+JOURNAL_SUFFIX      = '.reviews'
+SNAPSHOT_SUFFIX     = '.snapshot'
+JOURNAL_MAGIC       = b'FCREVLOG'
+SNAPSHOT_MAGIC      = b'FCREVSNP'
+FILE_HEADER         = struct.Struct('<8sQ')
+SNAPSHOT_HEADER     = struct.Struct('<Q')
+RECORD_LENGTH       = struct.Struct('<I')
+RECORD_FIELDS       = struct.Struct('<dB')
+RECORD_CHECK        = struct.Struct('<I')
+# The columns of a snapshot, after its headers: the length of each title,
+# then the repetitions, intervals, easiness and due time of each card
+SNAPSHOT_COLUMNS    = ['I', 'I', 'I', 'd', 'd']
+COMPACT_RECORDS     = 10000
+
+logger = logging.getLogger(__name__)
+
+class ReviewLog:
+    """
+    A journal of reviews, with a snapshot of the reviews before it
+
+    Attributes
+    ----------
+    filename : str
+        The name of the journal (the snapshot's name adds SNAPSHOT_SUFFIX)
+    generation : int
+        The number of times the journal has been compacted
+    records : int
+        The number of reviews in the journal
+    saving : bool
+        False once the journal couldn't be written, and reviews are no
+        longer being saved
+
+    Methods
+    -------
+    restore(scheduler: Scheduler, titles: dict)
+        Replay the snapshot and the journal into a scheduler
+
+    record(title: str, when: float, grade: int)
+        Add a review to the journal
+
+    flush()
+        Write any reviews that are waiting to be written (creating the
+        journal, if this is the first)
+
+    compact(scheduler: Scheduler, titles: list)
+        Save a snapshot of a scheduler, and empty the journal
+
+    close()
+        Write any waiting reviews, and close the journal
+    """
+    def __init__(self, filename: str):
+        """
+        Parameters:
+            filename:       name of the journal file
+        """
+        self.filename = filename
+        self.snapshot_filename = filename + SNAPSHOT_SUFFIX
+        self.pending = bytearray()
+        self.records = 0
+        self.generation = 0
+        self.journal = None
+        self.saving = True
+        # Where to carry on writing an existing journal (None to start a
+        # new one)
+        self.append_at = None
+
+    def read_snapshot(self):
+        """
+        Read the snapshot, if there is one
+
+        Returns:            (generation, titles, repetitions, intervals,
+                            easiness, due), or None
+
+        Raises ValueError if the file isn't a snapshot, or is incomplete.
+        """
+        try:
+            with open(self.snapshot_filename, 'rb') as ifile:
+                contents = ifile.read()
+        except(FileNotFoundError):
+            return None
+        try:
+            magic, generation = FILE_HEADER.unpack_from(contents, 0)
+            if magic != SNAPSHOT_MAGIC:
+                raise ValueError(f"{self.snapshot_filename} is not a snapshot")
+            position = FILE_HEADER.size
+            (total_cards,) = SNAPSHOT_HEADER.unpack_from(contents, position)
+        except(struct.error):
+            raise ValueError(f"{self.snapshot_filename} is incomplete")
+        position += SNAPSHOT_HEADER.size
+        columns = []
+        for typecode in SNAPSHOT_COLUMNS:
+            column = array(typecode)
+            size = column.itemsize * total_cards
+            if position + size > len(contents):
+                raise ValueError(f"{self.snapshot_filename} is incomplete")
+            column.frombytes(contents[position:position + size])
+            if sys.byteorder != 'little':
+                column.byteswap()
+            position += size
+            columns.append(column)
+        title_lengths = columns.pop(0)
+        # The titles take up the rest of the file, exactly
+        if position + sum(title_lengths) != len(contents):
+            raise ValueError(f"{self.snapshot_filename} is the wrong length")
+        titles = []
+        try:
+            for length in title_lengths:
+                titles.append(
+                    contents[position:position + length].decode('utf-8'))
+                position += length
+        except(UnicodeDecodeError):
+            raise ValueError(f"{self.snapshot_filename} is damaged")
+        return (generation, titles, *columns)
+
+    def read_journal(self):
+        """
+        Generate the (title, when, grade) records in the journal, stopping
+        at the first one that's incomplete or damaged; afterwards,
+        self.journal_end is the end of the last good record
+        """
+        self.journal_end = 0
+        try:
+            with open(self.filename, 'rb') as ifile:
+                contents = ifile.read()
+        except(FileNotFoundError):
+            self.journal_generation = None
+            return
+        if len(contents) < FILE_HEADER.size:
+            self.journal_generation = None
+            return
+        magic, self.journal_generation = FILE_HEADER.unpack_from(contents, 0)
+        if magic != JOURNAL_MAGIC:
+            raise ValueError(f"{self.filename} is not a review journal")
+        position = FILE_HEADER.size
+        self.journal_end = position
+        while position + RECORD_LENGTH.size <= len(contents):
+            (length,) = RECORD_LENGTH.unpack_from(contents, position)
+            start = position + RECORD_LENGTH.size
+            end = start + length
+            if length < RECORD_FIELDS.size or \
+               end + RECORD_CHECK.size > len(contents):
+                return
+            record = contents[start:end]
+            (check,) = RECORD_CHECK.unpack_from(contents, end)
+            if zlib.crc32(record) != check:
+                return
+            when, grade = RECORD_FIELDS.unpack_from(record, 0)
+            title = record[RECORD_FIELDS.size:].decode('utf-8')
+            position = end + RECORD_CHECK.size
+            self.journal_end = position
+            yield title, when, grade
+
+    def restore(self, scheduler, titles: dict):
+        """
+        Replay the snapshot and then the journal into a scheduler. New
+        reviews are added to the end of the journal, once there are any.
+
+        Parameters:
+            scheduler:      the Scheduler for the deck
+            titles:         the 0-based position of each card, by title
+                            (reviews of cards not in the deck are skipped)
+        """
+        snapshot = self.read_snapshot()
+        if snapshot is not None:
+            self.generation, names, repetitions, intervals, easiness, due = \
+                snapshot
+            for n, title in enumerate(names):
+                position = titles.get(title)
+                if position is not None:
+                    scheduler.restore(position, repetitions[n], intervals[n],
+                                      easiness[n], due[n])
+        self.records = 0
+        self.append_at = None
+        journal = list(self.read_journal())
+        if self.journal_generation is None:
+            return
+        if snapshot is not None and self.journal_generation < self.generation:
+            # Compacted into the snapshot already, so it can be replaced
+            return
+        if snapshot is None and self.journal_generation > 0:
+            logger.warning(f"{self.snapshot_filename} is missing; restoring "
+                           f"the reviews in {self.filename} on their own")
+        elif self.journal_generation > self.generation:
+            logger.warning(f"{self.snapshot_filename} is older than "
+                           f"{self.filename}; restoring both")
+        self.generation = self.journal_generation
+        for title, when, grade in journal:
+            position = titles.get(title)
+            if position is not None:
+                scheduler.review(position, grade, when)
+            self.records += 1
+        # Anything after the last good record is dropped, once there's a
+        # new one to write
+        self.append_at = self.journal_end
+
+    def start_journal(self):
+        """Replace the journal with an empty one, for this generation"""
+        if self.journal is not None:
+            self.journal.close()
+        temporary = self.filename + '.tmp'
+        with open(temporary, 'wb') as ofile:
+            ofile.write(FILE_HEADER.pack(JOURNAL_MAGIC, self.generation))
+            ofile.flush()
+            os.fsync(ofile.fileno())
+        os.replace(temporary, self.filename)
+        self.journal = open(self.filename, 'r+b')
+        self.journal.seek(0, os.SEEK_END)
+
+    def open_journal(self):
+        """Open the journal to add reviews to it, creating it if need be"""
+        if self.append_at is None:
+            self.start_journal()
+        else:
+            self.journal = open(self.filename, 'r+b')
+            self.journal.truncate(self.append_at)
+            self.journal.seek(self.append_at)
+            self.append_at = None
+
+    def stop_saving(self, error: OSError):
+        """Give up on the journal, after an error writing it"""
+        logger.warning(f"Reviews will not be saved: {error}")
+        self.saving = False
+        self.pending.clear()
+        if self.journal is not None:
+            try:
+                self.journal.close()
+            except(OSError):
+                pass
+            self.journal = None
+
+    def record(self, title: str, when: float, grade: int):
+        """
+        Add a review to the journal (written by the next flush())
+
+        Parameters:
+            title:          the title of the card reviewed
+            when:           the time of the review
+            grade:          the grade the user gave
+        """
+        if not self.saving:
+            return
+        record = RECORD_FIELDS.pack(when, grade) + title.encode('utf-8')
+        self.pending += RECORD_LENGTH.pack(len(record))
+        self.pending += record
+        self.pending += RECORD_CHECK.pack(zlib.crc32(record))
+        self.records += 1
+
+    def flush(self):
+        """Write any reviews that are waiting to be written"""
+        if not self.saving or len(self.pending) == 0:
+            return
+        try:
+            if self.journal is None:
+                self.open_journal()
+            self.journal.write(self.pending)
+            self.journal.flush()
+        except(OSError) as write_ex:
+            self.stop_saving(write_ex)
+            return
+        self.pending.clear()
+
+    def compact(self, scheduler, titles: list):
+        """
+        Save the state of every card in a snapshot, and start a new,
+        empty journal
+
+        Parameters:
+            scheduler:      the Scheduler for the deck
+            titles:         the title of each card, in deck order
+        """
+        self.flush()
+        if not self.saving:
+            return
+        try:
+            self.write_snapshot(scheduler, titles)
+            self.start_journal()
+            self.records = 0
+        except(OSError) as write_ex:
+            self.stop_saving(write_ex)
+
+    def write_snapshot(self, scheduler, titles: list):
+        """Save the state of every card, as the next generation"""
+        self.generation += 1
+        names = [title.encode('utf-8') for title in titles]
+        columns = [array('I', map(len, names)), scheduler.repetitions,
+                   scheduler.intervals, scheduler.easiness, scheduler.due]
+        temporary = self.snapshot_filename + '.tmp'
+        with open(temporary, 'wb') as ofile:
+            ofile.write(FILE_HEADER.pack(SNAPSHOT_MAGIC, self.generation))
+            ofile.write(SNAPSHOT_HEADER.pack(len(titles)))
+            for column in columns:
+                if sys.byteorder != 'little':
+                    column = array(column.typecode, column)
+                    column.byteswap()
+                ofile.write(column.tobytes())
+            ofile.write(b''.join(names))
+            ofile.flush()
+            os.fsync(ofile.fileno())
+        os.replace(temporary, self.snapshot_filename)
+
+    def close(self):
+        """Write any waiting reviews, and close the journal"""
+        self.flush()
+        if self.journal is None:
+            return
+        try:
+            os.fsync(self.journal.fileno())
+            self.journal.close()
+        except(OSError) as write_ex:
+            self.stop_saving(write_ex)
+        self.journal = None
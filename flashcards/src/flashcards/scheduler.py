@@ -0,0 +1,164 @@
+"""
+Spaced-repetition scheduling for flashcards
+
+A Scheduler decides which card to study next, using the SM-2 algorithm:
+each time a card is reviewed, the user grades their answer from 0
+(complete blackout) to 5 (perfect recall), and the card is put off for an
+interval that grows with every successful review, faster for cards that
+are easy to remember. A card that's answered badly starts again from a
+short interval.
+
+Cards are identified by their 0-based position in the deck. The next card
+due is kept at the top of a heap, so picking it costs O(log n) however big
+the deck is; cards that have never been reviewed are due straight away,
+in deck order.
+"""
+import heapq, time
+from array import array
+
+LOWEST_GRADE        = 0
+HIGHEST_GRADE       = 5
+PASSING_GRADE       = 3
+INITIAL_EASINESS    = 2.5
+MINIMUM_EASINESS    = 1.3
+FIRST_INTERVAL      = 1
+SECOND_INTERVAL     = 6
+SECONDS_PER_DAY     = 24 * 60 * 60
+
+class SchedulerError(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+
+class Scheduler:
+    """
+    The review history and next due time of every card in a deck
+
+    Attributes
+    ----------
+    repetitions : array
+        The number of successful reviews in a row, for each card
+    intervals : array
+        The number of days each card was last put off for
+    easiness : array
+        The SM-2 easiness factor of each card
+    due : array
+        The time (in seconds since the epoch) when each card is next due
+    reviews : int
+        The total number of reviews recorded
+
+    Methods
+    -------
+    next_due()
+        Get the position of the card that's due soonest
+
+    review(position: int, grade: int, when: float=None)
+        Record the user's grade for a card, and reschedule it
+
+    restore(position: int, repetitions: int, interval: int,
+            easiness: float, due: float)
+        Set the state of a card, as saved from an earlier session
+
+    due_count(when: float=None)
+        Count the cards that are due
+    """
+    def __init__(self, total_cards: int, clock=time.time):
+        """
+        Parameters:
+            total_cards:    the number of cards in the deck
+            clock:          function that returns the current time
+        """
+        self.clock = clock
+        self.repetitions = array('I', [0]) * total_cards
+        self.intervals = array('I', [0]) * total_cards
+        self.easiness = array('d', [INITIAL_EASINESS]) * total_cards
+        self.due = array('d', [0.0]) * total_cards
+        self.reviews = 0
+        # Entries are (due time, position). Rescheduling a card pushes a
+        # new entry, and the old one is dropped when it reaches the top.
+        self.queue = [(0.0, position) for position in range(total_cards)]
+
+    def __len__(self):
+        """The number of cards being scheduled"""
+        return len(self.due)
+
+    def next_due(self) -> int:
+        """
+        Get the position of the card that's due soonest (which may not be
+        due yet, if the user is ahead of schedule)
+        """
+        queue = self.queue
+        while len(queue) > 0:
+            when, position = queue[0]
+            if when == self.due[position]:
+                return position
+            heapq.heappop(queue)
+        raise SchedulerError("There are no cards to schedule")
+
+    def review(self, position: int, grade: int, when: float=None):
+        """
+        Record the user's grade for a card, and reschedule it
+
+        Parameters:
+            position:       the 0-based position of the card in the deck
+            grade:          how well the user remembered the card, from
+                            LOWEST_GRADE to HIGHEST_GRADE
+            when:           the time of the review (defaults to now)
+        """
+        if not (LOWEST_GRADE <= grade <= HIGHEST_GRADE):
+            raise SchedulerError(f"Grades run from {LOWEST_GRADE} to " +\
+                                 f"{HIGHEST_GRADE}, not {grade}")
+        if when is None:
+            when = self.clock()
+        if grade >= PASSING_GRADE:
+            if self.repetitions[position] == 0:
+                interval = FIRST_INTERVAL
+            elif self.repetitions[position] == 1:
+                interval = SECOND_INTERVAL
+            else:
+                interval = round(self.intervals[position] *
+                                 self.easiness[position])
+            self.repetitions[position] += 1
+        else:
+            interval = FIRST_INTERVAL
+            self.repetitions[position] = 0
+        misses = HIGHEST_GRADE - grade
+        self.easiness[position] = max(MINIMUM_EASINESS,
+                                      self.easiness[position] + 0.1 -
+                                      misses * (0.08 + misses * 0.02))
+        self.intervals[position] = interval
+        self.due[position] = when + interval * SECONDS_PER_DAY
+        self.reviews += 1
+        heapq.heappush(self.queue, (self.due[position], position))
+        if len(self.queue) > 2 * len(self.due) + 1:
+            # Too many entries for cards that have been rescheduled
+            self.queue = [(due, n) for n, due in enumerate(self.due)]
+            heapq.heapify(self.queue)
+
+    def restore(self, position: int, repetitions: int, interval: int,
+                easiness: float, due: float):
+        """
+        Set the state of a card, as saved from an earlier session
+
+        Parameters:
+            position:       the 0-based position of the card in the deck
+            repetitions:    the number of successful reviews in a row
+            interval:       the number of days the card was last put off for
+            easiness:       the card's easiness factor
+            due:            the time when the card is next due
+        """
+        self.repetitions[position] = repetitions
+        self.intervals[position] = interval
+        self.easiness[position] = easiness
+        self.due[position] = due
+        heapq.heappush(self.queue, (self.due[position], position))
+
+    def due_count(self, when: float=None) -> int:
+        """
+        Count the cards that are due
+
+        Parameters:
+            when:           the time to count them at (defaults to now)
+        """
+        if when is None:
+            when = self.clock()
+        return sum(1 for due in self.due if due <= when)
@@ -1,4 +1,28 @@
-import curses, sys, re
+import curses, sys, re, os, mmap, struct, hashlib, bisect, functools
+import unicodedata
+from array import array
+
+# The names that `from screen_utils import *` brings in (the modules that
+# this one imports, and the screen backend, which use_screen() replaces,
+# are left out)
+__all__ = [
+    'HORIZONTAL_MARGIN', 'VERTICAL_MARGIN', 'ERROR_DELAY_TIME',
+    'DEFAULT_FWD_PROMPT', 'DEFAULT_FWD_CHAR', 'DEFAULT_BWD_PROMPT',
+    'DEFAULT_BWD_CHAR', 'DEFAULT_QUIT_PROMPT', 'DEFAULT_QUIT_CHAR',
+    'DEFAULT_JUMP_PROMPT', 'DEFAULT_PERCENT_PROMPT', 'DEFAULT_ENDS_PROMPT',
+    'SHORT_JUMP_PROMPT', 'DEFAULT_GOTO_CHAR', 'DEFAULT_PERCENT_CHAR',
+    'DEFAULT_FIRST_CHAR', 'DEFAULT_LAST_CHAR', 'GOTO_PAGE_QUESTION',
+    'GOTO_PERCENT_QUESTION', 'DEFAULT_MSG', 'MISSING_SOURCE_MSG',
+    'WRONG_FORMAT_MSG', 'INDEX_SUFFIX', 'INDEX_MAGIC', 'INDEX_HEADER',
+    'INDEX_SAMPLE_SIZE', 'WIDTH_CACHE_SIZE', 'WIDE_CHARACTERS',
+    'ZERO_WIDTH_CATEGORIES', 'TITLE_STYLE', 'MENU_STYLE', 'TEXT_STYLE',
+    'CENTERED', 'LEFT_ALIGNED', 'RIGHT_ALIGNED',
+    'use_screen', 'char_width', 'measure_width', 'display_width',
+    'longest_width', 'clip', 'split_rows', 'center_text', 'center',
+    'show_text', 'SeparatorMarker', 'draw_separator', 'PaginatorException',
+    'index_lines', 'source_digest', 'save_index', 'load_index',
+    'MappedDocument', 'PageTable', 'Pager', 'Paginator',
+]
 
 HORIZONTAL_MARGIN       = 3
 VERTICAL_MARGIN         = 3
@@ -9,11 +33,31 @@ DEFAULT_BWD_PROMPT      = "b: backward"
 DEFAULT_BWD_CHAR        = 'b'
 DEFAULT_QUIT_PROMPT     = "q: quit"
 DEFAULT_QUIT_CHAR       = 'q'
+DEFAULT_JUMP_PROMPT     = "g: go to page"
+DEFAULT_PERCENT_PROMPT  = "%: go to percent"
+DEFAULT_ENDS_PROMPT     = "<, >: first, last page"
+# Shown instead of the three prompts above, when they don't all fit
+SHORT_JUMP_PROMPT       = "g, %, <, >: jump"
+DEFAULT_GOTO_CHAR       = 'g'
+DEFAULT_PERCENT_CHAR    = '%'
+DEFAULT_FIRST_CHAR      = '<'
+DEFAULT_LAST_CHAR       = '>'
+GOTO_PAGE_QUESTION      = "Go to page: "
+GOTO_PERCENT_QUESTION   = "Go to percent: "
 DEFAULT_MSG             = "Unspecified paginator error"
 MISSING_SOURCE_MSG      = "Source document not found"
 WRONG_FORMAT_MSG        = "Source document needs to be plain text, "\
                           "with .txt extension"
-PAGINATION_DONE_MSG     = "User finished paging"
+INDEX_SUFFIX            = ".idx"
+INDEX_MAGIC             = b"PGINDEX1"
+INDEX_HEADER            = struct.Struct('<8sQQ16sQ')
+INDEX_SAMPLE_SIZE       = 65536
+WIDTH_CACHE_SIZE        = 65536
+# Characters that take up two columns (East Asian wide and full-width), and
+# the kinds that take up none (combining marks, and formatting characters
+# such as zero-width joiners)
+WIDE_CHARACTERS         = frozenset(['W', 'F'])
+ZERO_WIDTH_CATEGORIES   = frozenset(['Mn', 'Me', 'Cf'])
 
 TITLE_STYLE             = 1
 MENU_STYLE              = 2
@@ -23,6 +67,123 @@ CENTERED                = 10
 LEFT_ALIGNED            = 11
 RIGHT_ALIGNED           = 12
 
+# Everything in this module draws through the screen backend: normally the
+# curses module itself, or a stand-in with the same interface, such as a
+# virtual_screen.VirtualScreen (see use_screen).
+screen = curses
+
+def use_screen(backend):
+    """
+    Choose the screen backend for everything in this module to draw on
+
+    Parameters:
+        backend:    the curses module, or an object with the same interface
+
+    Returns:        the backend that was in use before
+    """
+    global screen
+    previous = screen
+    screen = backend
+    return previous
+
+def char_width(ch) -> int:
+    """The number of columns a character takes up on a terminal"""
+    if unicodedata.east_asian_width(ch) in WIDE_CHARACTERS:
+        return 2
+    if unicodedata.category(ch) in ZERO_WIDTH_CATEGORIES:
+        return 0
+    return 1
+
+@functools.lru_cache(maxsize=WIDTH_CACHE_SIZE)
+def measure_width(text) -> int:
+    """The number of columns a line of non-ASCII text takes up"""
+    return sum(map(char_width, text))
+
+def display_width(text) -> int:
+    """
+    The number of columns a line of text takes up on a terminal: its
+    length, unless it has wide characters (such as CJK ideographs and most
+    emoji), which take up two columns, or combining characters, which take
+    up none. The widths of non-ASCII lines are cached, since the same lines
+    are usually measured again every time they're shown.
+
+    Parameters:
+        text:       the text to be measured
+    """
+    if text.isascii():
+        return len(text)
+    return measure_width(text)
+
+def longest_width(lines) -> int:
+    """
+    The display width of the widest line, ignoring separators (and 0 if
+    there are no lines)
+
+    Parameters:
+        lines:      iterable container of text lines and SeparatorMarkers
+    """
+    return max((display_width(line) for line in lines
+                if isinstance(line, str)), default=0)
+
+def clip(text, x_width) -> str:
+    """
+    Cut a line of text down to the characters that fit in x_width columns
+
+    Parameters:
+        text:       the text to be clipped
+        x_width:    number of columns available
+    """
+    if text.isascii() or display_width(text) <= x_width:
+        return text[:x_width]
+    columns = 0
+    for n, ch in enumerate(text):
+        columns += char_width(ch)
+        if columns > x_width:
+            return text[:n]
+    return text
+
+def split_rows(text, x_width) -> list:
+    """
+    Break a line of text into rows of at most x_width columns (a wide
+    character that doesn't fit at the end of one row starts the next)
+
+    Parameters:
+        text:       the text to be broken up
+        x_width:    number of columns in each row
+    """
+    if text.isascii():
+        return [text[i:i + x_width] for i in range(0, len(text), x_width)] \
+               or ['']
+    rows = []
+    start, columns = 0, 0
+    for n, ch in enumerate(text):
+        width = char_width(ch)
+        if columns + width > x_width and n > start:
+            rows.append(text[start:n])
+            start, columns = n, 0
+        columns += width
+    rows.append(text[start:])
+    return rows
+
+def center_text(text, x_width) -> str:
+    """
+    Pad a line of text with spaces on both sides, to center it in x_width
+    columns (clipping it first, if it's too wide)
+
+    Parameters:
+        text:       the text to be centered
+        x_width:    number of columns in the line
+    """
+    text = clip(text, x_width)
+    spare = x_width - display_width(text)
+    return (' ' * (spare // 2)) + text + (' ' * (spare - spare // 2))
+
+def center(text, y_index, x_width, stdscr, *, color=0, mode=curses.A_NORMAL) -> None:
+    """Center the text"""
+    x_index = 0
+    attrs = screen.color_pair(color) | mode
+    stdscr.addstr(y_index, x_index, center_text(text, x_width), attrs)
+
 def show_text(text, y_index, x_width, scr_object, *, alignment=CENTERED,
               left_padding=None, color=0, mode=curses.A_NORMAL) -> None:
     """
@@ -39,26 +200,25 @@ def show_text(text, y_index, x_width, scr_object, *, alignment=CENTERED,
     """
     x_index = 0
     padding_width = (x_width // 7)
-    attrs = curses.color_pair(color) | mode
+    attrs = screen.color_pair(color) | mode
     try:
         if alignment == CENTERED:
-            fmtstring = "{:^" + str(x_width) + "s}"
             scr_object.addstr(  y_index, x_index,
-                                fmtstring.format(text)[:x_width],
+                                center_text(text, x_width),
                                 attrs)
         elif alignment == LEFT_ALIGNED:
             if left_padding != None:
                 padding_width = left_padding
             fmtstring = "{:" + str(padding_width) + "s}"
             scr_object.addstr(  y_index, x_index,
-                                fmtstring.format(' ') + text[:x_width],
+                                fmtstring.format(' ') + clip(text, x_width),
                                 attrs)
         else:
-            fmtstring = "{:>" + str(padding_width) + "s}"
+            spare = max(padding_width - display_width(text), 0)
             scr_object.addstr(  y_index, x_index,
-                                fmtstring.format(text)[:x_width],
+                                clip((' ' * spare) + text, x_width),
                                 attrs)
-    except curses.error:
+    except screen.error:
         # The size of the display (scr_object) is unknown outside this module.
         # It's a potentially hazardous situation, because
         # curses needs to advance the cursor position as it prints.
@@ -84,19 +244,331 @@ def draw_separator(y_index, length, width, scr_object, *, color=MENU_STYLE, mode
     """
     starting_point = (width // 2) - (length // 2)
     for i in range(starting_point, starting_point + length):
-        scr_object.addch(y_index, i, curses.ACS_HLINE,
-                         curses.color_pair(color) | mode)
+        scr_object.addch(y_index, i, screen.ACS_HLINE,
+                         screen.color_pair(color) | mode)
 
 class PaginatorException(Exception):
     def __init__(self, msg=DEFAULT_MSG):
         super().__init__(msg)
 
+def index_lines(buffer):
+    """
+    Find the byte offset at which each line of the buffer begins.
+
+    The result is an array with one more entry than there are lines: the
+    last entry is the size of the buffer, so line N occupies the bytes
+    from offsets[N] up to offsets[N + 1].
+    """
+    offsets = array('Q', [0])
+    position = buffer.find(b'\n')
+    while position != -1:
+        offsets.append(position + 1)
+        position = buffer.find(b'\n', position + 1)
+    if offsets[-1] != len(buffer):
+        offsets.append(len(buffer))
+    return offsets
+
+def source_digest(buffer):
+    """
+    Fingerprint a source file from its first and last blocks.
+
+    Reading the whole file would cost as much as rebuilding the index,
+    so the digest only samples it; the size and modification time in the
+    index header catch everything else.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(buffer[:INDEX_SAMPLE_SIZE])
+    digest.update(buffer[-INDEX_SAMPLE_SIZE:])
+    return digest.digest()
+
+def save_index(filename, buffer, offsets):
+    """
+    Write the line-offset index for a source file into a sidecar file
+    (the source filename plus INDEX_SUFFIX), keyed on the source's size,
+    modification time and digest.
+    """
+    stats = os.stat(filename)
+    header = INDEX_HEADER.pack(INDEX_MAGIC, stats.st_size, stats.st_mtime_ns,
+                               source_digest(buffer), len(offsets))
+    if sys.byteorder == 'big':
+        offsets = array('Q', offsets)
+        offsets.byteswap()
+    temp_name = filename + INDEX_SUFFIX + '.tmp'
+    with open(temp_name, 'wb') as f:
+        f.write(header)
+        f.write(offsets.tobytes())
+    os.replace(temp_name, filename + INDEX_SUFFIX)
+
+def load_index(filename, buffer):
+    """
+    Map the sidecar index for a source file, if there is one and it
+    still matches the source. Returns a tuple (mapping, offsets), or None
+    if the index needs to be rebuilt. The offsets are read straight out
+    of the mapping, so opening the index does not depend on its size.
+    """
+    try:
+        with open(filename + INDEX_SUFFIX, 'rb') as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    stats = os.stat(filename)
+    try:
+        magic, size, mtime, digest, count = \
+            INDEX_HEADER.unpack_from(mapping)
+    except struct.error:
+        mapping.close()
+        return None
+    if (magic != INDEX_MAGIC or size != stats.st_size
+            or mtime != stats.st_mtime_ns
+            or len(mapping) != INDEX_HEADER.size + (count * 8)
+            or digest != source_digest(buffer)
+            or sys.byteorder == 'big'):
+        mapping.close()
+        return None
+    offsets = memoryview(mapping)[INDEX_HEADER.size:].cast('Q')
+    return mapping, offsets
+
+class MappedDocument:
+    """
+    A text file that is mapped into memory and read one line at a time.
+
+    Only the line-offset index is built up front; the text of a line is
+    decoded when it is asked for, so opening a file costs one scan for
+    newlines, and resident memory is the index plus whatever pages the
+    paginator is showing. Supports len(), indexing, slicing and iteration,
+    like the list of lines returned by readlines().
+
+    The index is saved next to the source (see save_index), and reused
+    the next time the file is opened, until the source changes.
+    """
+    def __init__(self, filename, encoding='utf-8', cache_index=True):
+        self.filename = filename
+        self.encoding = encoding
+        self.index_mapping = None
+        self.file = open(filename, 'rb')
+        if os.fstat(self.file.fileno()).st_size > 0:
+            self.buffer = mmap.mmap(self.file.fileno(), 0,
+                                    access=mmap.ACCESS_READ)
+        else:
+            # mmap refuses to map an empty file
+            self.buffer = b''
+        cached = None
+        if cache_index == True:
+            cached = load_index(filename, self.buffer)
+        if cached is not None:
+            self.index_mapping, self.offsets = cached
+        else:
+            self.offsets = index_lines(self.buffer)
+            if cache_index == True:
+                try:
+                    save_index(filename, self.buffer, self.offsets)
+                except OSError:
+                    # No write access next to the source; the index
+                    # just won't be reused next time.
+                    pass
+
+    def line(self, n):
+        """Decode a single line, with universal newlines like open()"""
+        text = self.buffer[self.offsets[n]:self.offsets[n + 1]].decode(
+                    self.encoding, errors='replace')
+        if text.endswith('\r\n'):
+            text = text[:-2] + '\n'
+        return text
+
+    def lines(self, first, last):
+        """Get the lines from first up to (but not including) last"""
+        first = max(first, 0)
+        last = min(last, len(self))
+        return [self.line(n) for n in range(first, last)]
+
+    def line_widths(self):
+        """
+        Yield the display width of each line, without its line break (\n
+        or \r\n). Lines of pure ASCII are measured without being decoded.
+        """
+        buffer, offsets = self.buffer, self.offsets
+        for n in range(len(self)):
+            text = buffer[offsets[n]:offsets[n + 1]]
+            if text.isascii():
+                if text.endswith(b'\r\n'):
+                    yield len(text) - 2
+                elif text.endswith(b'\n'):
+                    yield len(text) - 1
+                else:
+                    yield len(text)
+            else:
+                yield display_width(self.line(n).rstrip('\n'))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            first, last, step = key.indices(len(self))
+            if step == 1:
+                return self.lines(first, last)
+            return [self.line(n) for n in range(first, last, step)]
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError('line number out of range')
+        return self.line(key)
+
+    def __iter__(self):
+        for n in range(len(self)):
+            yield self.line(n)
+
+    def close(self):
+        if self.index_mapping is not None:
+            self.offsets.release()
+            self.index_mapping.close()
+            self.index_mapping = None
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class PageTable:
+    """
+    Where each page of a document begins.
+
+    When every line takes up one row, each page holds page_height lines,
+    and the table is just arithmetic. When long lines wrap (row_counts
+    gives the number of rows each line needs), the first line of every
+    page is found once, in a single pass, and kept in an array. Either way,
+    finding a page, or the page that holds a given line, takes constant
+    (or logarithmic) time.
+    """
+    def __init__(self, total_lines, page_height, row_counts=None):
+        self.total_lines = total_lines
+        self.page_height = page_height
+        self.starts = None
+        if row_counts is not None:
+            self.starts = array('Q')
+            rows = page_height
+            for line_number, count in enumerate(row_counts):
+                # A line longer than a whole page is cut off at the bottom
+                count = min(max(count, 1), page_height)
+                if rows + count > page_height:
+                    self.starts.append(line_number)
+                    rows = 0
+                rows += count
+
+    def __len__(self):
+        if self.starts is not None:
+            return len(self.starts)
+        total_pages = self.total_lines // self.page_height
+        if self.total_lines % self.page_height:
+            total_pages += 1
+        return total_pages
+
+    def first_line(self, page):
+        """The number of the first line on a page"""
+        if self.starts is not None:
+            return self.starts[page]
+        return page * self.page_height
+
+    def end_line(self, page):
+        """The number of the line after the last line on a page"""
+        if page + 1 < len(self):
+            return self.first_line(page + 1)
+        return self.total_lines
+
+    def page_of(self, line_number):
+        """The page that holds the given line"""
+        if len(self) == 0:
+            return 0
+        if self.starts is not None:
+            page = bisect.bisect_right(self.starts, line_number) - 1
+        else:
+            page = line_number // self.page_height
+        return min(max(page, 0), len(self) - 1)
+
+class Pager:
+    """
+    The renderer-agnostic core of the paging engine: which page is showing,
+    where each page begins, and how each command moves between pages. It
+    never draws anything, so the same core drives the curses Paginator, the
+    benchmark harness, and anything else that wants to show pages.
+
+    Parameters:
+        data:           sequence of lines (anything that supports len()
+                        and slicing, like a list or a MappedDocument)
+        page_height:    number of rows on a page
+        row_counts:     optional iterable with the number of rows each
+                        line needs (for wrapped lines; see PageTable)
+    """
+    def __init__(self, data, page_height, row_counts=None):
+        self.data = data
+        self.table = PageTable(len(data), page_height, row_counts)
+        self.current_page = 0
+
+    def __len__(self):
+        """The number of pages"""
+        return len(self.table)
+
+    @property
+    def last_page(self):
+        return max(len(self.table) - 1, 0)
+
+    def go_to(self, page):
+        """Show the given (0-based) page, or the nearest one that exists"""
+        self.current_page = min(max(page, 0), self.last_page)
+        return self.current_page
+
+    def go_to_line(self, line_number):
+        """Show the page that holds the given line"""
+        return self.go_to(self.table.page_of(line_number))
+
+    def go_to_percent(self, percent):
+        """Show the page at a given percentage of the way through"""
+        percent = min(max(percent, 0), 100)
+        return self.go_to((self.last_page * percent) // 100)
+
+    def forward(self):
+        return self.go_to(self.current_page + 1)
+
+    def backward(self):
+        return self.go_to(self.current_page - 1)
+
+    def first(self):
+        return self.go_to(0)
+
+    def last(self):
+        return self.go_to(self.last_page)
+
+    def page_lines(self, page=None):
+        """
+        Get the lines on a page (by default, the current page)
+
+        Parameters:
+            page:       0-based page number
+        """
+        if page is None:
+            page = self.current_page
+        if len(self.table) == 0:
+            return self.data[0:0]
+        return self.data[self.table.first_line(page):self.table.end_line(page)]
+
 class Paginator:
     """
     Creates a virtual display window for text that is longer than a single
     screen
 
+    Besides paging forward and backward, the user can jump straight to a
+    page by number (g), to a percentage of the way through the document
+    (%), or to the first (<) or last (>) page. The paging itself is done
+    by a Pager; this class draws its pages on the screen backend.
+
     Parameters:
+        wait_on_error:      wait for a keypress after showing an error
+        centered:           center each line (otherwise, left-align it
+                            after ``left_padding`` columns)
         fwd_prompt:         tells user how to advance to next page
         fwd_char:           character that says user wants next page
         bwd_prompt:         tells user how to go back to previous page
@@ -105,14 +577,21 @@ class Paginator:
         quit_char:          character that says user wants to exit
         prompt_color:       default prompt color
         prompt_mode:        default prompt style
+        windowed:           draw only the current page, instead of drawing
+                            the whole document into a pad up front
+        wrap:               in windowed mode, continue lines that are too
+                            wide for the screen on the next row
     """
     def __init__(self, wait_on_error=False, centered=False,
                 fwd_prompt=DEFAULT_FWD_PROMPT, fwd_char=DEFAULT_FWD_CHAR,
                 bwd_prompt=DEFAULT_BWD_PROMPT, bwd_char=DEFAULT_BWD_CHAR,
                 quit_prompt=DEFAULT_QUIT_PROMPT, quit_char=DEFAULT_QUIT_CHAR,
-                prompt_color=0, prompt_mode=curses.A_NORMAL):
+                prompt_color=0, prompt_mode=curses.A_NORMAL,
+                windowed=False, wrap=False):
         self.wait_on_error = wait_on_error
         self.centered = centered
+        self.windowed = windowed
+        self.wrap = wrap
         self.fwd_prompt = fwd_prompt
         self.fwd_char = ord(fwd_char)
         self.bwd_prompt = bwd_prompt
@@ -122,6 +601,7 @@ class Paginator:
         self.prompt_color = prompt_color
         self.prompt_mode = prompt_mode
         self.left_padding = 0
+        self.shown_prompt = None
 
     def handle_error(self, stdscr, error_message):
         """
@@ -132,10 +612,10 @@ class Paginator:
             stdscr:         display object
             error_message:  the message to display
         """
-        curses.savetty()
+        screen.savetty()
         msg_midpoint = len(error_message) // 2
         height, width = stdscr.getmaxyx()
-        curses.curs_set(0)
+        screen.curs_set(0)
         stdscr.addstr(
             (height // 2),
             (width // 2) - msg_midpoint,
@@ -153,16 +633,19 @@ class Paginator:
             stdscr.getch()
         else:
             stdscr.refresh()
-            curses.napms(ERROR_DELAY_TIME)
-        curses.resetty()
+            screen.napms(ERROR_DELAY_TIME)
+        screen.resetty()
 
-    def load_data(self, stdscr, filename):
+    def load_data(self, stdscr, filename, mapped=False):
         """
         Import the text to be displayed
 
         Parameters:
             stdscr:         display object
             filename:       name of the file containing the text
+            mapped:         if True, return a MappedDocument, which reads
+                            lines from the file on demand, instead of a
+                            list of all the lines
         """
         text = None
         filename_re = re.compile(r'\S+\.txt$')
@@ -170,6 +653,8 @@ class Paginator:
             self.handle_error(stdscr, WRONG_FORMAT_MSG)
             raise PaginatorException(WRONG_FORMAT_MSG)
         try:
+            if mapped == True:
+                return MappedDocument(filename)
             with open(filename) as f:
                 text = f.readlines()
         except FileNotFoundError as fnfx:
@@ -177,96 +662,338 @@ class Paginator:
             raise PaginatorException(MISSING_SOURCE_MSG)
         return text
 
-    def paginate(self, scr_obj, /, data):
+    def menu_message(self, current_page, total_pages, width=None):
+        """
+        Build the prompt text for the given page
+
+        Parameters:
+            current_page:   0-based number of the page being shown
+            total_pages:    number of pages in the document
+            width:          number of columns in the prompt; if the keys
+                            for jumping to a page don't all fit, they're
+                            listed in short
+        """
+        jump_prompts = [DEFAULT_JUMP_PROMPT, DEFAULT_PERCENT_PROMPT,
+                        DEFAULT_ENDS_PROMPT]
+        menu_message = self.build_menu_message(current_page, total_pages,
+                                               jump_prompts)
+        if width is not None and display_width(menu_message) > width:
+            menu_message = self.build_menu_message(current_page, total_pages,
+                                                   [SHORT_JUMP_PROMPT])
+        return menu_message
+
+    def build_menu_message(self, current_page, total_pages, jump_prompts):
+        """Put together the prompt text for menu_message()"""
+        menu_message = ''
+        if current_page < total_pages - 1:
+            menu_message += self.fwd_prompt
+            if current_page > 0:
+                menu_message += '; ' + self.bwd_prompt
+        else:
+            if current_page > 0:
+                menu_message += self.bwd_prompt
+        if total_pages > 1:
+            menu_message += '; '
+        if total_pages > 2:
+            menu_message += '; '.join(jump_prompts) + '; '
+        menu_message += self.quit_prompt
+        if total_pages > 1:
+            menu_message += f"  [{current_page + 1}/{total_pages}]"
+        return menu_message
+
+    def show_prompt(self, prompt, menu_message):
+        """
+        Center the prompt text in the prompt window. The window is only
+        redrawn when the text has changed since it was last shown; the
+        update is left for doupdate() to send to the terminal.
+
+        Parameters:
+            prompt:         display object for the prompt
+            menu_message:   the text of the prompt
+        """
+        if menu_message == self.shown_prompt:
+            return
+        prompt.erase()
+        half_length_of_message = int(len(menu_message) / 2)
+        p_height, p_width = prompt.getmaxyx()
+        p_midpoint = int(p_width / 2)
+        x_position = max(p_midpoint - half_length_of_message, 0)
+        try:
+            prompt.addstr(0, x_position, menu_message[:p_width],
+                          screen.color_pair(self.prompt_color) | self.prompt_mode)
+        except screen.error:
+            # See draw_row()
+            pass
+        prompt.noutrefresh()
+        self.shown_prompt = menu_message
+
+    def ask_number(self, prompt, question):
+        """
+        Read a number typed into the prompt window (None if it isn't one)
+
+        Parameters:
+            prompt:         display object for the prompt
+            question:       text to show in front of the user's answer
+        """
+        prompt.erase()
+        prompt.addstr(0, 0, question,
+                      screen.color_pair(self.prompt_color) | self.prompt_mode)
+        self.shown_prompt = None
+        screen.echo()
+        screen.curs_set(1)
+        answer = prompt.getstr(0, len(question), 10).decode("utf-8")
+        screen.noecho()
+        screen.curs_set(0)
+        try:
+            return int(answer)
+        except ValueError:
+            return None
+
+    def handle_key(self, action, pager, prompt):
+        """
+        Move to another page, if the user pressed one of the paging keys
+
+        Parameters:
+            action:         the key the user pressed
+            pager:          the Pager for the document being shown
+            prompt:         display object for the prompt
+
+        Returns:            False if the user wants to quit
+        """
+        match action:
+            case self.fwd_char:
+                pager.forward()
+            case self.bwd_char:
+                pager.backward()
+            case self.quit_char:
+                return False
+        if action == ord(DEFAULT_FIRST_CHAR):
+            pager.first()
+        elif action == ord(DEFAULT_LAST_CHAR):
+            pager.last()
+        elif action == ord(DEFAULT_GOTO_CHAR):
+            page = self.ask_number(prompt, GOTO_PAGE_QUESTION)
+            if page is not None:
+                pager.go_to(page - 1)
+        elif action == ord(DEFAULT_PERCENT_CHAR):
+            percent = self.ask_number(prompt, GOTO_PERCENT_QUESTION)
+            if percent is not None:
+                pager.go_to_percent(percent)
+        return True
+
+    def layout_line(self, line, width):
+        """
+        Find where a line of the document goes in a row of the given
+        width. Separators are left as they are.
+
+        Parameters:
+            line:           the text of the line
+            width:          number of columns in the row
+
+        Returns:            a tuple of the starting column and the text
+        """
+        if isinstance(line, SeparatorMarker):
+            return line
+        line = clip(line, width)
+        if self.centered == True:
+            text_midpoint = display_width(line) // 2
+            line_midpoint = width // 2
+            return (line_midpoint - text_midpoint, line)
+        return (self.left_padding, line)
+
+    def layout_rows(self, line, width):
+        """
+        Lay out a line as one row, or (when wrapping) as many as it needs
+
+        Parameters:
+            line:           the text of the line
+            width:          number of columns in each row
+        """
+        if isinstance(line, SeparatorMarker):
+            return [line]
+        line = line.rstrip('\n')
+        if self.wrap == False or display_width(line) <= width:
+            return [self.layout_line(line, width)]
+        return [self.layout_line(row, width)
+                for row in split_rows(line, width)]
+
+    def row_counts(self, data, width):
         """
-        Display a multi-page document using a pad and a window
+        Yield the number of rows each line of the document needs
+
+        Parameters:
+            data:           the lines of the document
+            width:          number of columns in each row
+        """
+        if isinstance(data, MappedDocument):
+            for n, columns in enumerate(data.line_widths()):
+                if columns <= width:
+                    yield 1
+                else:
+                    # Broken up as layout_rows() will, since a wide
+                    # character never straddles two rows
+                    yield len(split_rows(data[n].rstrip('\n'), width))
+            return
+        for line in data:
+            if not isinstance(line, str):
+                yield 1
+            elif line.isascii():
+                yield max((len(line.rstrip('\n')) + width - 1) // width, 1)
+            else:
+                yield len(split_rows(line.rstrip('\n'), width))
+
+    def draw_line(self, win, y_index, line, width):
+        """
+        Write one line of the document, truncated to the given width
+
+        Parameters:
+            win:            display object
+            y_index:        vertical line in display
+            line:           the text of the line, or a SeparatorMarker
+            width:          number of columns in the row
+        """
+        self.draw_row(win, y_index, self.layout_line(line, width), width)
+
+    def draw_row(self, win, y_index, row, width):
+        """
+        Write a row laid out by layout_line()
+
+        Parameters:
+            win:            display object
+            y_index:        vertical line in display
+            row:            tuple of starting column and text, or a
+                            SeparatorMarker
+            width:          number of columns in the row
+        """
+        try:
+            if isinstance(row, SeparatorMarker):
+                draw_separator(y_index, (width // 5), width, win,
+                               color=row.color, mode=row.mode)
+            else:
+                win.addstr(y_index, row[0], row[1])
+        except screen.error:
+            # Writing into the bottom-right corner of a window moves the
+            # cursor past its edge, which curses reports as an error even
+            # though the text was drawn.
+            pass
+
+    def paginate(self, scr_obj, /, data, first_line=0):
+        """
+        Display a multi-page document, starting with the page that
+        contains first_line
+
+        The text appears below a top margin of VERTICAL_MARGIN rows (which
+        the caller can use for a title), with the prompt underneath. Every
+        page is the same size, and where each one starts is worked out in
+        advance (see PageTable), so jumping to any page costs the same as
+        turning one.
+
+        By default the whole document is drawn into a pad up front. In
+        windowed mode (or for a MappedDocument), see window_renderer().
 
         Parameters:
             scr_obj:        display object
             data:           iterable container of text to be displayed
+                            (lines of text, or SeparatorMarker objects)
+            first_line:     number of the line to start with
         """
         scr_height, scr_width = scr_obj.getmaxyx()
+        top, left = scr_obj.getbegyx()
         window_height = scr_height - VERTICAL_MARGIN
         window_width = scr_width - HORIZONTAL_MARGIN
-        curses.curs_set(0)
-        current_page = 0
-        total_pages = len(data) // window_height
-        if len(data) % window_height:
-            total_pages += 1
-        pad = curses.newpad(len(data) + 1, window_width)
-        prompt = curses.newwin(1, window_width, window_height, 0)
-        y_index = 0
-        for line in data:
-            if line.__class__.__name__ == "SeparatorMarker":
-                draw_separator(y_index, (window_width // 5) , window_width, pad,
-                                color=line.color, mode=line.mode)
-            else:
-                if self.centered == True:
-                    text_midpoint = len(line[:window_width]) // 2
-                    line_midpoint = window_width // 2
-                    pad.addstr(y_index,
-                        line_midpoint - text_midpoint,
-                        line[:window_width]
-                    )
-                else:
-                    pad.addstr(y_index, self.left_padding, line[:window_width])
-            y_index += 1
-        pad.refresh(0,0, VERTICAL_MARGIN, HORIZONTAL_MARGIN,
-                    (window_height - 1), (window_width - 1))
+        page_height = max(1, window_height - VERTICAL_MARGIN)
+        screen.curs_set(0)
+        windowed = self.windowed == True or isinstance(data, MappedDocument)
+        if windowed and self.wrap == True:
+            pager = Pager(data, page_height,
+                          self.row_counts(data, window_width))
+        else:
+            pager = Pager(data, page_height)
+        prompt = screen.newwin(1, window_width, top + window_height, left)
+        self.shown_prompt = None
+        if windowed:
+            show_page = self.window_renderer(pager, window_width,
+                                             top + VERTICAL_MARGIN,
+                                             left + HORIZONTAL_MARGIN)
+        else:
+            show_page = self.pad_renderer(pager, window_width,
+                                          top + VERTICAL_MARGIN,
+                                          left + HORIZONTAL_MARGIN)
+        pager.go_to_line(first_line)
+        showing = None
         while True:
-            prompt.clear()
-            menu_message = ''
-            if current_page < total_pages - 1:
-                menu_message += self.fwd_prompt
-                if current_page > 0:
-                    menu_message += '; ' + self.bwd_prompt
-            else:
-                if current_page > 0:
-                    menu_message += self.bwd_prompt
-            if total_pages > 1:
-                menu_message += '; '
-            menu_message += self.quit_prompt
-            half_length_of_message = int(len(menu_message) / 2)
-            p_height, p_width = prompt.getmaxyx()
-            p_midpoint = int(p_width / 2)
-            x_position = p_midpoint - half_length_of_message
-            prompt.addstr(0, x_position, menu_message,
-                          curses.color_pair(self.prompt_color) | self.prompt_mode)
-            prompt.refresh()
+            if showing != pager.current_page:
+                show_page(pager.current_page)
+                showing = pager.current_page
+            self.show_prompt(prompt,
+                             self.menu_message(pager.current_page, len(pager),
+                                               window_width))
+            screen.doupdate()
             action = prompt.getch()
-            match action:
-                case self.fwd_char:
-                    if current_page < total_pages - 1:
-                        current_page += 1
-                        if current_page == total_pages - 1:
-                            scr_obj.erase()
-                            scr_obj.refresh()
-                        pad.refresh(
-                            ((current_page * window_height) - VERTICAL_MARGIN),
-                            0,
-                            0,
-                            HORIZONTAL_MARGIN,
-                            window_height - 1, window_width - 1
-                        )
-                    else:
-                        continue
-                case self.bwd_char:
-                    if current_page > 0:
-                        scr_obj.erase()
-                        scr_obj.refresh()
-                        current_page -= 1
-                        pad.refresh(
-                            (current_page * window_height),
-                            0,
-                            VERTICAL_MARGIN,
-                            HORIZONTAL_MARGIN,
-                            window_height - 1, window_width - 1
-                        )
-                    else:
-                        continue
-                case self.quit_char:
-                    raise PaginatorException(PAGINATION_DONE_MSG)
-                case _:
-                    continue
-        curses.curs_set(1)
+            if self.handle_key(action, pager, prompt) == False:
+                break
+        screen.curs_set(1)
 
+    def pad_renderer(self, pager, window_width, y_position, x_position):
+        """
+        Draw the whole document into a pad, and return a function that
+        shows a given page of it
+
+        Parameters:
+            pager:          the Pager for the document
+            window_width:   number of columns in each row
+            y_position:     screen row for the top of each page
+            x_position:     screen column for the left edge of each page
+        """
+        table = pager.table
+        page_height = table.page_height
+        pad = screen.newpad(max(len(table), 1) * page_height + 1, window_width)
+        y_index = 0
+        for line in pager.data:
+            self.draw_line(pad, y_index, line, window_width)
+            y_index += 1
+        def show_page(page):
+            pad.noutrefresh(table.first_line(page), 0,
+                            y_position, x_position,
+                            y_position + page_height - 1,
+                            x_position + window_width - 1)
+        return show_page
+
+    def window_renderer(self, pager, window_width, y_position, x_position):
+        """
+        Return a function that shows a given page of the document, in a
+        window the size of one page
+
+        Only the lines on the current page are drawn, so the cost of
+        opening and paging through a document does not depend on its
+        length. The data needs to support len() and slicing; it is never
+        copied or drawn in full.
+
+        The rows of the last page drawn are remembered, and a page turn
+        only rewrites the rows that are different on the new page.
+
+        Parameters:
+            pager:          the Pager for the document
+            window_width:   number of columns in each row
+            y_position:     screen row for the top of each page
+            x_position:     screen column for the left edge of each page
+        """
+        page_height = pager.table.page_height
+        viewport = screen.newwin(page_height, window_width,
+                                 y_position, x_position)
+        frame = [None] * page_height
+        def show_page(page):
+            rows = []
+            for line in pager.page_lines(page):
+                rows.extend(self.layout_rows(line, window_width))
+            for y_index in range(page_height):
+                row = rows[y_index] if y_index < len(rows) else None
+                if row == frame[y_index]:
+                    continue
+                viewport.move(y_index, 0)
+                viewport.clrtoeol()
+                if row is not None:
+                    self.draw_row(viewport, y_index, row, window_width)
+                frame[y_index] = row
+            viewport.noutrefresh()
+        return show_page
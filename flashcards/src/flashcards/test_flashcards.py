@@ -1,5 +1,5 @@
-import unittest, re, json
-import flashcards
+import unittest, re, json, io, os, tempfile
+import flashcards, deckcache
 from flashcards import *
 
 COLONIES = '''
@@ -128,6 +128,9 @@ class ConfigTest(unittest.TestCase):
     def test_reserved_chars(self):
         with self.assertRaises(ConfigurationError):
             restaurants = Deck(self.unpermitted_char_config)
+        with self.assertRaises(ConfigurationError):
+            restaurants = Deck(self.unpermitted_char_config.replace(
+                '"character" : "r"', '"character" : "*"'))
 
     def test_duplicate_cards(self):
         with self.assertRaises(ConfigurationError):
@@ -182,6 +185,218 @@ class DeckTest(unittest.TestCase):
         output = sample_member.display(colonies.display_template, colonies.topics)
         self.assertTrue(formatted_string in output)
 
+    def test_topic_index(self):
+        colonies = Deck(COLONIES)
+        virginia = colonies['Virginia']
+        self.assertEqual(sorted(colonies.topics_for(virginia)),
+                         ['royals', 'tobacco'])
+        self.assertEqual(colonies.topics_for(colonies['Delaware']), {})
+        self.assertIsInstance(colonies.topics['royals']['members'], frozenset)
+        self.assertEqual([card.title for card in colonies.list('tobacco')],
+                         ['Maryland', 'North Carolina', 'Virginia'])
+        self.assertEqual(virginia.display(colonies.display_template,
+                                          colonies.topics),
+                         virginia.display(colonies.display_template,
+                                          colonies.topics_for(virginia)))
+
+    def test_streaming_reader(self):
+        expected = json.loads(COLONIES)
+        for chunk_size in [1, 5, 4096]:
+            entries = {}
+            for key, value in DeckReader(io.StringIO(COLONIES), chunk_size):
+                entries[key] = list(value) if key == 'data' else value
+            self.assertEqual(entries, expected)
+        numbers = DeckReader(io.StringIO('{"data" : [12345, 6.5e10]}'), 2)
+        self.assertEqual([list(value) for key, value in numbers],
+                         [[12345, 6.5e10]])
+        for bad_json in ['{"name" : "x", "data" : [{"title" : "a"} {}]}',
+                         '{"name" : "x",', '{"name" : "x"} trailing']:
+            with self.assertRaises(ConfigurationError):
+                list(DeckReader(io.StringIO(bad_json)))
+
+    def test_load_from_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'colonies.json')
+            with open(filename, 'w') as ofile:
+                ofile.write(COLONIES)
+            colonies = Deck.from_file(filename)
+            self.assertEqual(len(colonies), 13)
+            self.assertEqual(colonies.deck_name, "Colony")
+            self.assertEqual(colonies['Georgia']['capital'], 'Savannah')
+            self.assertEqual(sorted(colonies.topics_for(colonies['Virginia'])),
+                             ['royals', 'tobacco'])
+            with open(filename, 'w') as ofile:
+                ofile.write(ConfigTest.duplicate_card_config)
+            with self.assertRaises(ConfigurationError):
+                Deck.from_file(filename)
+
+    def test_compiled_deck(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'colonies.json')
+            js_data = json.loads(COLONIES)
+            js_data['data'][0].update({"founded" : 1636, "area" : 5.5,
+                                       "royal" : False, "motto" : None,
+                                       "towns" : ["Hartford", "New Haven"]})
+            js_data['topics'][0]['tobacco']['members'].append("Bermuda")
+            with open(filename, 'w') as ofile:
+                json.dump(js_data, ofile)
+            expected = Deck.from_file(filename)
+            self.assertEqual(compile_deck(filename),
+                             filename + deckcache.CACHE_SUFFIX)
+            colonies = Deck.from_file(filename)
+            # Nothing is made for each card until it's used
+            self.assertIsInstance(colonies.data, CachedCards)
+            self.assertEqual(colonies.data.cards, [None] * 13)
+            self.assertIsNone(colonies.titles.index)
+            self.assertEqual(colonies.data[-1].title, expected.data[-1].title)
+            self.assertEqual([card.title for card in colonies.data[2:4]],
+                             [card.title for card in expected.data[2:4]])
+            self.assertEqual(colonies.data.cards.count(None), 10)
+            self.assertIs(colonies.data[2], colonies.data[2])
+            self.assertEqual(len(colonies.topics['tobacco']['members']),
+                             len(expected.topics['tobacco']['members']))
+            self.assertIn("Bermuda", colonies.topics['tobacco']['members'])
+            self.assertEqual(colonies.deck_name, expected.deck_name)
+            self.assertEqual(colonies.titles, expected.titles)
+            self.assertEqual([card.details for card in colonies.data],
+                             [card.details for card in expected.data])
+            self.assertEqual(colonies.topics['tobacco']['members'],
+                             expected.topics['tobacco']['members'])
+            self.assertEqual([card.title for card in colonies.list('royals')],
+                             [card.title for card in expected.list('royals')])
+            virginia = colonies['Virginia']
+            self.assertEqual(
+                virginia.display(colonies.display_template,
+                                 colonies.topics_for(virginia)),
+                expected['Virginia'].display(expected.display_template,
+                                             expected.topics_for(virginia)))
+            # Once the JSON file changes, its cache isn't used any more
+            js_data['name'] = "Colonies"
+            with open(filename, 'w') as ofile:
+                json.dump(js_data, ofile)
+            self.assertIsNone(deckcache.read_cache(filename))
+            self.assertEqual(Deck.from_file(filename).deck_name, "Colonies")
+            compile_deck(filename)
+            with open(filename + deckcache.CACHE_SUFFIX, 'r+b') as cache:
+                cache.truncate(100)
+            self.assertIsNone(deckcache.read_cache(filename))
+            self.assertEqual(len(Deck.from_file(filename)), 13)
+            # A cache written by an older version is ignored
+            compile_deck(filename)
+            self.assertIsNotNone(deckcache.read_cache(filename))
+            with open(filename + deckcache.CACHE_SUFFIX, 'r+b') as cache:
+                cache.write(b'FCDECK02')
+            self.assertIsNone(deckcache.read_cache(filename))
+
+    def test_compiled_schemas(self):
+        # Cards whose details come in different orders have different
+        # schemas, which are all read back in one pass
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'colonies.json')
+            js_data = json.loads(COLONIES)
+            for n, card in enumerate(js_data['data']):
+                extras = [(f"extra {k}", n * k) for k in range(n % 4)]
+                card.update(extras[::-1] if n % 2 else extras)
+            with open(filename, 'w') as ofile:
+                json.dump(js_data, ofile)
+            expected = Deck.from_file(filename)
+            self.assertGreater(len(expected.store.schemas), 3)
+            compile_deck(filename)
+            self.assertIsNotNone(deckcache.read_cache(filename))
+            colonies = Deck.from_file(filename)
+            self.assertEqual([card.details for card in colonies.data],
+                             [card.details for card in expected.data])
+
+    def test_study(self):
+        colonies = Deck(COLONIES)
+        card = colonies.study_card()
+        self.assertEqual(card.title, 'Connecticut')
+        self.assertTrue(colonies.studying)
+        self.assertEqual(colonies.current_menu_level, CARD_FRONT_DISPLAY_LEVEL)
+        colonies.current_menu_level = CARD_BACK_DISPLAY_LEVEL
+        self.assertIn('grade your answer', colonies.prompt_text())
+        colonies.grade(card, 5)
+        self.assertEqual(colonies.study_card().title, 'Delaware')
+        for n in range(len(colonies) - 1):
+            colonies.grade(colonies.study_card(), 5)
+        # Every card has been reviewed, so the first one is due again first
+        self.assertEqual(colonies.study_card().title, 'Connecticut')
+        colonies.random_card()
+        self.assertFalse(colonies.studying)
+
+    def test_study_empty_deck(self):
+        empty = json.loads(COLONIES)
+        empty['data'] = []
+        empty['topics'] = []
+        deck = Deck(json.dumps(empty))
+        self.assertIsNone(deck.study_card())
+        self.assertEqual(deck.current_menu_level, MAIN_MENU_LEVEL)
+        self.assertFalse(deck.studying)
+
+    def test_keep_reviews(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'colonies.json.reviews')
+            colonies = Deck(COLONIES)
+            colonies.keep_reviews(filename)
+            # Nothing is written for a deck that isn't studied
+            self.assertEqual(os.listdir(directory), [])
+            for n in range(3):
+                colonies.grade(colonies.study_card(), 5)
+            colonies.save_reviews()
+            self.assertTrue(os.path.exists(filename))
+            colonies.close()
+            colonies = Deck(COLONIES)
+            colonies.keep_reviews(filename)
+            self.assertEqual(colonies.scheduler.reviews, 3)
+            self.assertEqual(colonies.study_card().title, 'Maryland')
+            colonies.close()
+            # A journal that can't be read doesn't stop the deck opening
+            with open(filename, 'wb') as journal:
+                journal.write(b'not a journal, at all')
+            colonies = Deck(COLONIES)
+            with self.assertLogs('flashcards', 'WARNING'):
+                colonies.keep_reviews(filename)
+            self.assertIsNone(colonies.review_log)
+            colonies.grade(colonies.study_card(), 5)
+            colonies.close()
+
+    def test_render_cache(self):
+        colonies = Deck(COLONIES)
+        pages = RenderCache(colonies, 80)
+        virginia = colonies['Virginia']
+        lines, padding = pages.card(virginia)
+        self.assertEqual(lines, virginia.display(colonies.display_template,
+                                                 colonies.topics_for(virginia)))
+        self.assertEqual(padding, block_padding(lines, 80))
+        self.assertIs(pages.card(virginia)[0], lines)
+        front = pages.card(virginia, front=True)
+        self.assertIs(pages.card(virginia, front=True), front)
+        self.assertEqual((pages.hits, pages.misses), (2, 2))
+        pages.new_front(virginia)
+        pages.card(virginia, front=True)
+        self.assertEqual(pages.misses, 3)
+        lines, padding = pages.topic('royals')
+        members = colonies.list('royals')
+        separators = [line for line in lines if type(line) != str]
+        self.assertEqual(len(separators), len(members) - 1)
+        self.assertEqual(type(lines[-1]), str)
+        self.assertIs(pages.topic('royals')[0], lines)
+        pages.resize(80)
+        self.assertIs(pages.topic('royals')[0], lines)
+        pages.resize(120)
+        self.assertEqual(len(pages.pages), 0)
+        self.assertEqual(pages.topic('royals')[1], block_padding(lines, 120))
+        cache_size, flashcards.RENDER_CACHE_SIZE = \
+            flashcards.RENDER_CACHE_SIZE, 4
+        try:
+            for card in colonies.data:
+                pages.card(card)
+        finally:
+            flashcards.RENDER_CACHE_SIZE = cache_size
+        self.assertEqual(len(pages.pages), 4)
+        self.assertIn(('card', colonies.data[-1].title, False, None, 120),
+                      pages.pages)
+
     def test_random_card(self):
         colonies = Deck(COLONIES)
         card = colonies.random_card()
@@ -227,10 +442,27 @@ class DeckTest(unittest.TestCase):
         witches = Deck(numbered_false_json_string)
         self.assertFalse(witches.numbered, "List should not be numbered")
 
+    def test_lookup_by_title(self):
+        colonies = Deck(COLONIES)
+        georgia = colonies['Georgia']
+        self.assertEqual(georgia['capital'], 'Savannah')
+        self.assertEqual(colonies.position(georgia), 3)
+        self.assertIs(colonies.choose_card(colonies.position(georgia)), georgia)
+        with self.assertRaises(CardNotFoundError):
+            colonies['Vermont']
+        with self.assertRaises(CardNotFoundError):
+            colonies.position(Card('Vermont'))
+        big_deck = Deck(json.dumps({
+            "name" : "Numbers",
+            "data" : [{"title" : f"Card {n}"} for n in range(100000)],
+            "display_template" : []
+        }))
+        self.assertEqual(big_deck.position(big_deck['Card 99999']), 100000)
+
     def test_main_menu(self):
         scientists = Deck(SCIENTISTS)
         menu = scientists.main_menu()
-        self.assertEqual(len(menu), 1, "Scientists main menu should have one option")
+        self.assertEqual(len(menu), 2, "Scientists main menu should have two options")
         numbered_deck_json_string = '''
         {
           "name" : "Sesame Street Characters",
@@ -248,10 +480,10 @@ class DeckTest(unittest.TestCase):
         '''
         muppets = Deck(numbered_deck_json_string)
         menu = muppets.main_menu()
-        self.assertEqual(len(menu), 2, "Menu should have two options")
+        self.assertEqual(len(menu), 3, "Menu should have three options")
         colonies = Deck(COLONIES)
         menu = colonies.main_menu()
-        self.assertEqual(len(menu), 3, "Menu should have three options")
+        self.assertEqual(len(menu), 4, "Menu should have four options")
 
     def test_choose_card(self):
         colonies = Deck(COLONIES)
@@ -364,6 +596,56 @@ class CardTest(unittest.TestCase):
         self.assertTrue(title_bar_position < len(sample_text),
                         "title bar should be displayed with number on back of card")
 
+    def test_card_storage(self):
+        curie = Card("Marie Curie", birthplace="Warsaw", born_in=1867)
+        self.assertEqual(curie.details, {"birthplace" : "Warsaw",
+                                         "born_in" : 1867})
+        self.assertFalse(hasattr(curie, '__dict__'))
+        with self.assertRaises(KeyError):
+            curie['died_in']
+        store = CardStore()
+        cards = [store.card(f"Card {n}", {"number" : n, "even" : n % 2 == 0,
+                                          "name" : "card " + str(n % 2)})
+                 for n in range(1000)]
+        store.compact()
+        self.assertEqual(len(store.schemas), 1)
+        self.assertIs(cards[0].schema, cards[999].schema)
+        number, even, name = cards[0].schema.columns
+        self.assertEqual(number.typecode, 'q')
+        self.assertIsInstance(even, list)
+        self.assertIs(cards[2]['name'], cards[4]['name'])
+        self.assertIs(cards[3]['even'], False)
+        self.assertEqual(cards[999]['number'], 999)
+        late = store.card("Card 1000", {"number" : "many", "even" : True,
+                                        "name" : "card 0"})
+        self.assertEqual(late['number'], "many")
+        self.assertEqual(cards[999]['number'], 999)
+        other = store.card("Other", {"name" : "other"})
+        self.assertIsNot(other.schema, late.schema)
+        self.assertEqual(len(store.schemas), 2)
+
+    def test_template(self):
+        js_data = json.loads(COLONIES)
+        template = Template(js_data['display_template'])
+        delaware = Card("Delaware", capital="New Castle")
+        self.assertEqual(template.render(delaware),
+                         ["All about the Delaware Colony",
+                          "The capital of Delaware was New Castle"])
+        self.assertEqual(template.render_front(delaware, 1),
+                         "The capital of ??? was New Castle")
+        self.assertEqual(delaware.display(template, number=2),
+                         delaware.display(js_data['display_template'], number=2))
+        spec = Template(["{card['born_in']:>6} {{literal}}"])
+        self.assertEqual(spec.render(Card("Curie", born_in=1867)),
+                         ["  1867 {literal}"])
+        for line in ["{card.__class__}", "{__import__('os').getcwd()}",
+                     "{card['title'].upper()}", "{card['title']"]:
+            with self.assertRaises(ConfigurationError):
+                Template([line])
+        colonies = Deck(COLONIES)
+        self.assertIsInstance(colonies.display_template, Template)
+        self.assertIsInstance(colonies.topics['tobacco']['detail'], Template)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,241 @@
+import unittest, os, random, signal, subprocess, sys, tempfile, time
+from reviewlog import *
+from scheduler import Scheduler
+
+def state(scheduler):
+    return (list(scheduler.repetitions), list(scheduler.intervals),
+            list(scheduler.easiness), list(scheduler.due))
+
+class ReviewLogTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name,
+                                     'deck.json' + JOURNAL_SUFFIX)
+        self.titles = [f"card {n}" for n in range(20)] + ["Curaçao"]
+        self.positions = {title: n for n, title in enumerate(self.titles)}
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def review(self, log, scheduler, total):
+        for n in range(total):
+            position = random.randrange(len(self.titles))
+            when, grade = 1000.0 + n, random.randint(0, 5)
+            scheduler.review(position, grade, when)
+            log.record(self.titles[position], when, grade)
+
+    def reload(self):
+        scheduler = Scheduler(len(self.titles))
+        log = ReviewLog(self.filename)
+        log.restore(scheduler, self.positions)
+        return log, scheduler
+
+    def test_round_trip(self):
+        log, scheduler = self.reload()
+        self.review(log, scheduler, 100)
+        log.close()
+        restored_log, restored = self.reload()
+        self.assertEqual(state(restored), state(scheduler))
+        self.assertEqual(restored_log.records, 100)
+        # Reviews of cards that aren't in the deck any more are skipped
+        self.positions.pop("Curaçao")
+        restored_log.close()
+        self.reload()[0].close()
+
+    def test_flush(self):
+        log = ReviewLog(self.filename)
+        log.restore(Scheduler(len(self.titles)), self.positions)
+        # The journal isn't created until there's a review to write, and
+        # reviews are only written by flush()
+        self.assertFalse(os.path.exists(self.filename))
+        log.flush()
+        self.assertFalse(os.path.exists(self.filename))
+        for n in range(100):
+            log.record("card 2", 1000.0, 4)
+        self.assertFalse(os.path.exists(self.filename))
+        log.flush()
+        size = os.path.getsize(self.filename)
+        self.assertEqual(size, FILE_HEADER.size + 100 * (
+            RECORD_LENGTH.size + RECORD_FIELDS.size + len(b"card 2") +
+            RECORD_CHECK.size))
+        log.record("card 3", 1000.0, 4)
+        self.assertEqual(os.path.getsize(self.filename), size)
+        log.flush()
+        self.assertGreater(os.path.getsize(self.filename), size)
+        log.close()
+
+    def test_damaged_journal(self):
+        log, scheduler = self.reload()
+        self.review(log, scheduler, 10)
+        log.close()
+        expected = state(scheduler)
+        size = os.path.getsize(self.filename)
+        # A review that was only partly written when the program stopped
+        log, scheduler = self.reload()
+        log.record("card 5", 5000.0, 5)
+        log.flush()
+        log.journal.truncate(os.path.getsize(self.filename) - 3)
+        log.journal.close()
+        log.journal = None
+        log, scheduler = self.reload()
+        self.assertEqual(state(scheduler), expected)
+        self.assertEqual(log.records, 10)
+        # The torn record is overwritten by the next one
+        log.record("card 5", 5000.0, 5)
+        log.flush()
+        self.assertEqual(os.path.getsize(self.filename),
+                         size + RECORD_LENGTH.size + RECORD_FIELDS.size +
+                         len(b"card 5") + RECORD_CHECK.size)
+        log.close()
+        # A review whose check doesn't match
+        with open(self.filename, 'r+b') as journal:
+            journal.seek(-1, os.SEEK_END)
+            journal.write(b'\xff')
+        log, scheduler = self.reload()
+        self.assertEqual(state(scheduler), expected)
+        log.close()
+        with open(self.filename, 'wb') as journal:
+            journal.write(b'not a journal, at all')
+        with self.assertRaises(ValueError):
+            self.reload()
+
+    def test_compact(self):
+        log, scheduler = self.reload()
+        self.review(log, scheduler, 50)
+        log.compact(scheduler, self.titles)
+        self.assertEqual(log.generation, 1)
+        self.assertEqual(log.records, 0)
+        self.review(log, scheduler, 5)
+        log.close()
+        log, restored = self.reload()
+        self.assertEqual(state(restored), state(scheduler))
+        self.assertEqual(log.records, 5)
+        log.close()
+        # The program stopped after saving a snapshot, but before starting
+        # the new journal: the old one has to be ignored
+        with open(self.filename, 'rb') as journal:
+            old_journal = journal.read()
+        log, restored = self.reload()
+        log.compact(restored, self.titles)
+        log.close()
+        with open(self.filename, 'wb') as journal:
+            journal.write(old_journal)
+        log, restored = self.reload()
+        self.assertEqual(state(restored), state(scheduler))
+        self.assertEqual(log.generation, 2)
+        self.assertEqual(log.records, 0)
+        log.close()
+
+    def test_missing_snapshot(self):
+        log, scheduler = self.reload()
+        self.review(log, scheduler, 20)
+        log.compact(scheduler, self.titles)
+        self.review(log, scheduler, 5)
+        log.close()
+        os.remove(self.filename + SNAPSHOT_SUFFIX)
+        size = os.path.getsize(self.filename)
+        with self.assertLogs('reviewlog', 'WARNING'):
+            log, restored = self.reload()
+        # Only the reviews since the snapshot can be restored, but they
+        # are, and the journal is kept
+        self.assertEqual(log.records, 5)
+        self.assertEqual(restored.reviews, 5)
+        self.assertEqual(log.generation, 1)
+        log.close()
+        self.assertEqual(os.path.getsize(self.filename), size)
+
+    def test_old_snapshot(self):
+        log, scheduler = self.reload()
+        self.review(log, scheduler, 20)
+        log.compact(scheduler, self.titles)
+        with open(self.filename + SNAPSHOT_SUFFIX, 'rb') as snapshot:
+            old_snapshot = snapshot.read()
+        self.review(log, scheduler, 5)
+        log.compact(scheduler, self.titles)
+        self.review(log, scheduler, 3)
+        log.close()
+        with open(self.filename + SNAPSHOT_SUFFIX, 'wb') as snapshot:
+            snapshot.write(old_snapshot)
+        with self.assertLogs('reviewlog', 'WARNING'):
+            log, restored = self.reload()
+        self.assertEqual(log.records, 3)
+        self.assertEqual(log.generation, 2)
+        log.record("card 1", 9000.0, 5)
+        log.close()
+        with self.assertLogs('reviewlog', 'WARNING'):
+            self.assertEqual(self.reload()[0].records, 4)
+
+    def test_truncated_snapshot(self):
+        log, scheduler = self.reload()
+        self.review(log, scheduler, 20)
+        log.compact(scheduler, self.titles)
+        log.close()
+        with open(self.filename + SNAPSHOT_SUFFIX, 'rb') as snapshot:
+            contents = snapshot.read()
+        # A snapshot cut short anywhere is refused, not half-restored
+        for length in range(len(contents)):
+            with open(self.filename + SNAPSHOT_SUFFIX, 'wb') as snapshot:
+                snapshot.write(contents[:length])
+            with self.assertRaises(ValueError):
+                self.reload()
+        with open(self.filename + SNAPSHOT_SUFFIX, 'wb') as snapshot:
+            snapshot.write(contents + b'x')
+        with self.assertRaises(ValueError):
+            self.reload()
+        with open(self.filename + SNAPSHOT_SUFFIX, 'wb') as snapshot:
+            snapshot.write(contents)
+        log, restored = self.reload()
+        self.assertEqual(state(restored), state(scheduler))
+        log.close()
+
+    def test_unwritable_journal(self):
+        self.filename = os.path.join(self.directory.name, 'missing',
+                                     'deck.json' + JOURNAL_SUFFIX)
+        log, scheduler = self.reload()
+        self.review(log, scheduler, 5)
+        with self.assertLogs('reviewlog', 'WARNING'):
+            log.flush()
+        self.assertFalse(log.saving)
+        self.review(log, scheduler, 5)
+        log.close()
+        self.assertFalse(os.path.exists(self.filename))
+
+    def test_killed(self):
+        # Reviews that were flushed survive the program being killed
+        # without closing the journal
+        script = f"""
+import os, signal
+from reviewlog import ReviewLog
+from scheduler import Scheduler
+log = ReviewLog({self.filename!r})
+log.restore(Scheduler({len(self.titles)}), {self.positions!r})
+for n in range(3):
+    log.record("card 7", 1000.0 + n, 4)
+log.flush()
+log.record("card 8", 2000.0, 4)
+os.kill(os.getpid(), signal.SIGKILL)
+"""
+        process = subprocess.run([sys.executable, '-c', script],
+                                 cwd=os.path.dirname(__file__) or '.')
+        self.assertEqual(process.returncode, -signal.SIGKILL)
+        log, restored = self.reload()
+        self.assertEqual(log.records, 3)
+        self.assertEqual(restored.repetitions[7], 3)
+        self.assertEqual(restored.repetitions[8], 0)
+        log.close()
+
+    def test_long_journal(self):
+        self.titles = [f"card {n}" for n in range(5000)]
+        self.positions = {title: n for n, title in enumerate(self.titles)}
+        log, scheduler = self.reload()
+        self.review(log, scheduler, 50000)
+        log.close()
+        start = time.perf_counter()
+        log, restored = self.reload()
+        elapsed = time.perf_counter() - start
+        self.assertEqual(state(restored), state(scheduler))
+        self.assertLess(elapsed, 5.0)
+        log.close()
+
+if __name__ == "__main__":
+    unittest.main()
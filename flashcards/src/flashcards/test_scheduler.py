@@ -0,0 +1,55 @@
+import unittest, random, time
+from scheduler import *
+
+DAY = SECONDS_PER_DAY
+
+class SchedulerTest(unittest.TestCase):
+    def test_new_cards_in_order(self):
+        scheduler = Scheduler(5)
+        self.assertEqual(scheduler.next_due(), 0)
+        scheduler.review(0, 5, when=0)
+        self.assertEqual(scheduler.next_due(), 1)
+        self.assertEqual(scheduler.due_count(when=0), 4)
+
+    def test_intervals(self):
+        scheduler = Scheduler(1)
+        now = 1000.0
+        intervals = []
+        for grade in [4, 4, 4, 4]:
+            scheduler.review(0, grade, when=now)
+            intervals.append(scheduler.intervals[0])
+            now = scheduler.due[0]
+        self.assertEqual(intervals[:2], [FIRST_INTERVAL, SECOND_INTERVAL])
+        self.assertEqual(intervals[2], round(SECOND_INTERVAL * 2.5))
+        self.assertEqual(scheduler.easiness[0], 2.5)
+        scheduler.review(0, 1, when=now)
+        self.assertEqual(scheduler.repetitions[0], 0)
+        self.assertEqual(scheduler.due[0], now + FIRST_INTERVAL * DAY)
+        self.assertLess(scheduler.easiness[0], 2.5)
+        for n in range(20):
+            scheduler.review(0, 0, when=now)
+        self.assertEqual(scheduler.easiness[0], MINIMUM_EASINESS)
+        with self.assertRaises(SchedulerError):
+            scheduler.review(0, 6)
+
+    def test_next_due(self):
+        total_cards = 50000
+        scheduler = Scheduler(total_cards)
+        clock = 0.0
+        for n in range(total_cards):
+            scheduler.review(n, random.randint(0, 5), when=clock)
+            clock += 1.0
+        for n in range(200):
+            position = scheduler.next_due()
+            self.assertEqual(scheduler.due[position], min(scheduler.due))
+            scheduler.review(position, random.randint(0, 5), when=clock)
+            clock += 1.0
+        self.assertLessEqual(len(scheduler.queue), 2 * total_cards + 1)
+        self.assertEqual(scheduler.reviews, total_cards + 200)
+
+    def test_no_cards(self):
+        with self.assertRaises(SchedulerError):
+            Scheduler(0).next_due()
+
+if __name__ == "__main__":
+    unittest.main()
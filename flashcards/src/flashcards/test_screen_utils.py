@@ -0,0 +1,125 @@
+import unittest
+import screen_utils
+from screen_utils import *
+from virtual_screen import VirtualScreen
+import paging_benchmark
+
+class TestVirtualScreen(unittest.TestCase):
+
+    def setUp(self):
+        self.vscreen = VirtualScreen(12, 100)
+        self.previous = screen_utils.use_screen(self.vscreen)
+        self.stdscr = self.vscreen.initscr()
+
+    def tearDown(self):
+        screen_utils.use_screen(self.previous)
+
+    def paginate(self, data, keys, **options):
+        self.vscreen.send_keys(keys)
+        Paginator(**options).paginate(self.stdscr, data)
+        return self.vscreen.snapshot()
+
+    def test_first_page(self):
+        data = [f"Line {n}\n" for n in range(50)]
+        rows = self.paginate(data, 'q')
+        page_height = 12 - 2 * VERTICAL_MARGIN
+        self.assertEqual(rows[VERTICAL_MARGIN].strip(), "Line 0")
+        self.assertEqual(rows[VERTICAL_MARGIN + page_height - 1].strip(),
+                         f"Line {page_height - 1}")
+        self.assertIn("[1/", rows[12 - VERTICAL_MARGIN])
+
+    def test_page_turns(self):
+        data = [f"Line {n}\n" for n in range(50)]
+        page_height = 12 - 2 * VERTICAL_MARGIN
+        for windowed in [False, True]:
+            with self.subTest(windowed=windowed):
+                rows = self.paginate(data, 'ffbf' + 'q', windowed=windowed)
+                self.assertEqual(rows[VERTICAL_MARGIN].strip(),
+                                 f"Line {2 * page_height}")
+                self.assertIn("[3/", rows[12 - VERTICAL_MARGIN])
+
+    def test_jump_prompts(self):
+        # Every key for jumping to a page is listed, in short if need be
+        data = [f"Line {n}\n" for n in range(50)]
+        rows = self.paginate(data, 'fq')
+        prompt = rows[12 - VERTICAL_MARGIN]
+        for text in [DEFAULT_JUMP_PROMPT, DEFAULT_PERCENT_PROMPT,
+                     DEFAULT_ENDS_PROMPT, "[2/"]:
+            self.assertIn(text, prompt)
+        paginator = Paginator()
+        narrow = paginator.menu_message(1, 10, 60)
+        self.assertIn(SHORT_JUMP_PROMPT, narrow)
+        self.assertTrue(narrow.endswith("[2/10]"))
+        self.assertLessEqual(display_width(narrow), 60)
+        self.assertNotIn(SHORT_JUMP_PROMPT, paginator.menu_message(1, 2, 60))
+
+    def test_diff_redraw(self):
+        # Turning to a page that only differs in a few cells costs less
+        # than drawing it from scratch
+        data = ["The same line of text\n"] * 40 + ["Different\n"]
+        self.paginate(data, 'q', windowed=True)
+        first_page = self.vscreen.bytes_sent
+        self.paginate(data, 'fq', windowed=True)
+        page_turn = self.vscreen.bytes_sent - first_page
+        self.assertGreater(first_page, 0)
+        self.assertLess(page_turn, first_page // 2)
+
+    def test_running_out_of_keys(self):
+        with self.assertRaises(screen_utils.screen.error):
+            self.paginate(["Only line\n"], '')
+
+    def test_show_text(self):
+        show_text("Hello", 1, 100, self.stdscr)
+        show_text("Left", 2, 100, self.stdscr, alignment=LEFT_ALIGNED)
+        center("Middle", 3, 100, self.stdscr)
+        draw_separator(4, 10, 100, self.stdscr)
+        self.stdscr.refresh()
+        rows = self.vscreen.snapshot()
+        self.assertEqual(rows[1], ' ' * 47 + "Hello")
+        self.assertTrue(rows[2].endswith("Left"))
+        self.assertEqual(rows[3].strip(), "Middle")
+        self.assertEqual(rows[4].strip(), '-' * 10)
+
+    def test_wide_characters(self):
+        self.assertEqual(display_width("Tokyo"), 5)
+        self.assertEqual(display_width("東京"), 4)
+        self.assertEqual(display_width("Cafe\u0301"), 4)
+        self.assertEqual(display_width("🦕 rex"), 6)
+        self.assertEqual(clip("東京都", 5), "東京")
+        self.assertEqual(clip("Tokyo", 3), "Tok")
+        self.assertEqual(split_rows("東京都庁", 5), ["東京", "都庁"])
+        self.assertEqual(split_rows("abcdefg", 3), ["abc", "def", "g"])
+        self.assertEqual(longest_width(["abc", SeparatorMarker(), "東京"]), 4)
+        self.assertEqual(longest_width([]), 0)
+        show_text("東京", 1, 100, self.stdscr)
+        self.stdscr.refresh()
+        self.assertEqual(self.vscreen.snapshot()[1], ' ' * 48 + "東京")
+        data = ["東京" * 15 + "\n", "x" * 70 + "\n"]
+        paginator = Paginator(windowed=True, wrap=True)
+        self.assertEqual(list(paginator.row_counts(data, 50)), [2, 2])
+        self.assertEqual([display_width(row[1]) for row in
+                          paginator.layout_rows(data[0], 50)], [50, 10])
+
+    def test_use_screen(self):
+        self.assertIs(screen_utils.screen, self.vscreen)
+        self.assertIs(screen_utils.use_screen(self.previous), self.vscreen)
+        self.assertIs(screen_utils.use_screen(self.vscreen), self.previous)
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_run(self):
+        results = paging_benchmark.run(2000)
+        self.assertTrue(all(seconds >= 0 and count > 0
+                            for description, seconds, count in results))
+        self.assertIn("render a page turn, window",
+                      [description for description, seconds, count in results])
+        self.assertEqual(len(paging_benchmark.report(results).split('\n')),
+                         len(results))
+        traffic = paging_benchmark.page_turn_traffic(2000)
+        # Only the cells that change are sent, which costs less than
+        # blanking and repainting the terminal on every page turn
+        self.assertLess(traffic["window"], traffic["full repaint"])
+        self.assertLessEqual(traffic["window"], traffic["pad"])
+
+if __name__ == '__main__':
+    unittest.main()
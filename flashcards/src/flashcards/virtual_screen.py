@@ -0,0 +1,315 @@
+"""
+A headless stand-in for curses
+
+VirtualScreen implements the part of the curses API that the paging engine
+in screen_utils uses (Paginator.paginate, show_text, draw_separator and
+center), on an in-memory framebuffer. Nothing is sent to a terminal, so
+pages can be rendered without a TTY: in unit tests, in batch jobs, and in
+benchmarks that count how much output each page turn would cost.
+
+Usage:
+
+    import screen_utils, virtual_screen
+    vscreen = virtual_screen.VirtualScreen(24, 80, keys="ffq")
+    previous = screen_utils.use_screen(vscreen)
+    screen_utils.Paginator().paginate(vscreen.initscr(), lines)
+    screen_utils.use_screen(previous)
+    print('\n'.join(vscreen.snapshot()))
+"""
+import curses
+from collections import deque
+
+# Rough cost, in bytes, of the escape sequence that moves the cursor to
+# the start of a run of changed cells, and of the one that clears the
+# whole screen.
+CURSOR_MOVE_BYTES       = 8
+CLEAR_SCREEN_BYTES      = 4
+
+class VirtualWindow:
+    """
+    A window (or pad) whose contents live in memory
+
+    Parameters:
+        screen:         the VirtualScreen this window belongs to
+        height:         number of rows
+        width:          number of columns
+        begin_y:        screen row of the top of the window
+        begin_x:        screen column of the left edge of the window
+        is_pad:         True for a pad (see VirtualScreen.newpad)
+    """
+    def __init__(self, screen, height, width, begin_y=0, begin_x=0,
+                 is_pad=False):
+        if height < 1 or width < 1:
+            raise curses.error("window has no rows or columns")
+        self.screen = screen
+        self.height = height
+        self.width = width
+        self.begin_y = begin_y
+        self.begin_x = begin_x
+        self.is_pad = is_pad
+        self.cells = [[' '] * width for y in range(height)]
+        self.cursor_y = 0
+        self.cursor_x = 0
+        self.touched = True
+
+    def getmaxyx(self):
+        return (self.height, self.width)
+
+    def getbegyx(self):
+        return (self.begin_y, self.begin_x)
+
+    def move(self, y, x):
+        if not (0 <= y < self.height and 0 <= x < self.width):
+            raise curses.error("move() returned ERR")
+        self.cursor_y, self.cursor_x = y, x
+
+    def put_char(self, ch):
+        """Write one character at the cursor, and advance the cursor"""
+        self.touched = True
+        if ch == '\n':
+            self.clrtoeol()
+            self.cursor_x = 0
+            self.cursor_y += 1
+        else:
+            self.cells[self.cursor_y][self.cursor_x] = ch
+            self.cursor_x += 1
+            if self.cursor_x >= self.width:
+                self.cursor_x = 0
+                self.cursor_y += 1
+        if self.cursor_y >= self.height:
+            # Like curses without scrolling: the text is drawn, but the
+            # cursor has nowhere to go.
+            self.cursor_y = self.height - 1
+            self.cursor_x = self.width - 1
+            raise curses.error("addwstr() returned ERR")
+
+    def addstr(self, *args):
+        """addstr([y, x,] text[, attr])"""
+        if len(args) >= 3:
+            self.move(args[0], args[1])
+            text = args[2]
+        else:
+            text = args[0]
+        for ch in str(text):
+            self.put_char(ch)
+
+    def addch(self, *args):
+        """addch([y, x,] ch[, attr])"""
+        if len(args) >= 3:
+            self.move(args[0], args[1])
+            ch = args[2]
+        else:
+            ch = args[0]
+        if isinstance(ch, int):
+            ch = chr(ch & 0xff) if ch > 0xff else chr(ch)
+        self.put_char(ch)
+
+    def clrtoeol(self):
+        row = self.cells[self.cursor_y]
+        for x in range(self.cursor_x, self.width):
+            row[x] = ' '
+        self.touched = True
+
+    def erase(self):
+        for row in self.cells:
+            for x in range(self.width):
+                row[x] = ' '
+        self.cursor_y, self.cursor_x = 0, 0
+        self.touched = True
+
+    def clear(self):
+        """Erase the window, and repaint the whole terminal next time"""
+        self.erase()
+        self.screen.clear_pending = True
+
+    def border(self, *args):
+        for x in range(self.width):
+            self.cells[0][x] = '-'
+            self.cells[self.height - 1][x] = '-'
+        for y in range(self.height):
+            self.cells[y][0] = '|'
+            self.cells[y][self.width - 1] = '|'
+        self.touched = True
+
+    def touchwin(self):
+        self.touched = True
+
+    def keypad(self, flag):
+        pass
+
+    def timeout(self, delay):
+        pass
+
+    def noutrefresh(self, *args):
+        """
+        Copy the window into the screen's next frame. A pad takes the same
+        six arguments as in curses: the top-left corner of the part of the
+        pad to show, and the screen rectangle to show it in.
+        """
+        if self.is_pad:
+            pad_y, pad_x, top, left, bottom, right = args
+        else:
+            pad_y, pad_x = 0, 0
+            top, left = self.begin_y, self.begin_x
+            bottom = top + self.height - 1
+            right = left + self.width - 1
+        for y in range(top, bottom + 1):
+            source_y = pad_y + (y - top)
+            if not (0 <= y < self.screen.height and
+                    0 <= source_y < self.height):
+                continue
+            for x in range(left, right + 1):
+                source_x = pad_x + (x - left)
+                if 0 <= x < self.screen.width and 0 <= source_x < self.width:
+                    self.screen.pending[y][x] = self.cells[source_y][source_x]
+        self.touched = False
+
+    def refresh(self, *args):
+        self.noutrefresh(*args)
+        self.screen.doupdate()
+
+    def getch(self):
+        if self.touched and not self.is_pad:
+            self.refresh()
+        return self.screen.next_key()
+
+    def getstr(self, *args):
+        """getstr([y, x,] [n]): read keys up to the end of the line"""
+        if len(args) >= 2:
+            self.move(args[0], args[1])
+        limit = args[-1] if len(args) in (1, 3) else None
+        text = ''
+        while True:
+            key = self.screen.next_key()
+            if key in (10, 13):
+                break
+            text += chr(key)
+        if limit is not None:
+            text = text[:limit]
+        return text.encode('utf-8')
+
+class VirtualScreen:
+    """
+    An in-memory terminal, with the curses functions the paging engine
+    needs
+
+    Keys for getch() and getstr() come from a queue, filled in advance
+    (keys=...) or with send_keys(); reading from an empty queue raises
+    curses.error, as curses does when there is no input.
+
+    The screen keeps what the terminal would be showing, and counts what
+    it would cost to get it there: doupdate() only "sends" the cells that
+    changed, and adds their bytes (plus an estimate for moving the cursor
+    to each run of changed cells) to bytes_sent.
+
+    Parameters:
+        height:         number of rows on the screen
+        width:          number of columns on the screen
+        keys:           string (or list of key codes) to read as input
+    """
+    error = curses.error
+    A_NORMAL = curses.A_NORMAL
+    A_BOLD = curses.A_BOLD
+    A_REVERSE = curses.A_REVERSE
+    ACS_HLINE = ord('-')
+    COLOR_BLACK = curses.COLOR_BLACK
+    COLOR_WHITE = curses.COLOR_WHITE
+    COLOR_RED = curses.COLOR_RED
+    COLOR_CYAN = curses.COLOR_CYAN
+    COLOR_YELLOW = curses.COLOR_YELLOW
+
+    def __init__(self, height=24, width=80, keys=()):
+        self.height = height
+        self.width = width
+        self.LINES, self.COLS = height, width
+        self.terminal = [[' '] * width for y in range(height)]
+        self.pending = [[' '] * width for y in range(height)]
+        self.keys = deque()
+        self.send_keys(keys)
+        self.clear_pending = False
+        self.cursor_visibility = 1
+        self.bytes_sent = 0
+        self.updates = 0
+        self.stdscr = None
+
+    def send_keys(self, keys):
+        """Add keys (a string, or key codes) to the input queue"""
+        for key in keys:
+            self.keys.append(ord(key) if isinstance(key, str) else key)
+
+    def next_key(self):
+        if len(self.keys) == 0:
+            raise curses.error("no input")
+        return self.keys.popleft()
+
+    def initscr(self):
+        if self.stdscr is None:
+            self.stdscr = VirtualWindow(self, self.height, self.width)
+        return self.stdscr
+
+    def newwin(self, *args):
+        """newwin(height, width[, begin_y, begin_x])"""
+        height, width = args[0], args[1]
+        begin_y, begin_x = (args[2], args[3]) if len(args) == 4 else (0, 0)
+        return VirtualWindow(self, height, width, begin_y, begin_x)
+
+    def newpad(self, height, width):
+        return VirtualWindow(self, height, width, is_pad=True)
+
+    def doupdate(self):
+        """Bring the terminal up to date with the next frame"""
+        self.updates += 1
+        if self.clear_pending:
+            self.bytes_sent += CLEAR_SCREEN_BYTES
+            self.terminal = [[' '] * self.width for y in range(self.height)]
+            self.clear_pending = False
+        for y in range(self.height):
+            shown, wanted = self.terminal[y], self.pending[y]
+            if shown == wanted:
+                continue
+            in_run = False
+            for x in range(self.width):
+                if shown[x] != wanted[x]:
+                    if not in_run:
+                        self.bytes_sent += CURSOR_MOVE_BYTES
+                        in_run = True
+                    self.bytes_sent += len(wanted[x].encode('utf-8'))
+                    shown[x] = wanted[x]
+                else:
+                    in_run = False
+
+    def snapshot(self):
+        """The text on the terminal, one string per row"""
+        return [''.join(row).rstrip() for row in self.terminal]
+
+    def curs_set(self, visibility):
+        previous = self.cursor_visibility
+        self.cursor_visibility = visibility
+        return previous
+
+    def color_pair(self, number):
+        return number << 8
+
+    def start_color(self):
+        pass
+
+    def init_pair(self, number, foreground, background):
+        pass
+
+    def echo(self):
+        pass
+
+    def noecho(self):
+        pass
+
+    def napms(self, milliseconds):
+        pass
+
+    def savetty(self):
+        pass
+
+    def resetty(self):
+        pass
+
+    def set_escdelay(self, milliseconds):
+        pass
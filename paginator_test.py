@@ -1,5 +1,6 @@
 import unittest
-from paginator import Paginator, PaginatorException
+from paginator import Paginator, PaginatorException, MappedDocument
+from paginator import INDEX_SUFFIX, PageTable, Pager
 import paginator, curses, re, os
 
 class TestPaginator(unittest.TestCase):
@@ -80,5 +81,172 @@ class TestPaginator(unittest.TestCase):
         finally:
             curses.endwin()
 
+    def test_windowed_long_document(self):
+        p = Paginator(windowed=True)
+        data = []
+        try:
+            stdscr = curses.initscr()
+            screen_lines, screen_columns = stdscr.getmaxyx()
+            # Longer than curses.newpad() can handle
+            total_lines = 66000
+            for y in range(0, total_lines):
+                data.append(f"{y:06} " + chr(ord('a') + (y*y) % 26) * 40 + '\n')
+            p.paginate(stdscr, data)
+            self.assertTrue(len(data) == total_lines)
+        finally:
+            curses.endwin()
+
+    def test_start_on_later_page(self):
+        p = Paginator(windowed=True)
+        data = [f"line {y}\n" for y in range(0, 1000)]
+        try:
+            stdscr = curses.initscr()
+            p.paginate(stdscr, data, first_line=900)
+            self.assertTrue(len(data) == 1000)
+        finally:
+            curses.endwin()
+
+    def test_wrapped_lines(self):
+        p = Paginator(windowed=True, wrap=True)
+        try:
+            stdscr = curses.initscr()
+            screen_lines, screen_columns = stdscr.getmaxyx()
+            data = [f"{y} " + 'x' * (y * screen_columns // 10) + '\n'
+                    for y in range(0, 200)]
+            p.paginate(stdscr, data)
+            self.assertTrue(len(data) == 200)
+        finally:
+            curses.endwin()
+
+class TestPageTable(unittest.TestCase):
+
+    def test_fixed_height_pages(self):
+        table = PageTable(1001, 20)
+        self.assertEqual(len(table), 51)
+        self.assertEqual(table.first_line(50), 1000)
+        self.assertEqual(table.end_line(50), 1001)
+        self.assertEqual(table.end_line(3), 80)
+        self.assertEqual(table.page_of(999), 49)
+        self.assertEqual(table.page_of(5000), 50)
+        self.assertEqual(len(PageTable(0, 20)), 0)
+        self.assertEqual(PageTable(0, 20).page_of(10), 0)
+
+    def test_wrapped_pages(self):
+        # Lines needing 1, 3, 1, 1 ... rows, on pages of 4 rows
+        counts = [1, 3, 1, 1, 1, 1, 9, 2, 2]
+        table = PageTable(len(counts), 4, counts)
+        self.assertEqual(list(table.starts), [0, 2, 6, 7])
+        self.assertEqual(len(table), 4)
+        self.assertEqual(table.end_line(1), 6)
+        self.assertEqual(table.end_line(3), len(counts))
+        self.assertEqual(table.page_of(5), 1)
+        self.assertEqual(table.page_of(8), 3)
+
+    def test_pager(self):
+        data = [f"line {y}\n" for y in range(0, 95)]
+        pager = Pager(data, 10)
+        self.assertEqual(len(pager), 10)
+        self.assertEqual(pager.forward(), 1)
+        self.assertEqual(pager.page_lines(), data[10:20])
+        self.assertEqual(pager.last(), 9)
+        self.assertEqual(pager.page_lines(), data[90:95])
+        self.assertEqual(pager.forward(), 9)
+        self.assertEqual(pager.first(), 0)
+        self.assertEqual(pager.backward(), 0)
+        self.assertEqual(pager.go_to(500), 9)
+        self.assertEqual(pager.go_to_percent(50), 4)
+        self.assertEqual(pager.go_to_line(42), 4)
+        self.assertEqual(Pager([], 10).page_lines(), [])
+
+    def test_handle_key(self):
+        p = Paginator()
+        pager = Pager([f"line {y}\n" for y in range(0, 100)], 10)
+        self.assertTrue(p.handle_key(ord('f'), pager, None))
+        self.assertEqual(pager.current_page, 1)
+        self.assertTrue(p.handle_key(ord('>'), pager, None))
+        self.assertEqual(pager.current_page, 9)
+        self.assertTrue(p.handle_key(ord('<'), pager, None))
+        self.assertEqual(pager.current_page, 0)
+        self.assertTrue(p.handle_key(ord('x'), pager, None))
+        self.assertEqual(pager.current_page, 0)
+        self.assertFalse(p.handle_key(ord('q'), pager, None))
+
+class TestMappedDocument(unittest.TestCase):
+
+    def setUp(self):
+        self.filename = 'mapped-test-output.txt'
+        self.data = [f"line {y}: " + chr(ord('a') + y % 26) * (y % 70) + '\n'
+                     for y in range(0, 500)]
+        with open(self.filename, 'w') as ofile:
+            ofile.writelines(self.data)
+
+    def tearDown(self):
+        os.remove(self.filename)
+        if os.path.exists(self.filename + INDEX_SUFFIX):
+            os.remove(self.filename + INDEX_SUFFIX)
+
+    def test_lines_on_demand(self):
+        with MappedDocument(self.filename) as document:
+            self.assertEqual(len(document), len(self.data))
+            self.assertEqual(document[3], self.data[3])
+            self.assertEqual(document[-1], self.data[-1])
+            self.assertEqual(document[100:140], self.data[100:140])
+            self.assertEqual(list(document), self.data)
+            self.assertEqual(document.offsets.itemsize, 8)
+
+    def test_unterminated_and_empty_files(self):
+        with open(self.filename, 'w') as ofile:
+            ofile.write('first\nsecond\r\nlast')
+        with MappedDocument(self.filename) as document:
+            self.assertEqual(list(document), ['first\n', 'second\n', 'last'])
+            self.assertEqual(list(document.line_widths()), [5, 6, 4])
+        with open(self.filename, 'w') as ofile:
+            pass
+        with MappedDocument(self.filename) as document:
+            self.assertEqual(len(document), 0)
+            self.assertEqual(document[0:10], [])
+
+    def test_wide_lines(self):
+        lines = ["\u6771\u4eac" * 5 + "\r\n", "abcdefghij\r\n", "\r\n",
+                 "Cafe\u0301 " * 3 + "\n", "abc"]
+        with open(self.filename, 'w', encoding='utf-8', newline='') as ofile:
+            ofile.writelines(lines)
+        with MappedDocument(self.filename) as document:
+            self.assertEqual(list(document.line_widths()), [20, 10, 0, 15, 3])
+            # The rows counted for the mapped document are the rows that
+            # layout_rows() draws
+            p = Paginator(windowed=True, wrap=True)
+            self.assertEqual(list(p.row_counts(document, 5)),
+                             [len(p.layout_rows(line, 5)) for line in document])
+            self.assertEqual(list(p.row_counts(document, 5)), [5, 2, 1, 3, 1])
+
+    def test_index_cache(self):
+        with MappedDocument(self.filename) as document:
+            self.assertIsNone(document.index_mapping)
+            built = list(document.offsets)
+        self.assertTrue(os.path.exists(self.filename + INDEX_SUFFIX))
+        with MappedDocument(self.filename) as document:
+            self.assertIsNotNone(document.index_mapping)
+            self.assertEqual(list(document.offsets), built)
+            self.assertEqual(document[-1], self.data[-1])
+        # Changing the source invalidates the index
+        with open(self.filename, 'a') as ofile:
+            ofile.write('one more line\n')
+        with MappedDocument(self.filename) as document:
+            self.assertIsNone(document.index_mapping)
+            self.assertEqual(len(document), len(self.data) + 1)
+            self.assertEqual(document[-1], 'one more line\n')
+
+    def test_mapped_loading(self):
+        p = Paginator(True)
+        try:
+            stdscr = curses.initscr()
+            document = p.load_data(stdscr, self.filename, mapped=True)
+            self.assertIsInstance(document, MappedDocument)
+            self.assertEqual(document[3], self.data[3])
+            document.close()
+        finally:
+            curses.endwin()
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,5 +1,21 @@
-import fileinput, curses, json
-from paginator import Paginator
+#
+# Presidents of the United States
+#
+# Run without arguments, this is an interactive (curses) guide to the
+# presidents. With --batch, it answers queries instead, one per line, from
+# the files named after it or from standard input, without starting curses:
+#
+#   $ printf 'year 1861\nstate IL\n' | python presidents.py --batch
+#
+# A query is one of "ordinal N", "year Y", "state XX" or "party P" (or just
+# the letter that chooses it in the interactive menu: o, y, s or p). Each
+# answer is a line of JSON, with the query and a list of results, or an
+# error message if the query couldn't be answered.
+#
+import fileinput, curses, json, bisect, sys
+from array import array
+from types import MappingProxyType
+from paginator import Paginator, center
 
 prompt = """
 To select a president by ordinal number, enter 'o'
@@ -9,6 +25,10 @@ To list all presidents in a given party, enter 'p'
 To quit, enter 'q'
 """
 MINIMUM_HEIGHT = 45
+TERM_LENGTH = 4
+BATCH_OPTION = '--batch'
+QUERY_KINDS = { 'o': 'ordinal', 'y': 'year', 's': 'state', 'p': 'party' }
+PRONOUN_CASES = ('subject', 'object', 'possessive')
 
 presidents = {}
 
@@ -65,17 +85,19 @@ states = { 'AL': 'Alabama',
     'WY': 'Wyoming'
     }
 
-presidential_states = {}
+# Read-only indexes, rebuilt by load_data(): the presidents from each state
+# (by abbreviation, with every state present) and from each party, and
+# the distinct parties in order of first appearance
+presidential_states = MappingProxyType({state: () for state in states})
+presidents_by_party = MappingProxyType({})
+parties = ()
 
-for state in states.keys():
-    presidential_states[state] = []
-
-def center(text, y_index, x_width, stdscr, *, color=0, mode=curses.A_NORMAL) -> None:
-    """Center the text"""
-    x_index = 0
-    fmtstring = "{:^" + str(x_width) + "s}"
-    attrs = curses.color_pair(color) | mode
-    stdscr.addstr(y_index, x_index, fmtstring.format(text), attrs)
+# The presidents in order of inauguration, the year each one was sworn in,
+# and the year each one's time in office ended (when the next one was sworn
+# in, or TERM_LENGTH years after the last one was), for for_year()
+inaugurated = []
+inauguration_years = array('H')
+term_ends = array('H')
 
 def ordinal(n: int) -> str:
     """Convert a cardinal number to an ordinal."""
@@ -85,6 +107,18 @@ def ordinal(n: int) -> str:
         suffix = ['th', 'st', 'nd', 'rd', 'th'][min(n % 10, 4)]
     return str(n) + suffix
 
+# The pronoun for each case, by pronoun string (such as 'she/her/her');
+# presidents with the same pronouns share a table
+pronoun_tables = {}
+
+def pronoun_table(pronouns: str) -> MappingProxyType:
+    """Split a pronoun string into a table of pronouns by case."""
+    table = pronoun_tables.get(pronouns)
+    if table is None:
+        table = MappingProxyType(dict(zip(PRONOUN_CASES, pronouns.split('/'))))
+        pronoun_tables[pronouns] = table
+    return table
+
 class President:
     """A President of the United States.
 
@@ -92,44 +126,51 @@ class President:
     the state of residence at the time of inauguration, the preferred
     pronouns, party affiliation, and the key (which is simply the ordinal
     number of a given president in the historical record).
+
+    The three sentences about a president (see __getitem__) are written the
+    first time one of them is needed, and kept.
     """
+    __slots__ = ('key', 'name', 'sworn_in', 'state', 'state_code',
+                 'pronouns', 'pronoun_table', 'party', 'sentences')
+
     def __init__(self, key: str, name: str, sworn_in: str,
                  state: str, pronouns: str, party: str):
         self.key = int(key)
         self.name = name
         self.sworn_in = int(sworn_in)
         self.state = states[state]
+        self.state_code = state
         self.pronouns = pronouns
+        self.pronoun_table = pronoun_table(pronouns)
         self.party = party
+        self.sentences = None
 
     def pronoun(self, p_case: str) -> str:
         """Find appropriate pronoun for a given case"""
-        cases = ['subject', 'object', 'possessive']
-        pronouns = self.pronouns.split('/')
-        p_table = dict(zip(cases, pronouns))
-        return p_table[p_case]
+        return self.pronoun_table[p_case]
+
+    def write_sentences(self) -> tuple:
+        """Write the sentences about this president."""
+        subject = self.pronoun('subject').capitalize()
+        if self.party != 'None':
+            affiliation = f"{subject} was a member of the {self.party} Party."
+        else:
+            affiliation = f"{subject} was not affiliated with any " + \
+                           "political party."
+        return (f"{self.name}, {ordinal(self.key)} " + \
+                 "president of the United " + \
+                f"States, was inaugurated in {str(self.sworn_in)}.",
+                f"{subject} was a resident of " + \
+                f"{self.state} on Inauguration Day.",
+                affiliation)
 
     def __getitem__(self, key):
-        result = ""
+        if self.sentences is None:
+            self.sentences = self.write_sentences()
         match key:
-            case 0:
-                result = f"{self.name}, {ordinal(self.key)} " + \
-                          "president of the United " + \
-                         f"States, was inaugurated in {str(self.sworn_in)}."
-            case 1:
-                result = f"{self.pronoun('subject').capitalize()} " + \
-                          "was a resident of " + \
-                         f"{self.state} on Inauguration Day."
-            case 2:
-                if self.party != 'None':
-                    result = f"{self.pronoun('subject').capitalize()} " + \
-                               "was a member of the " + \
-                              f"{self.party} Party."
-                else:
-                    result = f"{self.pronoun('subject').capitalize()} " + \
-                               "was not affiliated with any " + \
-                               "political party."
-        return result
+            case 0 | 1 | 2:
+                return self.sentences[key]
+        return ""
 
 
     def display(self, y_index, x_width, stdscr) -> None:
@@ -143,36 +184,59 @@ class President:
 class PresidentEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, President):
-            output = {  "title" : obj.name,
+            output = {  "key" : obj.key,
+                        "title" : obj.name,
                         "sworn_in" : obj.sworn_in,
-                        "pronouns" : obj.pronouns }
+                        "state" : obj.state,
+                        "pronouns" : obj.pronouns,
+                        "party" : obj.party }
             return output
         return json.JSONEncoder.default(self, obj)
 
 def for_year(year: int) -> President:
-    """Find out who was president in the given year."""
+    """
+    Find out who was president in the given year. In a year when a new
+    president was sworn in, that's the new president.
+    """
     y = int(year)
-    if (y < 1789) | (y > 2024):
+    if len(inaugurated) == 0 or \
+       (y < inauguration_years[0]) | (y >= term_ends[-1]):
         raise ValueError('Invalid year')
-    for i in presidents.keys():
-        if presidents[i].sworn_in > y:
-            target_key = int(i) - 1
-            return presidents[str(target_key)]
+    return inaugurated[bisect.bisect_right(inauguration_years, y) - 1]
+
+def for_years(years) -> list:
+    """
+    Find out who was president in each of the given years (a list or a
+    range, in any order), with None for the years before the first
+    president or after the end of the latest one's term
+
+    The years are looked up in order, in one pass over the presidents,
+    so a long timeline costs little more than sorting it.
+    """
+    years = [int(y) for y in years]
+    result = [None] * len(years)
+    if len(inaugurated) == 0:
+        return result
+    last = len(inaugurated) - 1
+    n = 0
+    for i in sorted(range(len(years)), key=years.__getitem__):
+        y = years[i]
+        if (y < inauguration_years[0]) | (y >= term_ends[-1]):
+            continue
+        while n < last and inauguration_years[n + 1] <= y:
+            n += 1
+        result[i] = inaugurated[n]
+    return result
 
 def choose_party(y_index, x_width, stdscr) -> str:
     """Enable user to choose a party from a menu."""
-    parties = {}
-    menu_option = 1
-    for president in presidents.values():
-        if president.party not in parties.values():
-            parties[menu_option] = president.party
-            menu_option += 1
+    options = dict(enumerate(parties, 1))
     stdscr.clear()
     center("Please choose one of the following options...",
             y_index, x_width, stdscr, color=1)
     y_index += 1
-    for option in parties.keys():
-        center(f"{option}. {parties[option]}",
+    for option in options.keys():
+        center(f"{option}. {options[option]}",
                 y_index, x_width, stdscr, color=1)
         y_index += 1
     party = ""
@@ -188,7 +252,7 @@ def choose_party(y_index, x_width, stdscr) -> str:
             curses.echo()
             key = stdscr.getstr(y_index,
                 ((x_width // 2) + len(party_prompt))).decode("utf-8")
-            party = parties[int(key)]
+            party = options[int(key)]
             break
         except(ValueError, KeyError):
             party = ""
@@ -204,11 +268,9 @@ def choose_party(y_index, x_width, stdscr) -> str:
     stdscr.refresh()
     return party
 
-def by_party(party: str) -> list:
+def by_party(party: str) -> tuple:
     """Find out which presidents belonged to a given party"""
-    for key in presidents.keys():
-        if presidents[key].party == party:
-            yield presidents[key]
+    return presidents_by_party.get(party, ())
 
 #
 # Initialize the system
@@ -219,8 +281,83 @@ def load_data() -> None:
         key = stats[0]
         p = President(key, stats[1], stats[2], stats[3], stats[4], stats[5])
         presidents[key] = p
-        presidential_states[stats[3]].append(key)
     fileinput.close()
+    index_groups()
+    index_years()
+
+def index_groups() -> None:
+    """Group the presidents by state and by party."""
+    global presidential_states, presidents_by_party, parties
+    state_members = {state: [] for state in states}
+    party_members = {}
+    for president in sorted(presidents.values(), key=lambda p: p.key):
+        state_members[president.state_code].append(president)
+        party_members.setdefault(president.party, []).append(president)
+    presidential_states = MappingProxyType(
+        {state: tuple(members) for state, members in state_members.items()})
+    presidents_by_party = MappingProxyType(
+        {party: tuple(members) for party, members in party_members.items()})
+    parties = tuple(party_members)
+
+def index_years() -> None:
+    """Sort the presidents by inauguration, and work out their terms."""
+    inaugurated[:] = sorted(presidents.values(),
+                            key=lambda p: (p.sworn_in, p.key))
+    inauguration_years[:] = array('H', (p.sworn_in for p in inaugurated))
+    term_ends[:] = inauguration_years[1:]
+    if len(inaugurated) > 0:
+        term_ends.append(inauguration_years[-1] + TERM_LENGTH)
+
+def query(kind: str, argument: str) -> list:
+    """
+    Answer a query: find the presidents for an ordinal number, a year, a
+    state (by abbreviation) or a party.
+
+    Raises ValueError if the query can't be answered.
+    """
+    kind = QUERY_KINDS.get(kind.lower(), kind.lower())
+    match kind:
+        case 'ordinal' | 'year' if not argument.isdigit():
+            raise ValueError("That is not a valid number")
+        case 'ordinal':
+            try:
+                return [presidents[str(int(argument))]]
+            except(KeyError):
+                raise ValueError(f"There are only {len(presidents)} presidents")
+        case 'year':
+            return [for_year(argument)]
+        case 'state':
+            try:
+                return list(presidential_states[argument.upper()])
+            except(KeyError):
+                raise ValueError("That is not a valid state")
+        case 'party':
+            return list(by_party(argument))
+    raise ValueError(f"Unknown query: {kind}")
+
+def run_batch(queries, output) -> int:
+    """
+    Answer queries, one per line, writing each answer to output as a line
+    of JSON. Blank lines, and lines starting with '#', are skipped.
+
+    Returns the number of queries answered.
+    """
+    encoder = PresidentEncoder()
+    answered = 0
+    for line in queries:
+        line = line.strip()
+        if len(line) == 0 or line.startswith('#'):
+            continue
+        kind, _, argument = line.partition(' ')
+        try:
+            answer = { "query" : line,
+                       "results" : query(kind, argument.strip()) }
+        except(ValueError) as query_ex:
+            answer = { "query" : line, "error" : str(query_ex) }
+        output.write(encoder.encode(answer))
+        output.write('\n')
+        answered += 1
+    return answered
 
 def do_loop(stdscr):
     k = 0
@@ -300,7 +437,7 @@ def do_loop(stdscr):
                     message = "The office of President of the "\
                               "United States did not exist " + \
                               f"in the year {year}."
-                elif(int(year) > 2024):
+                elif(int(year) >= term_ends[-1]):
                     message = "We do not know who will be president " + \
                               f"in the year {year}."
                 else:
@@ -363,8 +500,7 @@ def do_loop(stdscr):
                             (width // 2) - (len(title_line) // 2),
                             title_line, curses.A_BOLD | curses.color_pair(1))
                 stdscr.refresh()
-                for key in results:
-                    president_list.append(presidents[key])
+                president_list.extend(results)
         elif result == ord('p'):
             p = Paginator(centered=True, quit_prompt="e: escape", quit_char='e')
             party = choose_party(3, width, stdscr)
@@ -406,6 +542,10 @@ def do_loop(stdscr):
 
 def main():
     load_data()
+    if len(sys.argv) > 1 and sys.argv[1] == BATCH_OPTION:
+        with fileinput.FileInput(files=sys.argv[2:]) as queries:
+            run_batch(queries, sys.stdout)
+        return
     curses.wrapper(do_loop)
 
 if __name__ == "__main__":
@@ -0,0 +1,170 @@
+#
+# A local HTTP service for the presidents data
+#
+# The data in presidents.tsv is loaded once, and other tools can query it
+# over HTTP instead of parsing the file themselves:
+#
+#   $ python presidents_server.py [port]
+#   $ curl http://127.0.0.1:8046/year/1861
+#
+# The paths are /ordinal/N, /year/Y, /state/XX and /party/P (with any spaces
+# in the party's name written as %20). Each answer is JSON: the query and a
+# list of results, as in the batch mode of presidents.py, or an error
+# message with a 404 status if the query couldn't be answered.
+#
+# Connections are kept open between requests (unless the client asks for
+# them to be closed), and each one is handled by a coroutine, so many
+# clients can be served at once by a single thread. Requests have no use
+# for a body, so a connection is closed after any request that sends one
+# (rather than reading it), and after any request that isn't a GET or a
+# HEAD; that way, a body can never be mistaken for the next request.
+#
+import asyncio, functools, sys
+from urllib.parse import unquote
+import presidents
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8046
+KEEP_ALIVE_SECONDS = 15
+MAX_HEADERS = 100
+ANSWER_CACHE_SIZE = 4096
+REASONS = { 200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+            405: 'Method Not Allowed' }
+ROUTES = { 'ordinal', 'year', 'state', 'party' }
+
+class BadRequest(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+
+@functools.lru_cache(maxsize=ANSWER_CACHE_SIZE)
+def answer(path: str) -> tuple:
+    """
+    Answer the query in a request's path, as a status code and a JSON body.
+    The data doesn't change while the server is running, so the answers to
+    recent queries are cached.
+    """
+    kind, _, argument = path.strip('/').partition('/')
+    argument = unquote(argument)
+    if kind not in ROUTES or len(argument) == 0:
+        status = 404
+        result = { "query" : path, "error" : f"Unknown query: {path}" }
+    else:
+        try:
+            status = 200
+            result = { "query" : path,
+                       "results" : presidents.query(kind, argument) }
+        except(ValueError) as query_ex:
+            status = 404
+            result = { "query" : path, "error" : str(query_ex) }
+    return status, presidents.PresidentEncoder().encode(result).encode('utf-8')
+
+def response(status: int, body: bytes, keep_alive: bool,
+             head_only=False) -> bytes:
+    """Put together an HTTP response."""
+    headers = [ f"HTTP/1.1 {status} {REASONS[status]}",
+                "Content-Type: application/json",
+                f"Content-Length: {len(body)}",
+                "Connection: " + ("keep-alive" if keep_alive else "close") ]
+    head = ('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1')
+    if head_only:
+        return head
+    return head + body
+
+async def read_request(reader) -> tuple:
+    """
+    Read the request line and headers of the next request on a connection.
+
+    Returns (method, path, keep_alive), or None if the client has closed
+    the connection, or left it idle for KEEP_ALIVE_SECONDS (waiting for
+    the request line, or for the rest of the headers).
+    """
+    try:
+        return await asyncio.wait_for(read_headers(reader), KEEP_ALIVE_SECONDS)
+    except(asyncio.TimeoutError):
+        return None
+
+async def read_headers(reader) -> tuple:
+    """Read a request line and headers, for read_request()."""
+    line = await reader.readline()
+    if len(line) == 0:
+        return None
+    try:
+        method, path, version = line.decode('latin-1').split()
+    except(ValueError):
+        raise BadRequest("Malformed request line")
+    keep_alive = version == 'HTTP/1.1' and method in ('GET', 'HEAD')
+    for n in range(MAX_HEADERS + 1):
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == 'connection':
+            if value == 'close':
+                keep_alive = False
+            elif value == 'keep-alive' and method in ('GET', 'HEAD'):
+                keep_alive = True
+        elif name == 'transfer-encoding' or \
+             (name == 'content-length' and value != '0'):
+            # There's a body, which isn't read
+            keep_alive = False
+    else:
+        raise BadRequest("Too many headers")
+    return method, path, keep_alive
+
+async def handle_connection(reader, writer) -> None:
+    """Answer the requests on one connection, until it's closed."""
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except(BadRequest, ValueError) as request_ex:
+                # ValueError: a line longer than the stream's buffer limit
+                body = presidents.PresidentEncoder().encode(
+                    { "error" : str(request_ex) }).encode('utf-8')
+                writer.write(response(400, body, False))
+                break
+            if request is None:
+                break
+            method, path, keep_alive = request
+            if method in ('GET', 'HEAD'):
+                status, body = answer(path.partition('?')[0])
+            else:
+                status, body = 405, presidents.PresidentEncoder().encode(
+                    { "error" : f"{method} is not supported" }).encode('utf-8')
+            writer.write(response(status, body, keep_alive,
+                                  head_only=(method == 'HEAD')))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except(ConnectionError):
+        pass
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except(ConnectionError):
+            pass
+
+async def start_server(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Load the data, and start listening (port 0 picks a free port)."""
+    presidents.load_data()
+    answer.cache_clear()
+    return await asyncio.start_server(handle_connection, host, port)
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT) -> None:
+    server = await start_server(host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Serving presidents on http://{address[0]}:{address[1]}/")
+    async with server:
+        await server.serve_forever()
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT
+    try:
+        asyncio.run(serve(port=port))
+    except(KeyboardInterrupt):
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import unittest, asyncio, json, time
+import presidents_server
+
+class TestServer(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = await presidents_server.start_server(port=0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        # Let the server see that the clients have hung up
+        await asyncio.sleep(0.05)
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def connect(self):
+        return await asyncio.open_connection('127.0.0.1', self.port)
+
+    async def hang_up(self, writer):
+        writer.close()
+        await writer.wait_closed()
+
+    async def get(self, reader, writer, path, headers=""):
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n"
+                     f"{headers}\r\n".encode('latin-1'))
+        await writer.drain()
+        status_line = await reader.readline()
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1')
+            if line == '\r\n':
+                break
+            name, _, value = line.partition(':')
+            response_headers[name.lower()] = value.strip()
+        body = await reader.readexactly(
+            int(response_headers['content-length']))
+        return status, response_headers, json.loads(body)
+
+    async def test_queries(self):
+        reader, writer = await self.connect()
+        status, headers, body = await self.get(reader, writer, '/ordinal/16')
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['connection'], 'keep-alive')
+        self.assertEqual(body['results'][0]['title'], 'Abraham Lincoln')
+        status, headers, body = await self.get(reader, writer, '/year/1861')
+        self.assertEqual(body['results'][0]['key'], 16)
+        status, headers, body = await self.get(reader, writer, '/state/il')
+        self.assertEqual(len(body['results']), 3)
+        status, headers, body = await self.get(reader, writer,
+                                               '/party/National%20Union')
+        self.assertEqual(body['results'][0]['title'], 'Andrew Johnson')
+        for path in ['/year/1700', '/state/ZZ', '/senator/1', '/']:
+            status, headers, body = await self.get(reader, writer, path)
+            self.assertEqual(status, 404)
+            self.assertIn('error', body)
+        status, headers, body = await self.get(reader, writer, '/ordinal/1',
+                                               "Connection: close\r\n")
+        self.assertEqual(headers['connection'], 'close')
+        self.assertEqual(await reader.read(), b'')
+        await self.hang_up(writer)
+
+    async def test_bad_requests(self):
+        # The body of a request is never taken for the next request: the
+        # connection is closed instead
+        reader, writer = await self.connect()
+        writer.write(b"POST /ordinal/1 HTTP/1.1\r\nContent-Length: 28\r\n"
+                     b"\r\nGET /ordinal/2 HTTP/1.1\r\n\r\n")
+        self.assertIn(b' 405 ', await reader.readline())
+        response = await reader.read()
+        self.assertIn(b'Connection: close', response)
+        self.assertNotIn(b' 200 ', response)
+        await self.hang_up(writer)
+        reader, writer = await self.connect()
+        status, headers, body = await self.get(reader, writer, '/ordinal/1',
+                                               "Content-Length: 5\r\n")
+        self.assertEqual(headers['connection'], 'close')
+        await self.hang_up(writer)
+        reader, writer = await self.connect()
+        writer.write(b"GET /ordinal/1 HTTP/1.1\r\n" +
+                     b"X-Padding: 1\r\n" * (presidents_server.MAX_HEADERS + 1)
+                     + b"\r\n")
+        self.assertIn(b' 400 ', await reader.readline())
+        await self.hang_up(writer)
+        reader, writer = await self.connect()
+        writer.write(b"nonsense\r\n\r\n")
+        self.assertIn(b' 400 ', await reader.readline())
+        await self.hang_up(writer)
+
+    async def test_stalled_headers(self):
+        # A client that stops part of the way through its headers is
+        # hung up on, after KEEP_ALIVE_SECONDS
+        keep_alive = presidents_server.KEEP_ALIVE_SECONDS
+        presidents_server.KEEP_ALIVE_SECONDS = 0.2
+        try:
+            reader, writer = await self.connect()
+            writer.write(b"GET /ordinal/1 HTTP/1.1\r\nHost: localhost\r\n")
+            self.assertEqual(await asyncio.wait_for(reader.read(), 5), b'')
+            await self.hang_up(writer)
+        finally:
+            presidents_server.KEEP_ALIVE_SECONDS = keep_alive
+
+    async def test_concurrent_clients(self):
+        async def client(n):
+            reader, writer = await self.connect()
+            for i in range(50):
+                status, headers, body = await self.get(
+                    reader, writer, f"/ordinal/{(n + i) % 46 + 1}")
+                self.assertEqual(body['results'][0]['key'], (n + i) % 46 + 1)
+            await self.hang_up(writer)
+        start = time.perf_counter()
+        await asyncio.gather(*(client(n) for n in range(20)))
+        self.assertLess(time.perf_counter() - start, 10.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,7 @@
-import unittest
-from presidents import presidents, load_data, President
+import unittest, io, json, subprocess, sys
+import presidents as presidents_module
+from presidents import presidents, load_data, President, for_year, \
+                       for_years, term_ends, by_party, query, run_batch
 import re
 
 class TestInitialization(unittest.TestCase):
@@ -42,5 +44,114 @@ class TestInitialization(unittest.TestCase):
         johnny_re = re.compile('.+was inaugurated in 2028.$')
         self.assertTrue(johnny_re.match(johnny[0]) != None)
 
+    def test_cached_sentences(self):
+        hilda = President('1', 'Hilda Hansen', '2044', 'NE',
+                          'she/her/her', 'None')
+        ruth = President('2', 'Ruth Olsen', '2048', 'MN',
+                         'she/her/her', 'Farmer-Labor')
+        self.assertIsNone(hilda.sentences)
+        self.assertEqual(hilda[1],
+                         "She was a resident of Nebraska on Inauguration Day.")
+        self.assertEqual(hilda[2],
+                         "She was not affiliated with any political party.")
+        self.assertIs(hilda[0], hilda[0])
+        self.assertEqual(hilda[3], "")
+        self.assertIs(hilda.pronoun_table, ruth.pronoun_table)
+        with self.assertRaises(AttributeError):
+            hilda.nickname = 'Hil'
+
+class TestYears(unittest.TestCase):
+
+    def setUp(self):
+        load_data()
+
+    def test_for_year(self):
+        self.assertEqual(for_year(1789).name, 'George Washington')
+        self.assertEqual(for_year(1796).name, 'George Washington')
+        self.assertEqual(for_year(1797).name, 'John Adams')
+        self.assertEqual(for_year(1841).name, 'John Tyler')
+        latest = max(presidents.values(), key=lambda p: p.sworn_in)
+        self.assertIs(for_year(latest.sworn_in + 3), latest)
+        self.assertEqual(term_ends[-1], latest.sworn_in + 4)
+        for year in [1788, latest.sworn_in + 4]:
+            with self.assertRaises(ValueError):
+                for_year(year)
+
+    def test_for_years(self):
+        years = range(1780, term_ends[-1] + 5)
+        expected = []
+        for year in years:
+            try:
+                expected.append(for_year(year))
+            except ValueError:
+                expected.append(None)
+        self.assertEqual(for_years(years), expected)
+        self.assertEqual(for_years(reversed(years)), expected[::-1])
+        self.assertEqual([p.name for p in for_years([1861, '1797', 1861])],
+                         ['Abraham Lincoln', 'John Adams', 'Abraham Lincoln'])
+
+class TestIndexes(unittest.TestCase):
+
+    def test_indexes(self):
+        load_data()
+        load_data()
+        indexes = presidents_module
+        self.assertEqual(sum(map(len, indexes.presidents_by_party.values())),
+                         len(presidents))
+        self.assertEqual(sum(map(len, indexes.presidential_states.values())),
+                         len(presidents))
+        self.assertEqual(indexes.parties[:2], ('None', 'Federalist'))
+        self.assertEqual(len(set(indexes.parties)), len(indexes.parties))
+        self.assertEqual([p.name for p in indexes.presidential_states['MA']],
+                         ['John Adams', 'John Quincy Adams',
+                          'Calvin Coolidge', 'John F. Kennedy'])
+        self.assertEqual(indexes.presidential_states['AK'], ())
+        self.assertIs(by_party('Whig'), indexes.presidents_by_party['Whig'])
+        self.assertEqual(by_party('Bull Moose'), ())
+        with self.assertRaises(TypeError):
+            indexes.presidents_by_party['Whig'] = ()
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        load_data()
+
+    def test_query(self):
+        self.assertEqual([p.name for p in query('ordinal', '16')],
+                         ['Abraham Lincoln'])
+        self.assertEqual(query('y', '1861'), query('o', '16'))
+        self.assertEqual(len(query('state', 'oh')), 6)
+        self.assertEqual(query('party', 'National Union')[0].key, 17)
+        for kind, argument in [('ordinal', '0'), ('year', '1700'),
+                               ('state', 'ZZ'), ('year', 'soon'),
+                               ('colour', 'blue')]:
+            with self.assertRaises(ValueError):
+                query(kind, argument)
+
+    def test_run_batch(self):
+        queries = io.StringIO("year 1861\n# comment\n\nstate XX\n" +
+                              "party Whig\n")
+        output = io.StringIO()
+        self.assertEqual(run_batch(queries, output), 3)
+        answers = [json.loads(line)
+                   for line in output.getvalue().splitlines()]
+        self.assertEqual(answers[0]['results'][0],
+                         { "key" : 16, "title" : "Abraham Lincoln",
+                           "sworn_in" : 1861, "state" : "Illinois",
+                           "pronouns" : "he/him/his",
+                           "party" : "Republican" })
+        self.assertIn('error', answers[1])
+        self.assertEqual(len(answers[2]['results']), 4)
+
+    def test_batch_option(self):
+        cp = subprocess.run(
+            [sys.executable, "presidents.py", "--batch"],
+            input="ordinal 1\n" * 1000, capture_output=True, text=True
+        )
+        lines = cp.stdout.splitlines()
+        self.assertEqual(len(lines), 1000)
+        self.assertEqual(json.loads(lines[-1])['results'][0]['title'],
+                         'George Washington')
+
 if __name__ == '__main__':
     unittest.main()
@@ -14,10 +14,16 @@
 #
 # To address that shortcoming, I create a hash containing the fifteen separate
 # books, and two epilogues, in Tolstoy's text.
+#
+# The Paginator now has a windowed mode, which draws only the lines on the
+# current page and never allocates a pad for the whole document. The reader
+# uses that mode, so the entire novel can also be opened in one piece (enter
+# '00' at the menu). The books are still there, for navigation.
 
 import paginator
 from curses import wrapper
-import curses, sys, re
+import curses, sys, re, bisect, functools, os, struct
+from array import array
 
 
 SOURCE_FILENAME = 'war-and-peace.txt'
@@ -27,57 +33,294 @@ TEXT_STYLE = 1
 TITLE_STYLE = 2
 MENU_STYLE = 3
 TITLE_STRING = "Leo Tolstoy's WAR AND PEACE"
+TOTAL_BOOKS = 17
+BOOK_CACHE_SIZE = 3
+SEARCH_CHAR = '/'
+SEARCH_SUFFIX = '.words'
+SEARCH_MAGIC = b'WPWORDS2'
+# Line numbers are saved as unsigned 32-bit integers; the typecode and item
+# size are kept in the header, so an index saved by a platform where 'I' is
+# a different size is rebuilt rather than misread.
+POSTING_TYPECODE = 'I'
+SEARCH_HEADER = struct.Struct('<8sQQ16sQQ1sB')
+WORD_RE = re.compile(r"\w+(?:'\w+)*")
+# One pattern finds everything the reader needs to know about the layout
+# of the novel: entries in the table of contents (indented), the headings
+# of the books and epilogues, and the headings of the chapters. BOOK and
+# CHAPTER are followed by spaces or tabs and then a number on the same line
+# (\s would also match a line break, and take a bare BOOK or CHAPTER, with
+# the line after it, for a heading).
+LAYOUT_RE = re.compile(
+    rb'^(?P<toc>[ \t]{4}(?:BOOK[ \t]+.+|(?:FIRST|SECOND) EPILOGUE.*))'
+    rb'|^(?P<book>BOOK[ \t]+.+|(?:FIRST|SECOND) EPILOGUE.*)'
+    rb'|^(?P<chapter>CHAPTER[ \t]+.+)',
+    re.MULTILINE
+)
 
 toc = []
+# Each book is a (start, end) range of line numbers in the novel; the text
+# is only read when the book is opened (see open_book).
 books = {}
+chapters = {}
+novel = None
+search_index = None
 
 class ScreenSetupError(Exception):
     pass
 
+class SearchIndex:
+    """
+    An inverted index of the words in a document: for each word, the
+    numbers of the lines on which it appears.
+
+    The words are stored in sorted order, with all of their line numbers
+    packed into one array, so the index can be written to disk and read
+    back without parsing.
+    """
+    def __init__(self, words, starts, postings):
+        self.words = words
+        self.starts = starts
+        self.postings = postings
+        self.lookup = {word: i for i, word in enumerate(words)}
+
+    @classmethod
+    def build(cls, document):
+        """Index every word of every line in the document"""
+        table = {}
+        for line_number, line in enumerate(document):
+            for word in set(WORD_RE.findall(line.lower())):
+                if word in table:
+                    table[word].append(line_number)
+                else:
+                    table[word] = array(POSTING_TYPECODE, [line_number])
+        words = sorted(table)
+        starts = array('Q', [0])
+        postings = array(POSTING_TYPECODE)
+        for word in words:
+            postings.extend(table[word])
+            starts.append(len(postings))
+        return cls(words, starts, postings)
+
+    @classmethod
+    def load(cls, document):
+        """
+        Read the index saved next to the document, or return None if there
+        isn't one, or if the document has changed since it was saved
+        """
+        filename = document.filename
+        try:
+            with open(filename + SEARCH_SUFFIX, 'rb') as f:
+                header = f.read(SEARCH_HEADER.size)
+                (magic, size, mtime, digest, word_count, posting_count,
+                 typecode, itemsize) = SEARCH_HEADER.unpack(header)
+                stats = os.stat(filename)
+                postings = array(POSTING_TYPECODE)
+                if (magic != SEARCH_MAGIC or size != stats.st_size
+                        or mtime != stats.st_mtime_ns
+                        or digest != paginator.source_digest(document.buffer)
+                        or typecode != POSTING_TYPECODE.encode('ascii')
+                        or itemsize != postings.itemsize
+                        or sys.byteorder == 'big'):
+                    return None
+                starts = array('Q')
+                starts.fromfile(f, word_count + 1)
+                postings.fromfile(f, posting_count)
+                text = f.read().decode('utf-8')
+        except (OSError, EOFError, struct.error, UnicodeDecodeError):
+            return None
+        # ''.split('\n') is [''], not [], so an empty index is a special case
+        words = text.split('\n') if word_count > 0 else []
+        if len(words) != word_count or (word_count == 0 and len(text) > 0):
+            return None
+        return cls(words, starts, postings)
+
+    def save(self, document):
+        """Write the index next to the document it was built from"""
+        filename = document.filename
+        stats = os.stat(filename)
+        header = SEARCH_HEADER.pack(SEARCH_MAGIC, stats.st_size,
+                                    stats.st_mtime_ns,
+                                    paginator.source_digest(document.buffer),
+                                    len(self.words), len(self.postings),
+                                    POSTING_TYPECODE.encode('ascii'),
+                                    self.postings.itemsize)
+        temp_name = filename + SEARCH_SUFFIX + '.tmp'
+        with open(temp_name, 'wb') as f:
+            f.write(header)
+            self.starts.tofile(f)
+            self.postings.tofile(f)
+            f.write('\n'.join(self.words).encode('utf-8'))
+        os.replace(temp_name, filename + SEARCH_SUFFIX)
+
+    def lines_for(self, word):
+        """The line numbers on which a word appears"""
+        i = self.lookup.get(word.lower())
+        if i is None:
+            return self.postings[0:0]
+        return self.postings[self.starts[i]:self.starts[i + 1]]
+
+    def search(self, query):
+        """The line numbers (in order) that contain every word in the query"""
+        postings = sorted((self.lines_for(word)
+                           for word in WORD_RE.findall(query.lower())), key=len)
+        if len(postings) == 0:
+            return []
+        # Start from the rarest word, and look for each of its lines in the
+        # (sorted) line numbers of the other words.
+        hits = postings[0].tolist()
+        for lines in postings[1:]:
+            hits = [n for n in hits
+                    if (i := bisect.bisect_left(lines, n)) < len(lines)
+                        and lines[i] == n]
+        return hits
+
+def scan_novel(document):
+    """
+    Find the layout of the novel in a single pass over its text.
+
+    Parameters:
+        document:   a paginator.MappedDocument containing the novel
+
+    Returns a tuple (toc, bookmarks, chapter_marks): the lines of the table
+    of contents, the line number at which each book or epilogue begins,
+    and a dictionary of the line numbers at which the chapters of each
+    book begin (keyed by the 1-based number of the book).
+    """
+    contents, bookmarks, chapter_marks = [], [], {}
+    for match in LAYOUT_RE.finditer(document.buffer):
+        line_number = bisect.bisect_right(document.offsets,
+                                          match.start()) - 1
+        if match.lastgroup == 'toc':
+            contents.append(document[line_number])
+        elif match.lastgroup == 'book':
+            bookmarks.append(line_number)
+            chapter_marks[len(bookmarks)] = []
+        elif len(bookmarks) > 0:
+            chapter_marks[len(bookmarks)].append(line_number)
+    return contents, bookmarks, chapter_marks
+
 def do_setup():
     '''Initialize the system.'''
-    result = 0
-    book_re = re.compile(r'^\s{4}BOOK.+')
-    epilogue_re = re.compile(r'^\s{4}(FIRST|SECOND) EPILOGUE')
-    with open(SOURCE_FILENAME) as txt:
-        for line in txt.readlines():
-            if(book_re.match(line)):
-                toc.append(line)
-            elif(epilogue_re.match(line)):
-                toc.append(line)
-    if(len(toc) != 17):
+    global novel, search_index
+    # The line index is cached next to the source, so only the first
+    # launch has to scan the whole file for line breaks. The books that
+    # open_book() has cached are copies, so the novel that was open before
+    # can be closed.
+    document = paginator.MappedDocument(SOURCE_FILENAME)
+    if novel is not None:
+        novel.close()
+    novel = document
+    contents, bookmarks, chapter_marks = scan_novel(novel)
+    toc[:] = contents
+    if(len(toc) != TOTAL_BOOKS):
         raise Exception(
             'Table of contents did not load correctly. ' +\
-            f'The novel has 17 books, but your app has {len(toc)}.'
+            f'The novel has {TOTAL_BOOKS} books, but your app has {len(toc)}.'
+        )
+    if(len(bookmarks) != TOTAL_BOOKS):
+        raise Exception(
+            f'The novel has {TOTAL_BOOKS} books, but only ' +\
+            f'{len(bookmarks)} of them could be found in the text.'
         )
-    for b in range(1, 18):
-        books[b] = []
-    book_re = re.compile(r'^BOOK\s.+')
-    epilogue_re = re.compile('^FIRST EPILOGUE')
-    book_begin, book_end = 0, 0
-    current_line = 0
-    with open(SOURCE_FILENAME) as txt:
-        bookmarks = []
-        lines = txt.readlines()
-        # Bookmark the beginning of each chapter
-        for i in range(0, len(lines)):
-            if(book_re.match(lines[i])):
-                bookmarks.append(i)
-        for i in range(0, len(lines)):
-            if(epilogue_re.match(lines[i])):
-                bookmarks.append(i)
-                epilogue_re = re.compile('^SECOND EPILOGUE')
-                for j in range(0, len(lines)):
-                    if(epilogue_re.match(lines[j])):
-                        result = j
-                        bookmarks.append(j)
-        for b in range(1, 18):
-            current_line = bookmarks[b-1]
-            for i in range(current_line, (bookmarks[b] - 1)):
-                books[b].append(lines[i])
-        for i in range(bookmarks[16], len(lines)):
-            books[b].append(lines[i])
-    return result
+    # Each book ends just before the blank line that precedes the next one;
+    # the second epilogue runs to the end of the file.
+    bookmarks.append(len(novel) + 1)
+    for b in range(1, TOTAL_BOOKS + 1):
+        books[b] = (bookmarks[b-1], bookmarks[b] - 1)
+        chapters[b] = chapter_marks[b]
+    open_book.cache_clear()
+    search_index = None
+    return bookmarks[TOTAL_BOOKS - 1]
+
+@functools.lru_cache(maxsize=BOOK_CACHE_SIZE)
+def open_book(number):
+    '''
+    Get the lines of a book, reading them from the novel the first time
+    the book is opened. The most recently opened books are kept in memory.
+    '''
+    start, end = books[number]
+    return novel[start:end]
+
+def get_search_index():
+    '''
+    Get the search index for the novel, building it (and saving it next
+    to the novel) the first time it is needed.
+    '''
+    global search_index
+    if search_index is None:
+        search_index = SearchIndex.load(novel)
+        if search_index is None:
+            search_index = SearchIndex.build(novel)
+            try:
+                search_index.save(novel)
+            except OSError:
+                pass
+    return search_index
+
+def find_book(line_number):
+    '''
+    Get the number of the book that contains the given line of the novel,
+    or None if the line is outside all of the books.
+    '''
+    starts = [books[b][0] for b in range(1, TOTAL_BOOKS + 1)]
+    b = bisect.bisect_right(starts, line_number)
+    if b == 0 or line_number >= books[b][1]:
+        return None
+    return b
+
+def search_window(stdscr, prompt_bar, p):
+    '''Ask for words to search for, list the hits, and jump to one of them.'''
+    screen_height, screen_width = stdscr.getmaxyx()
+    query_prompt = "Search for: "
+    prompt_bar.clear()
+    prompt_bar.addstr(0, 0, query_prompt, curses.color_pair(TITLE_STYLE))
+    prompt_bar.refresh()
+    curses.echo()
+    query = prompt_bar.getstr(0, len(query_prompt)).decode("utf-8")
+    curses.noecho()
+    hits = get_search_index().search(query)
+    stdscr.clear()
+    max_hits = min(len(hits), screen_height - 4, 99)
+    heading = f"{len(hits)} lines contain '{query}'"
+    if len(hits) > max_hits:
+        heading += f" (showing the first {max_hits})"
+    stdscr.addstr(0, (screen_width // 2) - (len(heading) // 2), heading,
+                  curses.A_BOLD | curses.color_pair(TITLE_STYLE))
+    for i in range(max_hits):
+        book = find_book(hits[i])
+        where = f"Book {book:02}" if book is not None else "Front matter"
+        context = f"{i + 1:02}. [{where}] {novel[hits[i]].strip()}"
+        stdscr.addstr(i + 2, 0, context[:screen_width - 1],
+                      curses.color_pair(TEXT_STYLE))
+    stdscr.refresh()
+    prompt_bar.clear()
+    if max_hits == 0:
+        prompt_bar.addstr(0, 0, "Press any key to continue...",
+                          curses.color_pair(TITLE_STYLE))
+        prompt_bar.refresh()
+        prompt_bar.getch()
+        return
+    choice_prompt = "Choose a hit by number, or press 'ESC' to go back..."
+    prompt_bar.addstr(0, 0, choice_prompt, curses.color_pair(TITLE_STYLE))
+    prompt_bar.refresh()
+    char1 = prompt_bar.getch()
+    if char1 == 27: # ESC key...
+        return
+    char2 = prompt_bar.getch()
+    try:
+        choice = int(chr(char1) + chr(char2))
+    except ValueError:
+        return
+    if not 1 <= choice <= max_hits:
+        return
+    line_number = hits[choice - 1]
+    book = find_book(line_number)
+    stdscr.clear()
+    stdscr.refresh()
+    if book is None:
+        p.paginate(stdscr, novel, line_number)
+    else:
+        p.paginate(stdscr, open_book(book), line_number - books[book][0])
 
 def main_window(stdscr):
     text = None
@@ -102,10 +345,10 @@ def main_window(stdscr):
         stdscr.refresh()
         curses.napms(3000)
         raise ScreenSetupError()
-    default_prompt = "Choose a chapter by number " \
-                     "(include leading zeroes). Press 'ESC' to quit..."
+    default_prompt = "Choose a chapter by number (00 = all), " \
+                     f"'{SEARCH_CHAR}' to search, 'ESC' to quit..."
     curses.set_escdelay(2)
-    p = paginator.Paginator()
+    p = paginator.Paginator(windowed=True)
     paging_window = curses.newwin(screen_height - 2, screen_width - 1)
     prompt_bar = curses.newwin(1, screen_width - 1, screen_height - 2, 0)
     result = 0
@@ -140,6 +383,11 @@ def main_window(stdscr):
         char1 = prompt_bar.getch()
         if(char1 == 27): # ESC key...
             break
+        elif(char1 == ord(SEARCH_CHAR)):
+            search_window(stdscr, prompt_bar, p)
+            stdscr.clear()
+            stdscr.refresh()
+            continue
         else:
             char1 -= 48
         char2 = prompt_bar.getch() - 48
@@ -147,7 +395,10 @@ def main_window(stdscr):
             stdscr.clear()
             result = int(f"{char1}{char2}")
             stdscr.refresh()
-            p.paginate(paging_window, books[result])
+            if result == 0:
+                p.paginate(paging_window, novel)
+            else:
+                p.paginate(paging_window, open_book(result))
             paging_window.erase()
         except(KeyError, ValueError):
             continue
@@ -156,4 +407,7 @@ def main_window(stdscr):
 
 if __name__ == "__main__":
     do_setup()
-    wrapper(main_window)
+    try:
+        wrapper(main_window)
+    finally:
+        novel.close()
@@ -0,0 +1,136 @@
+import unittest
+import wpreader, paginator, os
+
+NUMBERS = ['ONE', 'TWO', 'THREE', 'FOUR', 'FIVE', 'SIX', 'SEVEN', 'EIGHT',
+           'NINE', 'TEN', 'ELEVEN', 'TWELVE', 'THIRTEEN', 'FOURTEEN',
+           'FIFTEEN']
+EPILOGUES = ['FIRST EPILOGUE', 'SECOND EPILOGUE']
+
+class TestSetup(unittest.TestCase):
+
+    def setUp(self):
+        self.filename = 'wpreader-test-novel.txt'
+        lines = ["WAR AND PEACE\n", "\n", "Contents\n", "\n"]
+        for n in NUMBERS:
+            lines.append(f"    BOOK {n}\n")
+        for e in EPILOGUES:
+            lines.append(f"    {e}\n")
+        lines.append("\n")
+        for title in [f"BOOK {n}" for n in NUMBERS] + EPILOGUES:
+            lines.append(f"{title}\n")
+            lines.append("\n")
+            for c in ['I', 'II']:
+                lines.append(f"CHAPTER {c}\n")
+                lines.append("\n")
+                lines.append(f"The text of chapter {c} of {title}.\n")
+                lines.append("\n")
+        self.lines = lines
+        with open(self.filename, 'w') as ofile:
+            ofile.writelines(lines)
+        self.saved_source = wpreader.SOURCE_FILENAME
+        wpreader.SOURCE_FILENAME = self.filename
+
+    def tearDown(self):
+        wpreader.SOURCE_FILENAME = self.saved_source
+        wpreader.toc.clear()
+        wpreader.books.clear()
+        if wpreader.novel is not None:
+            wpreader.novel.close()
+        os.remove(self.filename)
+        for suffix in [paginator.INDEX_SUFFIX, wpreader.SEARCH_SUFFIX]:
+            if os.path.exists(self.filename + suffix):
+                os.remove(self.filename + suffix)
+
+    def test_scan_novel(self):
+        with paginator.MappedDocument(self.filename) as document:
+            contents, bookmarks, chapter_marks = wpreader.scan_novel(document)
+        self.assertEqual(len(contents), 17)
+        self.assertEqual(contents[-1], "    SECOND EPILOGUE\n")
+        self.assertEqual(len(bookmarks), 17)
+        self.assertEqual(self.lines[bookmarks[0]], "BOOK ONE\n")
+        self.assertEqual(self.lines[bookmarks[16]], "SECOND EPILOGUE\n")
+        self.assertEqual(len(chapter_marks[3]), 2)
+        self.assertEqual(self.lines[chapter_marks[3][1]], "CHAPTER II\n")
+
+    def test_bare_headings(self):
+        # BOOK or CHAPTER alone on a line is text, not a heading
+        chapter = self.lines.index("The text of chapter I of BOOK ONE.\n")
+        self.lines[chapter + 1:chapter + 1] = ["BOOK\n", "CHAPTER\n",
+                                               "ONE HUNDRED\n"]
+        with open(self.filename, 'w') as ofile:
+            ofile.writelines(self.lines)
+        with paginator.MappedDocument(self.filename) as document:
+            contents, bookmarks, chapter_marks = wpreader.scan_novel(document)
+        self.assertEqual(len(bookmarks), 17)
+        self.assertEqual(self.lines[bookmarks[1]], "BOOK TWO\n")
+        self.assertEqual(len(chapter_marks[1]), 2)
+
+    def test_do_setup(self):
+        second_epilogue = wpreader.do_setup()
+        self.assertEqual(self.lines[second_epilogue], "SECOND EPILOGUE\n")
+        self.assertEqual(len(wpreader.books), 17)
+        start, end = wpreader.books[2]
+        self.assertEqual(self.lines[start:end], wpreader.open_book(2))
+        # Setting up again closes the novel that was open before
+        first_novel = wpreader.novel
+        wpreader.do_setup()
+        self.assertTrue(first_novel.file.closed)
+        self.assertFalse(wpreader.novel.file.closed)
+
+    def test_open_book(self):
+        wpreader.do_setup()
+        self.assertEqual(wpreader.open_book(1)[0], "BOOK ONE\n")
+        self.assertEqual(wpreader.open_book(1)[-1],
+                         "The text of chapter II of BOOK ONE.\n")
+        self.assertEqual(wpreader.open_book(17)[-1], self.lines[-1])
+        self.assertIs(wpreader.open_book(1), wpreader.open_book(1))
+        for b in range(1, 18):
+            wpreader.open_book(b)
+        self.assertEqual(wpreader.open_book.cache_info().currsize,
+                         wpreader.BOOK_CACHE_SIZE)
+        with self.assertRaises(KeyError):
+            wpreader.open_book(18)
+
+    def test_search(self):
+        wpreader.do_setup()
+        index = wpreader.get_search_index()
+        self.assertTrue(os.path.exists(self.filename + wpreader.SEARCH_SUFFIX))
+        hits = index.search('Chapter II of book three')
+        self.assertEqual(len(hits), 1)
+        self.assertEqual(self.lines[hits[0]],
+                         "The text of chapter II of BOOK THREE.\n")
+        self.assertEqual(wpreader.find_book(hits[0]), 3)
+        self.assertEqual(index.search('EPILOGUE'),
+                         [n for n, line in enumerate(self.lines)
+                          if 'EPILOGUE' in line])
+        self.assertEqual(index.search('napoleon'), [])
+        self.assertEqual(index.search(''), [])
+        self.assertIsNone(wpreader.find_book(0))
+        # The saved index is read back instead of being rebuilt
+        loaded = wpreader.SearchIndex.load(wpreader.novel)
+        self.assertEqual(loaded.words, index.words)
+        self.assertEqual(loaded.search('chapter ii'), index.search('chapter ii'))
+
+    def test_empty_search_index(self):
+        with open(self.filename, 'w') as ofile:
+            ofile.write("\n-- --\n\n")
+        with paginator.MappedDocument(self.filename) as document:
+            index = wpreader.SearchIndex.build(document)
+            self.assertEqual(index.words, [])
+            index.save(document)
+            loaded = wpreader.SearchIndex.load(document)
+            self.assertIsNotNone(loaded)
+            self.assertEqual(loaded.words, [])
+            self.assertEqual(loaded.search('anything'), [])
+
+    def test_search_index_typecode(self):
+        # An index saved with line numbers of another size is rebuilt
+        with paginator.MappedDocument(self.filename) as document:
+            wpreader.SearchIndex.build(document).save(document)
+            with open(self.filename + wpreader.SEARCH_SUFFIX, 'r+b') as f:
+                f.seek(wpreader.SEARCH_HEADER.size - 2)
+                f.write(b'Q\x08')
+            self.assertIsNone(wpreader.SearchIndex.load(document))
+
+if __name__ == '__main__':
+    unittest.main()